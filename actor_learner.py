@@ -0,0 +1,216 @@
+import queue
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from online_stats import VectorRunningStats
+
+def _actor(actor_id, env_kwargs, shared_model, lock, version, epsilon,
+           transitions, stop_event, chunk_size, shared_stats=None):
+    """
+    Simulation actor - steps SUMO with a local policy copy and ships transitions
+
+    With observation normalization, the statistics gathered since the last
+    chunk go with every chunk, and the learner's merged total (shared_stats)
+    replaces the local one whenever new weights are picked up.
+    """
+    from traffic_dqn_main import DQNNetwork, TrafficEnvironment
+
+    # Actors only run small forward passes; leave the cores to SUMO and the learner
+    torch.set_num_threads(1)
+
+    env = TrafficEnvironment(**env_kwargs)
+    model = DQNNetwork(shared_model.fc1.in_features, shared_model.fc4.out_features)
+    action_size = shared_model.fc4.out_features
+    local_version = -1
+
+    try:
+        while not stop_event.is_set():
+            state = env.reset()
+            chunk = []
+            total_reward = 0
+            steps = 0
+            start = time.perf_counter()
+
+            while not stop_event.is_set():
+                # Pick up weights published by the learner
+                if version.value != local_version:
+                    with lock:
+                        model.load_state_dict(shared_model.state_dict())
+                        local_version = version.value
+                        if shared_stats is not None and shared_stats[0] > 0:
+                            env.obs_builder.set_stats(_unpack_stats(shared_stats))
+
+                if np.random.rand() <= epsilon.value:
+                    action = np.random.randint(action_size)
+                else:
+                    with torch.no_grad():
+                        action = int(model(torch.from_numpy(state).unsqueeze(0)).argmax())
+
+                next_state, reward, done, _ = env.step(action)
+                chunk.append((state, action, reward, next_state, done))
+                state = next_state
+                total_reward += reward
+                steps += 1
+
+                if len(chunk) >= chunk_size or done:
+                    states, actions, rewards, next_states, dones = zip(*chunk)
+                    transitions.put(('transitions', (np.stack(states), np.array(actions),
+                                                     np.array(rewards, dtype=np.float32),
+                                                     np.stack(next_states),
+                                                     np.array(dones, dtype=np.float32))))
+                    if shared_stats is not None:
+                        transitions.put(('obs_stats', env.obs_builder.pop_stats_update()))
+                    chunk = []
+
+                if done:
+                    transitions.put(('episode', (actor_id, total_reward, steps,
+                                                 time.perf_counter() - start, env.reset_time)))
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        env.close()
+
+def _check_actors(actors):
+    """Raise if an actor process died - its transitions and episodes would never arrive"""
+    for actor_id, actor in enumerate(actors):
+        if not actor.is_alive():
+            raise RuntimeError(f"Actor {actor_id} exited unexpectedly (exit code {actor.exitcode})")
+
+def _pack_stats(stats, shared_stats):
+    """Write VectorRunningStats into a shared [count, mean..., m2...] tensor"""
+    size = len(stats.mean)
+    shared_stats[0] = stats.count
+    shared_stats[1:1 + size] = torch.from_numpy(stats.mean)
+    shared_stats[1 + size:] = torch.from_numpy(stats.m2)
+
+def _unpack_stats(shared_stats):
+    """VectorRunningStats from a shared [count, mean..., m2...] tensor"""
+    values = shared_stats.numpy()
+    size = (len(values) - 1) // 2
+    return VectorRunningStats.from_state_dict({'count': values[0], 'mean': values[1:1 + size],
+                                               'm2': values[1 + size:]})
+
+def _publish(agent, shared_model, lock, version, obs_stats=None, shared_stats=None):
+    """Copy learner weights (and merged observation statistics) to the actors"""
+    with lock:
+        for shared, param in zip(shared_model.parameters(), agent.model.parameters()):
+            shared.data.copy_(param.data.cpu())
+        if obs_stats is not None:
+            _pack_stats(obs_stats, shared_stats)
+        version.value += 1
+
+def train_actor_learner(episodes=100, num_actors=4, publish_interval=50, backend=None,
+                        prioritized=False, chunk_size=32, base_seed=42, snapshot_times=None,
+                        observation_features=None, pretrained=None):
+    """
+    Train with simulation actors and a gradient learner running concurrently
+
+    Actors (one process and SUMO instance each) act with a local copy of the
+    policy and push transition chunks into a queue. The learner drains the
+    queue into the replay buffer, trains continuously, and publishes updated
+    weights to the actors every publish_interval gradient steps. Observation
+    normalization statistics travel the same way: actors send theirs with
+    each chunk, the learner merges them and publishes the total.
+    """
+    from traffic_dqn_main import DQNAgent, DQNNetwork, TrafficEnvironment, load_pretrained, model_path_for
+
+    # Observation size from the network topology (no simulation is started)
+    probe = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', backend=backend,
+                               observation_features=observation_features)
+    state_size = probe.state_size
+    agent = DQNAgent(state_size=state_size, action_size=4, prioritized=prioritized)
+    if pretrained:
+        load_pretrained(agent, pretrained)
+
+    ctx = mp.get_context('spawn')
+    shared_model = DQNNetwork(state_size, 4)
+    shared_model.load_state_dict(agent.model.state_dict())
+    shared_model.share_memory()
+
+    obs_stats = shared_stats = None
+    if probe.obs_builder is not None and probe.obs_builder.stats is not None:
+        size = probe.obs_builder.num_continuous
+        obs_stats = VectorRunningStats(size)
+        shared_stats = torch.zeros(1 + 2 * size, dtype=torch.float64).share_memory_()
+
+    lock = ctx.Lock()
+    version = ctx.Value('i', 0)
+    epsilon = ctx.Value('d', agent.epsilon)
+    transitions = ctx.Queue(maxsize=num_actors * 64)
+    stop_event = ctx.Event()
+
+    actors = []
+    for i in range(num_actors):
+        env_kwargs = {'net_file': 'intersection.net.xml', 'route_file': 'traffic.rou.xml',
+                      'use_gui': False, 'backend': backend, 'env_id': i, 'seed': base_seed + i,
+                      'snapshot_times': snapshot_times, 'observation_features': observation_features}
+        actor = ctx.Process(target=_actor, daemon=True,
+                            args=(i, env_kwargs, shared_model, lock, version, epsilon,
+                                  transitions, stop_event, chunk_size, shared_stats))
+        actor.start()
+        actors.append(actor)
+
+    episode = 0
+    updates = 0
+    episode_times = []
+    start = time.perf_counter()
+
+    try:
+        while episode < episodes:
+            # A crashed actor would leave the learner waiting for episodes forever
+            _check_actors(actors)
+            ready = len(agent.memory) >= agent.batch_size
+
+            # Drain what the actors produced; only block while the buffer is too small to train
+            for _ in range(num_actors * 4):
+                try:
+                    kind, data = transitions.get_nowait() if ready else transitions.get(timeout=1.0)
+                except queue.Empty:
+                    break
+
+                if kind == 'transitions':
+                    agent.remember_batch(*data)
+                    continue
+                if kind == 'obs_stats':
+                    obs_stats.merge(data)
+                    continue
+
+                actor_id, total_reward, steps, wall_time, reset_time = data
+                episode_times.append(wall_time)
+                agent.update_target_model()
+                if agent.epsilon > agent.epsilon_min:
+                    agent.epsilon *= agent.epsilon_decay
+                epsilon.value = agent.epsilon
+
+                if episode % 10 == 0:
+                    print(f"Ep {episode}/{episodes} | Actor {actor_id} | Reward: {total_reward:.1f} | "
+                          f"ε: {agent.epsilon:.3f} | Steps: {steps} | Wall: {wall_time:.1f}s | "
+                          f"Reset: {reset_time * 1000:.0f}ms | Updates: {updates}")
+                episode += 1
+
+            if len(agent.memory) >= agent.batch_size:
+                agent.replay()
+                updates += 1
+                if updates % publish_interval == 0:
+                    _publish(agent, shared_model, lock, version, obs_stats, shared_stats)
+    finally:
+        stop_event.set()
+        # Keep draining so no actor stays blocked on a full queue
+        while any(actor.is_alive() for actor in actors):
+            try:
+                transitions.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for actor in actors:
+            actor.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nEpisodes: {episode} | Wall time: {elapsed:.1f}s | "
+          f"Avg episode wall time per actor: {np.mean(episode_times) if episode_times else 0:.1f}s | "
+          f"Gradient steps: {updates} ({updates / elapsed:.1f}/s)")
+
+    agent.save(model_path_for(observation_features), obs_stats=obs_stats)
+    print("Training complete. Model saved.")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark SUMO backends - simulation steps per second for traci and libsumo
+"""
+
+import os
+import sys
+import time
+
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("Please declare environment variable 'SUMO_HOME'")
+
+from sumo_backend import BACKENDS, get_backend
+from traffic_env import TrafficEnvironment
+
+def benchmark_raw(backend, config='simulation.sumocfg', max_steps=3600):
+    """Plain simulationStep loop - measures backend call overhead only"""
+    sumo = get_backend(backend)
+    sumo.start(['sumo', '-c', config, '--no-warnings', '--no-step-log', '--time-to-teleport', '-1'])
+
+    steps = 0
+    start = time.perf_counter()
+    while steps < max_steps and sumo.simulation.getMinExpectedNumber() > 0:
+        sumo.simulationStep()
+        steps += 1
+    elapsed = time.perf_counter() - start
+
+    sumo.close()
+    return steps, elapsed
+
+def benchmark_env(backend, max_steps=3600):
+    """Full TrafficEnvironment episode with a fixed action - counts simulated seconds"""
+    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', use_gui=False, backend=backend)
+    env.reset()
+
+    steps = 0
+    start = time.perf_counter()
+    while steps < max_steps:
+        _, _, done, info = env.step(0)
+        steps += int(info['elapsed'])
+        if done:
+            break
+    elapsed = time.perf_counter() - start
+
+    env.close()
+    return steps, elapsed
+
+def main():
+    max_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+
+    print(f"{'Backend':<10} {'Mode':<6} {'Steps':>7} {'Time (s)':>10} {'Steps/s':>10}")
+    for backend in BACKENDS:
+        try:
+            get_backend(backend)
+        except ImportError:
+            print(f"{backend:<10} not available")
+            continue
+
+        for mode, bench in (('raw', benchmark_raw), ('env', benchmark_env)):
+            steps, elapsed = bench(backend, max_steps=max_steps)
+            print(f"{backend:<10} {mode:<6} {steps:>7} {elapsed:>10.2f} {steps / elapsed:>10.1f}")
+
+if __name__ == "__main__":
+    main()
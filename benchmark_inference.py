@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark DQN inference - eager DQNAgent.act vs TorchScript, int8, NumPy and lookup-table policies
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import torch
+
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("Please declare environment variable 'SUMO_HOME'")
+
+from traffic_dqn_main import DQNAgent
+from inference import InferencePolicy, export_model
+from numpy_policy import LookupTablePolicy, NumpyPolicy, export_numpy, sample_states
+
+def time_calls(act, states, repeat=1):
+    """Median wall time of act(states[i]) in microseconds"""
+    timings = np.empty(len(states) * repeat)
+    for i in range(len(timings)):
+        state = states[i % len(states)]
+        start = time.perf_counter_ns()
+        act(state)
+        timings[i] = time.perf_counter_ns() - start
+    return np.median(timings) / 1000
+
+def time_batches(act, states, batch_size, repeat=20):
+    """Median wall time per state for batched calls, in microseconds"""
+    batches = [states[i:i + batch_size] for i in range(0, len(states) - batch_size + 1, batch_size)]
+    timings = []
+    for _ in range(repeat):
+        for batch in batches:
+            start = time.perf_counter_ns()
+            act(batch)
+            timings.append(time.perf_counter_ns() - start)
+    return np.median(timings) / 1000 / batch_size
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'models/traffic_dqn.pth'
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    if not os.path.exists(model_path):
+        sys.exit(f"ERROR: No trained model found at {model_path}. Please train first.")
+
+    # Latency of one decision, not throughput across cores
+    torch.set_num_threads(1)
+
+    agent = DQNAgent(state_size=6, action_size=4, memory_size=1)
+    agent.load(model_path)
+    agent.epsilon = 0
+    agent.model.eval()
+
+    network = NumpyPolicy(export_numpy(model_path))
+    policies = {'script': InferencePolicy(export_model(model_path), max_batch=batch_size),
+                'int8': InferencePolicy(export_model(model_path, quantize=True), max_batch=batch_size),
+                'numpy': network}
+    table = LookupTablePolicy.compile(network)
+
+    states = sample_states(10000)
+    with torch.no_grad():
+        reference = agent.model(torch.from_numpy(states).to(agent.device)).cpu().numpy()
+    reference_actions = reference.argmax(1)
+
+    print(f"{'Model':<8} {'Single (us)':>12} {f'Batch {batch_size} (us/state)':>22} "
+          f"{'Agreement':>10} {'Max |dQ|':>10}")
+
+    single = time_calls(agent.act, states[:2000])
+    batched = time_batches(agent.act, states, batch_size)
+    print(f"{'eager':<8} {single:>12.1f} {batched:>22.2f} {100.0:>9.2f}% {0.0:>10.4f}")
+
+    for name, policy in policies.items():
+        q_values = np.asarray(policy.q_values(states))
+        agreement = 100 * np.mean(q_values.argmax(1) == reference_actions)
+        max_error = np.abs(q_values - reference).max()
+
+        single = time_calls(policy.act, states[:2000])
+        batched = time_batches(policy.act, states, batch_size)
+        print(f"{name:<8} {single:>12.1f} {batched:>22.2f} {agreement:>9.2f}% {max_error:>10.4f}")
+
+    # Actions only - no Q-values to compare
+    agreement = 100 * np.mean(table.act(states) == reference_actions)
+    single = time_calls(table.act, states[:2000])
+    batched = time_batches(table.act, states, batch_size)
+    print(f"{'table':<8} {single:>12.1f} {batched:>22.2f} {agreement:>9.2f}% {'-':>10}")
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,10 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("SUMO_HOME not set")
 
-import traci
+from sumo_backend import get_backend
+
+# EDITED: traci or libsumo, selected with the SUMO_BACKEND environment variable
+traci = get_backend()
 
 # Start simulation
 traci.start(['sumo', '-c', 'simulation.sumocfg', '--start'])
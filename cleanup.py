@@ -61,15 +61,36 @@ def main():
             'traffic.rou.xml',
             'traffic_dynamic.rou.xml',
             'traffic_incident.rou.xml',
+            'traffic_profile.rou.xml',
             'tls_program.add.xml',
-            'simulation.sumocfg'
+            'simulation.sumocfg',
+            'intersection.net.xml.topology.pkl'
         ]
+        # Generated grid scenarios (grid_RxC.*)
+        sumo_files += [f for f in os.listdir('.') if f.startswith('grid_') and
+                       f.endswith(('.nod.xml', '.edg.xml', '.net.xml', '.rou.xml', '.sumocfg', '.topology.pkl'))]
         delete_files(sumo_files, "SUMO network")
     else:
         print("  Skipped SUMO network files")
     
     print()
     
+    # Simulation snapshots
+    if ask_yes_no("Delete simulation snapshots?"):
+        delete_directory('snapshots', "simulation snapshots")
+    else:
+        print("  Skipped simulation snapshots")
+    
+    print()
+    
+    # Scenario cache
+    if ask_yes_no("Delete cached scenarios?"):
+        delete_directory('.scenario_cache', "scenario cache")
+    else:
+        print("  Skipped cached scenarios")
+    
+    print()
+    
     # Training logs
     if ask_yes_no("Delete training logs?"):
         delete_directory('logs', "training logs")
@@ -86,6 +107,15 @@ def main():
     
     print()
     
+    # Evaluation scenarios and results
+    if ask_yes_no("Delete evaluation scenarios and results?"):
+        delete_directory('eval_scenarios', "evaluation scenarios")
+        delete_files(['eval_results.csv'], "evaluation results")
+    else:
+        print("  Skipped evaluation scenarios and results")
+    
+    print()
+    
     # Trained models
     if ask_yes_no("Delete trained models?"):
         delete_directory('models', "models")
@@ -99,6 +129,7 @@ def main():
         analysis_files = [
             'training_analysis.png',
             'vehicle_distribution.png',
+            'episode_timeline.png',
             'training_summary.csv'
         ]
         delete_files(analysis_files, "analysis output")
@@ -0,0 +1,322 @@
+"""
+Baseline signal controllers, vectorized over junctions and environments
+
+Every controller maps a batched JunctionObservation (one row per junction,
+from controller_observation() of TrafficEnvironment, GridTrafficEnvironment
+or VectorTrafficEnv) to one action per junction with a few NumPy operations.
+Controllers keep no per-junction state - timing comes from the observation -
+so the same instance drives any number of junctions and survives auto-resets.
+"""
+
+from collections import namedtuple
+import xml.etree.ElementTree as ET
+import numpy as np
+
+# Arrays of shape (N, num_actions): queues (halting vehicles), vehicles (all
+# vehicles on the approach lanes), pressure (incoming minus downstream queues
+# over the green movements), gaps (seconds since any approach lane's gap
+# detector last saw a vehicle, inf for actions without lanes); and (N,):
+# action (current green, -1 during yellow), time_in_phase and time
+# (simulation seconds).
+JunctionObservation = namedtuple('JunctionObservation',
+                                 ['queues', 'vehicles', 'pressure', 'gaps', 'action', 'time_in_phase', 'time'])
+
+def stack_observations(observations):
+    """Concatenate the observations of several environments into one batch"""
+    return JunctionObservation(*(np.concatenate(field) for field in zip(*observations)))
+
+class ControllerView:
+    """
+    Gather tables from the network topology to JunctionObservation rows
+
+    junctions: list of (tls_id, program_id, phases), phases[a] being the
+    green phase of action a; lanes: the observer's lane list. Lane sums are
+    one bincount each; pressure is summed per green movement (link), with
+    downstream queues taken from the observer when the outgoing lane is
+    observed (incoming lane of a neighbouring junction) and 0 otherwise.
+    """
+
+    def __init__(self, topology, junctions, lanes):
+        self.num_junctions = len(junctions)
+        self.num_actions = max(len(phases) for _, _, phases in junctions)
+        positions = {}
+        for position, lane in enumerate(lanes):
+            positions.setdefault(lane, []).append(position)
+
+        groups = self.num_junctions * self.num_actions
+        # lane_group[i]: junction * num_actions + action of lane i; a lane listed
+        # k times is assigned to the first k actions that serve it
+        self.lane_group = np.full(len(lanes), groups, dtype=np.int64)
+        move_in, move_out, move_group = [], [], []
+        # Approach edge -> group, for demand estimates from route files
+        self.edge_group = {}
+
+        for j, (tls_id, program_id, phases) in enumerate(junctions):
+            tls = topology[tls_id]
+            unassigned = {lane: list(positions[lane]) for lane in tls.lanes if lane in positions}
+            for action, phase in enumerate(phases):
+                group = j * self.num_actions + action
+                green = tls.green_lanes[program_id][phase]
+                for lane, free in unassigned.items():
+                    if free and lane in green:
+                        self.lane_group[free.pop(0)] = group
+                for in_lane, out_lane in tls.green_movements(program_id, phase):
+                    if in_lane not in positions:
+                        continue
+                    move_in.append(positions[in_lane][0])
+                    move_out.append(positions[out_lane][0] if out_lane in positions else len(lanes))
+                    move_group.append(group)
+                    self.edge_group.setdefault(in_lane.rsplit('_', 1)[0], group)
+
+        self.move_in = np.array(move_in, dtype=np.int64)
+        self.move_out = np.array(move_out, dtype=np.int64)
+        self.move_group = np.array(move_group, dtype=np.int64)
+        # Approach lanes per action, for saturation flows
+        self.lane_counts = self._group_sums(np.ones(len(lanes)))
+
+    def _group_sums(self, lane_values):
+        # The extra bin collects lanes without a green phase
+        groups = self.num_junctions * self.num_actions
+        sums = np.bincount(self.lane_group, weights=lane_values, minlength=groups + 1)
+        return sums[:groups].reshape(self.num_junctions, self.num_actions)
+
+    def _group_mins(self, lane_values):
+        groups = self.num_junctions * self.num_actions
+        mins = np.full(groups + 1, np.inf)
+        np.minimum.at(mins, self.lane_group, lane_values)
+        return mins[:groups].reshape(self.num_junctions, self.num_actions)
+
+    def observe(self, observer, action, time_in_phase):
+        halting = observer.halting
+        vehicles = np.fromiter((len(ids) for ids in observer.lane_vehicles), dtype=np.float64, count=len(halting))
+        # Padded with a zero queue for outgoing lanes nobody observes
+        padded = np.append(halting, 0.0)
+        pressure = np.bincount(self.move_group, weights=padded[self.move_in] - padded[self.move_out],
+                               minlength=self.num_junctions * self.num_actions)
+
+        return JunctionObservation(
+            queues=self._group_sums(halting),
+            vehicles=self._group_sums(vehicles),
+            pressure=pressure.reshape(self.num_junctions, self.num_actions),
+            gaps=self._group_mins(observer.gap_time),
+            action=np.asarray(action, dtype=np.int64).reshape(self.num_junctions),
+            time_in_phase=np.asarray(time_in_phase, dtype=np.float64).reshape(self.num_junctions),
+            time=np.full(self.num_junctions, observer.time, dtype=np.float64),
+        )
+
+def _route_edges(elem, routes):
+    """Edges of a vehicle, trip or flow: inline or named route, else from/via/to"""
+    inline = elem.find('route')
+    if inline is not None:
+        return inline.get('edges', '').split()
+    if elem.get('route') is not None:
+        return routes.get(elem.get('route'), [])
+    return [elem.get('from')] + elem.get('via', '').split() + [elem.get('to')]
+
+def flow_departs(elem):
+    """
+    Departure times of the vehicles a <flow> element inserts
+
+    The spacing comes from vehsPerHour, period (also 'exp(rate)') or
+    probability, else from number spread over [begin, end). Random flows
+    (probability, exp) are expanded at their expected rate, evenly spaced.
+    """
+    begin = float(elem.get('begin', 0))
+    end = float(elem.get('end')) if elem.get('end') is not None else None
+    number = int(elem.get('number')) if elem.get('number') is not None else None
+
+    if elem.get('vehsPerHour') is not None:
+        rate = float(elem.get('vehsPerHour')) / 3600
+    elif elem.get('period') is not None:
+        period = elem.get('period')
+        rate = float(period[4:-1]) if period.startswith('exp(') else 1 / float(period)
+    elif elem.get('probability') is not None:
+        rate = float(elem.get('probability'))
+    elif number is not None and end is not None:
+        rate = number / (end - begin) if end > begin else 0.0
+    else:
+        raise ValueError(f"Flow '{elem.get('id')}' needs vehsPerHour, period, probability or number and end")
+
+    if rate <= 0 or number == 0:
+        return np.empty(0)
+    if end is None:
+        # SUMO's default flow end is one day after begin, unless number ends it first
+        end = begin + number / rate if number is not None else begin + 86400
+    departs = begin + np.arange(int(np.ceil((end - begin) * rate))) / rate
+    departs = departs[departs < end]
+    return departs[:number] if number is not None else departs
+
+def route_vehicles(route_file):
+    """
+    Yield (depart time, edges) of every vehicle, trip and flow vehicle in a route file
+
+    Named and inline routes give the full edge list; trips only their
+    from/via/to edges. Flows are expanded with flow_departs().
+    """
+    routes = {}
+    for _, elem in ET.iterparse(route_file):
+        if elem.tag == 'route' and elem.get('id') is not None:
+            routes[elem.get('id')] = elem.get('edges', '').split()
+        elif elem.tag in ('vehicle', 'trip'):
+            yield float(elem.get('depart', 0)), _route_edges(elem, routes)
+            elem.clear()
+        elif elem.tag == 'flow':
+            edges = _route_edges(elem, routes)
+            for depart in flow_departs(elem).tolist():
+                yield depart, edges
+            elem.clear()
+
+def route_flows(route_file, view):
+    """
+    Demand per junction and action (veh/s) counted from a route file
+
+    Every vehicle adds one to each approach edge on its route. The total is
+    spread over the span of departure times.
+    """
+    counts = np.zeros(view.num_junctions * view.num_actions)
+    departs = []
+    for depart, edges in route_vehicles(route_file):
+        for edge in edges:
+            group = view.edge_group.get(edge)
+            if group is not None:
+                counts[group] += 1
+        departs.append(depart)
+
+    duration = max(max(departs) - min(departs), 1.0) if departs else 1.0
+    return (counts / duration).reshape(view.num_junctions, view.num_actions)
+
+class Controller:
+    """Base class - act() returns an int64 array with one action per observation row"""
+
+    def act(self, obs):
+        raise NotImplementedError
+
+class FixedTimeController(Controller):
+    """
+    Cycle through the actions with fixed green times (s), on the simulation clock
+
+    green_times: scalar, (num_actions,) or (N, num_actions); offsets (s) shift
+    each junction's cycle, e.g. for a green wave along an arterial.
+    """
+
+    def __init__(self, green_times=30.0, num_actions=4, offsets=0.0):
+        green_times = np.asarray(green_times, dtype=np.float64)
+        if green_times.ndim == 0:
+            green_times = np.full(num_actions, float(green_times))
+        self.green_times = green_times
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+
+    def act(self, obs):
+        green_times = np.broadcast_to(self.green_times, obs.queues.shape)
+        ends = np.cumsum(green_times, axis=1)
+        t = np.mod(obs.time - self.offsets, ends[:, -1])
+        return (t[:, None] >= ends).sum(axis=1).astype(np.int64)
+
+class WebsterController(FixedTimeController):
+    """
+    Fixed-time control with Webster's optimal cycle and demand-proportional greens
+
+    flows (veh/s per action, (num_actions,) or (N, num_actions)) against
+    saturation_flow (veh/s per lane) give the flow ratios y; the cycle is
+    C = (1.5 L + 5) / (1 - Y), L = lost_time per action, clipped to
+    [min_cycle, max_cycle]. Effective green C - L is split in proportion to y.
+    """
+
+    def __init__(self, flows, lanes=1, saturation_flow=0.5, lost_time=4.0,
+                 min_cycle=30.0, max_cycle=150.0, min_green=5.0):
+        flows = np.atleast_2d(np.asarray(flows, dtype=np.float64))
+        ratios = flows / (saturation_flow * np.maximum(np.asarray(lanes, dtype=np.float64), 1))
+        num_actions = flows.shape[1]
+        lost = lost_time * num_actions
+
+        y_total = ratios.sum(axis=1, keepdims=True)
+        # Oversaturated (Y >= 0.95) - longest cycle
+        cycle = np.where(y_total < 0.95, (1.5 * lost + 5) / (1 - np.minimum(y_total, 0.95)), max_cycle)
+        cycle = np.clip(cycle, max(min_cycle, lost + min_green * num_actions), max_cycle)
+
+        # No demand at all - equal splits
+        shares = np.where(y_total > 0, ratios / np.where(y_total > 0, y_total, 1), 1.0 / num_actions)
+        greens = np.maximum(shares * (cycle - lost), min_green)
+        # The slot of each action includes its lost time (yellow, clearance)
+        super().__init__(greens + lost_time, num_actions)
+        self.cycle = cycle[:, 0]
+
+class ActuatedController(Controller):
+    """
+    Vehicle-actuated control with gap-out
+
+    The current green is held for min_green, then extended while vehicles
+    keep arriving: it gaps out once no gap detector on its approach lanes
+    has seen a vehicle for gap_time seconds (the observation's gaps), and
+    maxes out at max_green. On gap-out or max-out the next action in cyclic order with vehicles waiting
+    or approaching gets the green; with no demand anywhere the green rests.
+    The default max_green matches the 31 s greens of the static 'dqn' program
+    and the fixed-time baseline.
+    """
+
+    def __init__(self, min_green=10.0, max_green=30.0, gap_time=3.0):
+        self.min_green = min_green
+        self.max_green = max_green
+        self.gap_time = gap_time
+
+    def act(self, obs):
+        rows = np.arange(len(obs.action))
+        num_actions = obs.vehicles.shape[1]
+        # During yellow the environment holds the phase anyway; aim for the longest queue
+        current = np.where(obs.action >= 0, obs.action, obs.queues.argmax(axis=1))
+
+        gap_out = obs.gaps[rows, current] >= self.gap_time
+        switch = (obs.time_in_phase >= self.min_green) & (gap_out | (obs.time_in_phase >= self.max_green))
+
+        order = (current[:, None] + 1 + np.arange(num_actions)) % num_actions
+        demand = obs.vehicles[rows[:, None], order] > 0
+        following = order[rows, demand.argmax(axis=1)]
+        following = np.where(demand.any(axis=1), following, current)
+        return np.where(switch, following, current).astype(np.int64)
+
+class MaxPressureController(Controller):
+    """
+    Max-pressure control: the green goes to the action whose movements have the
+    largest incoming-minus-downstream queue, held for at least min_green
+    """
+
+    def __init__(self, min_green=10.0):
+        self.min_green = min_green
+
+    def act(self, obs):
+        rows = np.arange(len(obs.action))
+        pressure = obs.pressure.astype(np.float64)
+        green = obs.action >= 0
+        # Ties keep the current green
+        pressure[rows[green], obs.action[green]] += 1e-6
+        best = pressure.argmax(axis=1)
+        hold = green & (obs.time_in_phase < self.min_green)
+        return np.where(hold, obs.action, best).astype(np.int64)
+
+CONTROLLERS = {
+    'fixed_time': FixedTimeController,
+    'webster': WebsterController,
+    'actuated': ActuatedController,
+    'max_pressure': MaxPressureController,
+}
+
+def make_controller(name, env=None, route_file=None, **kwargs):
+    """
+    Build a controller by name
+
+    Webster needs demand: without explicit flows they are counted from
+    route_file (default: the environment's route file) and the approach
+    lanes of env's controller view.
+    """
+    if name not in CONTROLLERS:
+        raise ValueError(f"Unknown controller '{name}', expected one of {sorted(CONTROLLERS)}")
+
+    if name == 'webster' and 'flows' not in kwargs:
+        if env is None:
+            raise ValueError("Webster control needs flows or an environment to count them from")
+        view = env.controller_view
+        kwargs['flows'] = route_flows(route_file or env.route_file, view)
+        kwargs.setdefault('lanes', view.lane_counts)
+    if name == 'fixed_time' and env is not None:
+        kwargs.setdefault('num_actions', env.controller_view.num_actions)
+    return CONTROLLERS[name](**kwargs)
@@ -3,28 +3,25 @@ import os
 import numpy as np
 import matplotlib.pyplot as plt
 from glob import glob
+from episode_logger import iter_episode_steps
+from log_index import open_log_index
 
 def analyze_training_logs(log_dir='logs'):
     """Analyze training episode logs"""
     
-    log_files = sorted(glob(os.path.join(log_dir, 'episode_*.json')))
+    index = open_log_index(log_dir)
     
-    if not log_files:
+    if len(index) == 0:
         print("No log files found")
+        index.close()
         return
     
-    episodes_data = []
-    
-    for log_file in log_files:
-        with open(log_file, 'r') as f:
-            data = json.load(f)
-            episodes_data.append(data['summary'])
-    
-    # EDITED: Extract metrics for plotting
-    avg_waiting_times = [ep['avg_waiting_time'] for ep in episodes_data]
-    avg_queue_lengths = [ep['avg_queue_length'] for ep in episodes_data]
-    phase_changes = [ep['total_phase_changes'] for ep in episodes_data]
-    total_vehicles = [ep['total_vehicles'] for ep in episodes_data]
+    # EDITED: Extract metrics for plotting straight from the summary index
+    avg_waiting_times = index.column('avg_waiting_time')
+    avg_queue_lengths = index.column('avg_queue_length')
+    phase_changes = index.column('total_phase_changes')
+    total_vehicles = index.column('total_vehicles')
+    index.close()
     
     # Create plots
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
@@ -63,7 +60,7 @@ def analyze_training_logs(log_dir='logs'):
     
     # Print statistics
     print("\n=== Training Statistics ===")
-    print(f"Total Episodes: {len(episodes_data)}")
+    print(f"Total Episodes: {len(avg_waiting_times)}")
     print(f"Avg Waiting Time: {np.mean(avg_waiting_times):.2f}s (±{np.std(avg_waiting_times):.2f})")
     print(f"Avg Queue Length: {np.mean(avg_queue_lengths):.2f} (±{np.std(avg_queue_lengths):.2f})")
     print(f"Avg Phase Changes: {np.mean(phase_changes):.1f}")
@@ -78,15 +75,9 @@ def analyze_training_logs(log_dir='logs'):
 def analyze_vehicle_types(log_dir='logs'):
     """Analyze vehicle type distribution and waiting times"""
     
-    log_files = sorted(glob(os.path.join(log_dir, 'episode_*.json')))
-    
-    vehicle_totals = {'passenger': 0, 'emergency': 0, 'bus': 0, 'truck': 0}
-    
-    for log_file in log_files:
-        with open(log_file, 'r') as f:
-            data = json.load(f)
-            for vtype, count in data['summary']['vehicles_passed'].items():
-                vehicle_totals[vtype] += count
+    index = open_log_index(log_dir)
+    vehicle_totals = index.vehicle_totals()
+    index.close()
     
     # EDITED: Create pie chart for vehicle distribution
     plt.figure(figsize=(8, 8))
@@ -134,12 +125,61 @@ def analyze_test_results(test_dir='test_logs'):
     print(f"  Avg Reward: {np.mean(avg_rewards):.1f}")
     print(f"  Avg Waiting Time: {np.mean(avg_waiting_times):.2f}s")
 
+def analyze_episode_steps(log_dir='logs', episode=-1, output_file='episode_timeline.png'):
+    """Plot the per-step timeline of one episode (default: most recent)"""
+    
+    step_files = sorted(glob(os.path.join(log_dir, 'episode_*.steps.npy')))
+    
+    if not step_files:
+        print("No step logs found")
+        return
+    
+    # EDITED: Only this episode's chunks are read, never the whole log history
+    times, waiting, queues, phases = [], [], [], []
+    for chunk in iter_episode_steps(step_files[episode]):
+        times.append(chunk['time'])
+        waiting.append(chunk['waiting_time'])
+        queues.append(chunk['queue_length'])
+        phases.append(chunk['phase'])
+    
+    if not times:
+        print("Step log is empty")
+        return
+    
+    times = np.concatenate(times)
+    waiting = np.concatenate(waiting)
+    queues = np.concatenate(queues)
+    phases = np.concatenate(phases)
+    
+    fig, axes = plt.subplots(2, 1, figsize=(14, 8), sharex=True)
+    
+    axes[0].plot(times, waiting, 'b-', linewidth=1)
+    axes[0].set_ylabel('Waiting Time (s)')
+    axes[0].set_title(f'Episode Timeline ({os.path.basename(step_files[episode])})')
+    axes[0].grid(True, alpha=0.3)
+    
+    axes[1].plot(times, queues, 'r-', linewidth=1)
+    axes[1].set_xlabel('Simulation Time (s)')
+    axes[1].set_ylabel('Queue Length')
+    axes[1].grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    print(f"\nEpisode timeline saved to {output_file}")
+    
+    print("\n=== Episode Step Statistics ===")
+    print(f"Steps: {len(times)} | Simulated time: {times[-1]:.0f}s")
+    print(f"Max Waiting Time: {waiting.max():.2f}s | Max Queue Length: {queues.max():.1f}")
+    print(f"Phase Changes: {int(np.count_nonzero(np.diff(phases)))}")
+
 def export_csv_summary(log_dir='logs', output_file='training_summary.csv'):
     """Export training summary to CSV for external analysis"""
     
     import csv
     
-    log_files = sorted(glob(os.path.join(log_dir, 'episode_*.json')))
+    index = open_log_index(log_dir)
+    summaries = index.summaries()
+    index.close()
     
     with open(output_file, 'w', newline='') as csvfile:
         fieldnames = ['episode', 'avg_waiting_time', 'avg_queue_length', 
@@ -147,20 +187,16 @@ def export_csv_summary(log_dir='logs', output_file='training_summary.csv'):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         
-        for idx, log_file in enumerate(log_files):
-            with open(log_file, 'r') as f:
-                data = json.load(f)
-                summary = data['summary']
-                
-                row = {
-                    'episode': idx + 1,
-                    'avg_waiting_time': summary['avg_waiting_time'],
-                    'avg_queue_length': summary['avg_queue_length'],
-                    'phase_changes': summary['total_phase_changes'],
-                    'total_vehicles': summary['total_vehicles'],
-                    **summary['vehicles_passed']
-                }
-                writer.writerow(row)
+        for idx, summary in enumerate(summaries):
+            row = {
+                'episode': idx + 1,
+                'avg_waiting_time': summary['avg_waiting_time'],
+                'avg_queue_length': summary['avg_queue_length'],
+                'phase_changes': summary['total_phase_changes'],
+                'total_vehicles': summary['total_vehicles'],
+                **summary['vehicles_passed']
+            }
+            writer.writerow(row)
     
     print(f"\nCSV summary exported to {output_file}")
 
@@ -172,6 +208,7 @@ if __name__ == "__main__":
     if os.path.exists('test_logs'):
         analyze_test_results()
     
+    analyze_episode_steps()
     export_csv_summary()
     
     print("\nAnalysis complete!")
\ No newline at end of file
@@ -2,103 +2,181 @@ import xml.etree.ElementTree as ET
 import random
 import numpy as np
 
+# Vehicle types as written to the route file
+VTYPES = [
+    {'id': 'passenger', 'accel': '2.6', 'decel': '4.5', 'sigma': '0.5', 'length': '5',
+     'minGap': '2.5', 'maxSpeed': '13.89', 'guiShape': 'passenger'},
+    {'id': 'emergency', 'accel': '3.0', 'decel': '5.0', 'sigma': '0.3', 'length': '7',
+     'minGap': '2.5', 'maxSpeed': '20', 'guiShape': 'emergency', 'color': '1,0,0'},
+    {'id': 'bus', 'accel': '1.8', 'decel': '4.0', 'sigma': '0.5', 'length': '12',
+     'minGap': '3', 'maxSpeed': '11.11', 'guiShape': 'bus'},
+    {'id': 'truck', 'accel': '2.0', 'decel': '4.0', 'sigma': '0.5', 'length': '10',
+     'minGap': '3', 'maxSpeed': '11.11', 'guiShape': 'truck'},
+]
+
+# Route definitions (all 12 paths through the intersection)
+ROUTE_DEFS = [
+    ('n_s', 'N2TL TL2S'), ('n_e', 'N2TL TL2E'), ('n_w', 'N2TL TL2W'),
+    ('s_n', 'S2TL TL2N'), ('s_e', 'S2TL TL2E'), ('s_w', 'S2TL TL2W'),
+    ('e_w', 'E2TL TL2W'), ('e_n', 'E2TL TL2N'), ('e_s', 'E2TL TL2S'),
+    ('w_e', 'W2TL TL2E'), ('w_n', 'W2TL TL2N'), ('w_s', 'W2TL TL2S')
+]
+
+VEHICLE_TYPES = [('passenger', 0.80), ('bus', 0.10), ('truck', 0.08), ('emergency', 0.02)]
+
+# Routes leaving each approach (turning movements share the approach demand equally)
+APPROACH_ROUTES = {
+    'N': ['n_s', 'n_e', 'n_w'],
+    'S': ['s_n', 's_e', 's_w'],
+    'E': ['e_w', 'e_n', 'e_s'],
+    'W': ['w_e', 'w_n', 'w_s']
+}
+
+# Vehicles per hour entering from each approach, by hour of day (0-23).
+# Peaks 7-9am and 5-7pm match the rush_hour pattern (0.4 veh/s over 4 approaches),
+# daytime matches its 0.15 veh/s off-peak rate.
+DAILY_PROFILE = [30, 20, 15, 15, 25, 60, 180, 360, 360, 135, 135, 135,
+                 135, 135, 135, 135, 180, 360, 360, 135, 100, 80, 60, 40]
+
+def _write_route_header(f):
+    """Write XML declaration, vehicle types and route definitions"""
+    f.write("<?xml version='1.0' encoding='utf-8'?>\n<routes>\n")
+    for vtype in VTYPES:
+        attrs = ' '.join(f'{key}="{value}"' for key, value in vtype.items())
+        f.write(f'    <vType {attrs} />\n')
+    for route_id, edges in ROUTE_DEFS:
+        f.write(f'    <route id="{route_id}" edges="{edges}" />\n')
+
+def _departure_times(traffic_pattern, rng, start, end, start_hour=7):
+    """Departure second of every vehicle spawned in [start, end)"""
+    t = np.arange(start, end)
+    
+    if traffic_pattern == 'rush_hour':
+        # High flow during rush hours (40% vs 15% chance per second)
+        hour = (start_hour + t // 3600) % 24  # Wraps past midnight on multi-day runs
+        rush = ((7 <= hour) & (hour < 9)) | ((17 <= hour) & (hour < 19))
+        spawn_prob = np.where(rush, 0.4, 0.15)
+        return t[rng.random(len(t)) < spawn_prob]
+    
+    if traffic_pattern == 'random':
+        # Poisson arrivals, average 0.25 vehicles per second
+        return np.repeat(t, rng.poisson(0.25, len(t)))
+    
+    if traffic_pattern == 'uniform':
+        # Constant flow rate - one vehicle every 4 seconds
+        first = start + (-start % 4)
+        return np.arange(first, end, 4)
+    
+    raise ValueError(f"Unknown traffic pattern: {traffic_pattern}")
+
 def generate_dynamic_traffic(duration=3600, output_file='traffic_dynamic.rou.xml', 
-                             traffic_pattern='rush_hour'):
+                             traffic_pattern='rush_hour', seed=None, chunk_seconds=3600, start_hour=7):
     """
     Generate dynamic traffic with varying flow rates
     
     Patterns:
-    - rush_hour: High traffic 7-9am, 5-7pm
+    - rush_hour: High traffic 7-9am, 5-7pm (simulation starts at start_hour)
     - random: Random vehicle spawning
     - uniform: Constant flow rate
-    """
     
-    routes = ET.Element('routes')
-    
-    # Vehicle types
-    ET.SubElement(routes, 'vType', id='passenger', accel='2.6', decel='4.5', sigma='0.5', 
-                  length='5', minGap='2.5', maxSpeed='13.89', guiShape='passenger')
-    ET.SubElement(routes, 'vType', id='emergency', accel='3.0', decel='5.0', sigma='0.3',
-                  length='7', minGap='2.5', maxSpeed='20', guiShape='emergency', color='1,0,0')
-    ET.SubElement(routes, 'vType', id='bus', accel='1.8', decel='4.0', sigma='0.5',
-                  length='12', minGap='3', maxSpeed='11.11', guiShape='bus')
-    ET.SubElement(routes, 'vType', id='truck', accel='2.0', decel='4.0', sigma='0.5',
-                  length='10', minGap='3', maxSpeed='11.11', guiShape='truck')
-    
-    # Route definitions
-    route_defs = [
-        ('n_s', 'N2TL TL2S'), ('n_e', 'N2TL TL2E'), ('n_w', 'N2TL TL2W'),
-        ('s_n', 'S2TL TL2N'), ('s_e', 'S2TL TL2E'), ('s_w', 'S2TL TL2W'),
-        ('e_w', 'E2TL TL2W'), ('e_n', 'E2TL TL2N'), ('e_s', 'E2TL TL2S'),
-        ('w_e', 'W2TL TL2E'), ('w_n', 'W2TL TL2N'), ('w_s', 'W2TL TL2S')
-    ]
+    Departures, routes and vehicle types are drawn with a few NumPy calls per
+    chunk_seconds window and streamed straight to output_file, so memory use
+    does not grow with duration. The same seed reproduces the same file.
+    """
     
-    for route_id, edges in route_defs:
-        ET.SubElement(routes, 'route', id=route_id, edges=edges)
+    rng = np.random.default_rng(seed)
+    route_ids = np.array([route_id for route_id, _ in ROUTE_DEFS])
+    type_ids = np.array([vtype for vtype, _ in VEHICLE_TYPES])
+    type_probs = np.array([prob for _, prob in VEHICLE_TYPES])
+    type_probs /= type_probs.sum()
     
-    # EDITED: Generate vehicles based on traffic pattern
-    vehicle_types = [('passenger', 0.80), ('bus', 0.10), ('truck', 0.08), ('emergency', 0.02)]
     veh_id = 0
     
-    if traffic_pattern == 'rush_hour':
-        # Simulate rush hour patterns
-        for t in range(0, duration, 1):
-            hour = (t // 3600) + 7  # Start from 7am
-            
-            # High flow during rush hours
-            if (7 <= hour < 9) or (17 <= hour < 19):
-                spawn_prob = 0.4  # 40% chance per second
-            else:
-                spawn_prob = 0.15  # 15% chance per second
-            
-            if random.random() < spawn_prob:
-                route = random.choice(route_defs)[0]
-                veh_type = _select_vehicle_type(vehicle_types)
-                
-                ET.SubElement(routes, 'vehicle', id=f'dyn_veh_{veh_id}', 
-                            type=veh_type, route=route, depart=str(t))
-                veh_id += 1
-    
-    elif traffic_pattern == 'random':
-        # Random spawning with Poisson distribution
-        for t in range(0, duration, 1):
-            num_vehicles = np.random.poisson(0.25)  # Average 0.25 vehicles per second
+    with open(output_file, 'w', encoding='utf-8') as f:
+        _write_route_header(f)
+        
+        # EDITED: Draw and write vehicles one time window at a time
+        for start in range(0, duration, chunk_seconds):
+            departs = _departure_times(traffic_pattern, rng, start, min(start + chunk_seconds, duration),
+                                       start_hour)
+            routes = route_ids[rng.integers(len(route_ids), size=len(departs))]
+            types = rng.choice(type_ids, size=len(departs), p=type_probs)
             
-            for _ in range(num_vehicles):
-                route = random.choice(route_defs)[0]
-                veh_type = _select_vehicle_type(vehicle_types)
-                
-                ET.SubElement(routes, 'vehicle', id=f'dyn_veh_{veh_id}', 
-                            type=veh_type, route=route, depart=str(t))
-                veh_id += 1
-    
-    elif traffic_pattern == 'uniform':
-        # Constant flow rate
-        for t in range(0, duration, 4):  # One vehicle every 4 seconds
-            route = random.choice(route_defs)[0]
-            veh_type = _select_vehicle_type(vehicle_types)
-            
-            ET.SubElement(routes, 'vehicle', id=f'dyn_veh_{veh_id}', 
-                        type=veh_type, route=route, depart=str(t))
-            veh_id += 1
-    
-    tree = ET.ElementTree(routes)
-    tree.write(output_file, encoding='utf-8', xml_declaration=True)
+            f.writelines(
+                f'    <vehicle id="dyn_veh_{veh_id + i}" type="{veh_type}" route="{route}" depart="{depart}" />\n'
+                for i, (depart, route, veh_type) in enumerate(zip(departs.tolist(), routes, types)))
+            veh_id += len(departs)
+        
+        f.write('</routes>\n')
     
     print(f"Generated {veh_id} vehicles with '{traffic_pattern}' pattern")
     print(f"Saved to {output_file}")
 
-def _select_vehicle_type(vehicle_types):
-    """Select vehicle type based on probability distribution"""
-    rand_val = random.random()
-    cumulative = 0
+def _slice_rates(rates, vtype, share):
+    """Hourly rates for one vehicle type from a total curve or a per-type dict"""
+    if isinstance(rates, dict):
+        return rates.get(vtype, [])
+    return [rate * share for rate in rates]
+
+def generate_demand_profile(profile=None, duration=86400, output_file='traffic_profile.rou.xml',
+                            start_hour=0, slice_seconds=3600, arrivals='random'):
+    """
+    Generate time-of-day demand as SUMO <flow> elements instead of single vehicles
+    
+    profile maps each approach ('N', 'E', 'S', 'W') to a piecewise-constant
+    curve of vehicles per hour, one value per slice_seconds (cycled, so 24
+    hourly values describe any number of days). A curve is either a list of
+    total rates split by the VEHICLE_TYPES shares, or a dict of per-type lists.
+    Defaults to DAILY_PROFILE on every approach.
+    
+    arrivals='random' emits per-second spawn probabilities (Bernoulli
+    arrivals), 'uniform' emits evenly spaced vehsPerHour flows. The file holds
+    one flow per slice, route and type, so its size does not depend on volume.
+    """
     
-    for vtype, prob in vehicle_types:
-        cumulative += prob
-        if rand_val < cumulative:
-            return vtype
+    if profile is None:
+        profile = {approach: DAILY_PROFILE for approach in APPROACH_ROUTES}
     
-    return 'passenger'
+    type_shares = dict(VEHICLE_TYPES)
+    num_flows = 0
+    expected_vehicles = 0.0
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        _write_route_header(f)
+        
+        # EDITED: Flows must be sorted by begin time, so write slice by slice
+        for k, begin in enumerate(range(0, duration, slice_seconds)):
+            end = min(begin + slice_seconds, duration)
+            slot = start_hour * 3600 // slice_seconds + k
+            
+            for approach, routes in APPROACH_ROUTES.items():
+                rates = profile.get(approach)
+                if not rates:
+                    continue
+                
+                for vtype, share in type_shares.items():
+                    curve = _slice_rates(rates, vtype, share)
+                    if not curve:
+                        continue
+                    per_route = curve[slot % len(curve)] / len(routes)
+                    if per_route <= 0:
+                        continue
+                    
+                    if arrivals == 'random':
+                        rate_attr = f'probability="{min(per_route / 3600, 1.0):.6f}"'
+                    else:
+                        rate_attr = f'vehsPerHour="{per_route:.3f}"'
+                    
+                    for route in routes:
+                        f.write(f'    <flow id="f{k}_{route}_{vtype}" type="{vtype}" route="{route}" '
+                                f'begin="{begin}" end="{end}" {rate_attr} />\n')
+                        num_flows += 1
+                    expected_vehicles += per_route * len(routes) * (end - begin) / 3600
+        
+        f.write('</routes>\n')
+    
+    print(f"Generated {num_flows} flows (~{expected_vehicles:.0f} vehicles over {duration}s)")
+    print(f"Saved to {output_file}")
 
 def generate_incident_scenario(output_file='traffic_incident.rou.xml'):
     """Generate traffic with simulated incident (emergency vehicles)"""
@@ -155,11 +233,17 @@ if __name__ == "__main__":
     else:
         pattern = 'rush_hour'
     
+    # Optional seed for reproducible demand
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    
     print(f"Generating dynamic traffic with pattern: {pattern}")
     
     if pattern == 'incident':
         generate_incident_scenario()
+    elif pattern == 'profile':
+        # Full 24-hour day of flows (simulation.sumocfg needs a matching end time)
+        generate_demand_profile(duration=86400)
     else:
-        generate_dynamic_traffic(duration=3600, traffic_pattern=pattern)
+        generate_dynamic_traffic(duration=3600, traffic_pattern=pattern, seed=seed)
     
-    print("\nAvailable patterns: rush_hour, random, uniform, incident")
\ No newline at end of file
+    print("\nAvailable patterns: rush_hour, random, uniform, incident, profile")
\ No newline at end of file
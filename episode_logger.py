@@ -0,0 +1,77 @@
+import os
+import queue
+import threading
+import numpy as np
+
+# One record per environment step
+STEP_DTYPE = np.dtype([
+    ('time', np.float32),          # Simulation time at the end of the step
+    ('elapsed', np.float32),       # Simulated seconds covered by the step
+    ('waiting_time', np.float32),
+    ('queue_length', np.float32),
+    ('phase', np.int8),
+])
+
+class EpisodeLogWriter:
+    """
+    Streaming per-step logger writing fixed-size record chunks on a background thread
+
+    Records are collected in a preallocated structured array. Each full chunk
+    is handed to the writer thread and appended to the file as one .npy
+    block, so memory stays bounded at chunk_size * (max_pending + 1) records
+    however long the episode runs.
+    """
+
+    def __init__(self, path, chunk_size=1024, max_pending=4):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._chunk = np.empty(chunk_size, dtype=STEP_DTYPE)
+        self._count = 0
+
+        # Bounded: append() blocks if the disk falls more than max_pending chunks behind
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._file = open(path, 'wb')
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, time, elapsed, waiting_time, queue_length, phase):
+        self._chunk[self._count] = (time, elapsed, waiting_time, queue_length, phase)
+        self._count += 1
+        if self._count == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Hand the current partial chunk to the writer thread"""
+        if self._count == 0:
+            return
+        self._pending.put(self._chunk[:self._count])
+        self._chunk = np.empty(self.chunk_size, dtype=STEP_DTYPE)
+        self._count = 0
+
+    def _write_loop(self):
+        while True:
+            chunk = self._pending.get()
+            if chunk is None:
+                break
+            np.save(self._file, chunk)
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._pending.put(None)
+        self._thread.join()
+        self._file.close()
+
+def iter_episode_steps(path):
+    """Yield the step record chunks of an episode log one at a time"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            yield np.load(f)
+
+def load_episode_steps(path):
+    """Read a whole episode log into one structured array"""
+    chunks = list(iter_episode_steps(path))
+    if not chunks:
+        return np.empty(0, dtype=STEP_DTYPE)
+    return np.concatenate(chunks)
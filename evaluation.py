@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Parallel evaluation harness - (policy x scenario x seed) runs on a process pool
+"""
+
+import csv
+import math
+import os
+import sys
+import time
+import multiprocessing as mp
+import numpy as np
+
+from controllers import CONTROLLERS, make_controller
+
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+RESULT_FIELDS = ['policy', 'scenario', 'seed', 'total_reward', 'steps', 'avg_waiting_time',
+                 'avg_queue_length', 'total_vehicles', 'avg_travel_time', 'avg_delay',
+                 'phase_changes', 'wall_time']
+
+class DQNPolicy:
+    """
+    Greedy trained DQN - a .pt path loads an exported TorchScript model
+    (inference.py), an .npz path a NumPy network or lookup table (numpy_policy.py)
+
+    Given the environment, a .pth model sizes its input from it. Every model
+    format freezes the environment's observation normalization to the
+    statistics saved with (or exported from) the model.
+    """
+
+    def __init__(self, model_path='models/traffic_dqn.pth', state_size=6, action_size=4, env=None):
+        if model_path.endswith('.pt') or model_path.endswith('.npz'):
+            if model_path.endswith('.pt'):
+                from inference import InferencePolicy
+                self.agent = InferencePolicy(model_path, max_batch=1)
+            else:
+                from numpy_policy import load_policy
+                self.agent = load_policy(model_path)
+            if env is not None:
+                env.freeze_observation_stats(self.agent.obs_stats)
+            return
+
+        from traffic_dqn_main import DQNAgent
+
+        if env is not None:
+            state_size = env.state_size
+        self.agent = DQNAgent(state_size=state_size, action_size=action_size, memory_size=1)
+        obs_stats = self.agent.load(model_path)
+        if env is not None:
+            env.freeze_observation_stats(obs_stats)
+        self.agent.epsilon = 0  # No exploration during evaluation
+
+    def act(self, state):
+        return self.agent.act(state)
+
+POLICIES = {'dqn': DQNPolicy}
+
+# Controllers set their own timing, so they run without the DQN safeguards
+CONTROLLER_ENV_KWARGS = {'min_green_duration': 0, 'emergency_override': False}
+
+def make_policy(name, env=None, route_file=None, **kwargs):
+    """DQN policy, or a baseline controller from the controllers module"""
+    if name in CONTROLLERS:
+        return make_controller(name, env=env, route_file=route_file, **kwargs)
+    if name not in POLICIES:
+        raise ValueError(f"Unknown policy '{name}', expected one of {sorted(POLICIES) + sorted(CONTROLLERS)}")
+    return POLICIES[name](env=env, **kwargs)
+
+def run_episode(policy_name, route_file, seed, policy_kwargs=None, env_kwargs=None):
+    """One evaluation episode in its own SUMO instance - returns a results row"""
+    from traffic_env import TrafficEnvironment
+
+    is_controller = policy_name in CONTROLLERS
+    env_kwargs = dict(CONTROLLER_ENV_KWARGS if is_controller else {}, **(env_kwargs or {}))
+    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', use_gui=False, seed=seed,
+                             log_dir=None, **env_kwargs)
+    policy = make_policy(policy_name, env=env, route_file=route_file, **(policy_kwargs or {}))
+
+    # Many episodes run side by side; keep each to one core. Only .pth/.pt policies load torch
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(1)
+
+    start = time.perf_counter()
+    state = env.reset(route_file=route_file)
+    total_reward = 0.0
+    steps = 0
+
+    while True:
+        if is_controller:
+            action = int(policy.act(env.controller_observation())[0])
+        else:
+            action = policy.act(state)
+        state, reward, done, info = env.step(action)
+        total_reward += reward
+        steps += 1
+        if done:
+            break
+
+    summary = env.episode_summary()
+    env.close()
+
+    return {
+        'policy': policy_name,
+        'scenario': os.path.basename(route_file) if route_file else 'default',
+        'seed': seed,
+        'total_reward': total_reward,
+        'steps': steps,
+        'avg_waiting_time': summary['avg_waiting_time'],
+        'avg_queue_length': summary['avg_queue_length'],
+        'total_vehicles': summary['total_vehicles'],
+        'avg_travel_time': summary['stats'].get('travel_time', {}).get('mean', 0.0),
+        'avg_delay': summary['stats'].get('delay', {}).get('mean', 0.0),
+        'phase_changes': summary['total_phase_changes'],
+        'wall_time': time.perf_counter() - start,
+    }
+
+def _run_job(job):
+    return run_episode(*job)
+
+def confidence_interval(values):
+    """Mean and 95% half-width (Student t) of a sample"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return math.nan, math.nan
+    mean = float(values.mean())
+    if n < 2:
+        return mean, math.nan
+    t = T_95[n - 2] if n - 1 <= len(T_95) else 1.96
+    return mean, t * float(values.std(ddof=1)) / math.sqrt(n)
+
+def generate_scenarios(patterns=('rush_hour', 'random', 'uniform'), seeds=(0,), output_dir='eval_scenarios'):
+    """Route files from dynamic_traffic_gen, one per pattern and seed (reused if present)"""
+    from dynamic_traffic_gen import generate_dynamic_traffic
+
+    os.makedirs(output_dir, exist_ok=True)
+    route_files = []
+    for pattern in patterns:
+        for seed in seeds:
+            route_file = os.path.join(output_dir, f'{pattern}_{seed}.rou.xml')
+            if not os.path.exists(route_file):
+                generate_dynamic_traffic(output_file=route_file, traffic_pattern=pattern, seed=seed)
+            route_files.append(route_file)
+    return route_files
+
+def evaluate(policies=('fixed_time', 'dqn'), scenarios=(None,), seeds=(42, 43, 44), num_workers=None,
+             policy_kwargs=None, env_kwargs=None, output_file='eval_results.csv', start_method='spawn'):
+    """
+    Run every (policy, scenario, seed) episode on a process pool and tabulate the results
+
+    policies are 'dqn' and controller names (fixed_time, webster, actuated,
+    max_pressure); scenarios are route files (None = the route file of
+    simulation.sumocfg).
+    Each job starts its own SUMO instance, so wall time shrinks with the
+    number of workers (default: all cores). Rows are written to output_file
+    as CSV and returned as a list of dicts.
+    """
+    policy_kwargs = policy_kwargs or {}
+    jobs = [(policy, scenario, seed, policy_kwargs.get(policy), env_kwargs)
+            for policy in policies for scenario in scenarios for seed in seeds]
+    num_workers = min(num_workers or os.cpu_count() or 1, len(jobs))
+
+    print(f"Evaluating {len(jobs)} episodes ({len(policies)} policies x {len(scenarios)} scenarios x "
+          f"{len(seeds)} seeds) on {num_workers} worker(s)")
+    start = time.perf_counter()
+
+    rows = []
+    with mp.get_context(start_method).Pool(num_workers) as pool:
+        for row in pool.imap_unordered(_run_job, jobs):
+            rows.append(row)
+            print(f"  [{len(rows)}/{len(jobs)}] {row['policy']:<12} {row['scenario']:<24} seed {row['seed']:<5} "
+                  f"waiting {row['avg_waiting_time']:.2f}s")
+
+    rows.sort(key=lambda row: (row['policy'], row['scenario'], row['seed']))
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+    if output_file:
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Results saved to {output_file}")
+
+    return rows
+
+def report(rows, metric='avg_waiting_time', baseline='fixed_time'):
+    """Print mean ± 95% CI per policy and scenario, and paired differences against the baseline"""
+    policies = sorted({row['policy'] for row in rows})
+    scenarios = sorted({row['scenario'] for row in rows})
+
+    print(f"\n=== {metric} (mean ± 95% CI) ===")
+    print(f"{'Policy':<14} {'Scenario':<26} {'n':>3} {'Mean':>10} {'± CI':>9}")
+    for policy in policies:
+        for scenario in scenarios + ['(all)']:
+            values = [row[metric] for row in rows if row['policy'] == policy and
+                      (scenario == '(all)' or row['scenario'] == scenario)]
+            if not values:
+                continue
+            mean, half_width = confidence_interval(values)
+            print(f"{policy:<14} {scenario:<26} {len(values):>3} {mean:>10.2f} {half_width:>9.2f}")
+
+    if baseline not in policies:
+        return
+
+    # Same scenario and seed for both policies, so differences are paired
+    by_run = {(row['policy'], row['scenario'], row['seed']): row[metric] for row in rows}
+    print(f"\n=== Paired difference vs {baseline} (negative = lower {metric}) ===")
+    for policy in policies:
+        if policy == baseline:
+            continue
+        diffs = [value - by_run[(baseline, scenario, seed)]
+                 for (name, scenario, seed), value in by_run.items()
+                 if name == policy and (baseline, scenario, seed) in by_run]
+        if not diffs:
+            continue
+        mean, half_width = confidence_interval(diffs)
+        baseline_mean = np.mean([value for (name, _, _), value in by_run.items() if name == baseline])
+        relative = 100 * mean / baseline_mean if baseline_mean else math.nan
+        print(f"{policy:<14} {mean:>+10.2f} ± {half_width:.2f} ({relative:+.1f}%) over {len(diffs)} paired runs")
+
+if __name__ == "__main__":
+
+    seeds = range(int(sys.argv[1])) if len(sys.argv) > 1 else range(5)
+    rows = evaluate(scenarios=generate_scenarios(), seeds=[42 + i for i in seeds])
+    report(rows)
@@ -0,0 +1,281 @@
+import os
+import sys
+import time
+import numpy as np
+
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("Please declare environment variable 'SUMO_HOME'")
+
+import traci.constants as tc
+
+from observation import StepObserver
+from controllers import ControllerView
+from sumo_backend import get_backend, additional_files
+from topology import load_network_index
+from online_stats import StatsAccumulator
+
+class GridTrafficEnvironment:
+    """
+    Every traffic light of a network controlled at once, one observation row per junction
+
+    TLS IDs, their incoming lanes and green phases come from the cached
+    network topology index. State is a float32 array of shape
+    (num_junctions, max_lanes + 2): halting vehicles per incoming lane
+    (zero-padded), the current green (action index, -1 during yellow) and
+    the time in phase. Rows share one layout, so a single DQNNetwork scores
+    every junction in one forward pass.
+
+    Lane and TLS values come from batched subscription results and are
+    gathered into the state with index arrays; only junctions that actually
+    switch phase issue a TraCI call in step().
+    """
+
+    TLS_VARS = [tc.TL_CURRENT_PHASE]
+    # Remaining time (s) given to a green when it is set, as in TrafficEnvironment - netconvert's
+    # static programs would otherwise move on after their own durations
+    GREEN_HOLD = 86400
+
+    def __init__(self, net_file, config_file, use_gui=False, backend=None, seed=None,
+                 decision_interval=5, min_green_duration=10):
+        self.net_file = net_file
+        self.config_file = config_file
+        self.use_gui = use_gui
+        self.seed = seed
+        self.sumo = get_backend(backend, use_gui)
+        self.decision_interval = decision_interval
+        self.min_green_duration = min_green_duration
+
+        self.topology = load_network_index(net_file)
+        self._build_tables(self.topology)
+        self.observer = StepObserver(self.lanes, self.sumo, edges=self.topology.edges)
+        observer_file = f'{net_file}.observer.add.xml'
+        self.observer.write_additional(observer_file)
+        self.additional_files = additional_files(config_file, [observer_file])
+        self.controller_view = ControllerView(
+            self.topology, [(tls_id, self.program_ids[j], self.green_phases[j].tolist())
+                            for j, tls_id in enumerate(self.tls_ids)], self.lanes)
+        self.reset_time = 0.0
+
+        self.stats = StatsAccumulator()
+        self.run_stats = StatsAccumulator()
+        self.episode_done = False
+
+    @property
+    def num_junctions(self):
+        return len(self.tls_ids)
+
+    @property
+    def state_size(self):
+        return self.lane_index.shape[1] + 2
+
+    @property
+    def action_size(self):
+        return self.green_phases.shape[1]
+
+    def _sumo_args(self):
+        args = ['-c', self.config_file, '--no-warnings', '--no-step-log', '--time-to-teleport', '-1']
+        if self.seed is not None:
+            args += ['--seed', str(self.seed)]
+        return args + ['-a', ','.join(self.additional_files)]
+
+    def _build_tables(self, topology):
+        """Lay out TLS IDs, incoming lanes and green phases as gather tables"""
+        self.tls_ids = topology.tls_ids
+        if not self.tls_ids:
+            raise Exception("No traffic lights found in network")
+
+        junction_lanes, junction_greens, num_phases = [], [], []
+        # Program the phase tables come from (the one SUMO starts with)
+        self.program_ids = []
+        for tls_id in self.tls_ids:
+            tls = topology[tls_id]
+            self.program_ids.append(next(iter(tls.programs)))
+            states = tls.program()
+            junction_lanes.append(tls.lanes)
+            junction_greens.append([i for i, state in enumerate(states)
+                                    if 'y' not in state and 'G' in state.upper()])
+            num_phases.append(len(states))
+
+        self.lanes = [lane for lanes in junction_lanes for lane in lanes]
+        max_lanes = max(len(lanes) for lanes in junction_lanes)
+        max_actions = max(len(greens) for greens in junction_greens)
+
+        # lane_index[j, k]: position of junction j's k-th lane in self.lanes (-1 = padding)
+        self.lane_index = np.full((self.num_junctions, max_lanes), -1, dtype=np.int64)
+        # green_phases[j, a]: phase for action a (junctions with fewer greens cycle through theirs)
+        self.green_phases = np.empty((self.num_junctions, max_actions), dtype=np.int64)
+        # phase_action[j, p]: action index of phase p (-1 for yellow/red phases)
+        self.phase_action = np.full((self.num_junctions, max(num_phases)), -1, dtype=np.int64)
+
+        offset = 0
+        for j, (lanes, greens) in enumerate(zip(junction_lanes, junction_greens)):
+            self.lane_index[j, :len(lanes)] = np.arange(offset, offset + len(lanes))
+            offset += len(lanes)
+            self.green_phases[j] = [greens[a % len(greens)] for a in range(max_actions)]
+            self.phase_action[j, greens] = np.arange(len(greens))
+
+        self.lane_mask = self.lane_index >= 0
+        self.lane_owner = np.repeat(np.arange(self.num_junctions), self.lane_mask.sum(axis=1))
+
+        print(f"Grid: {self.num_junctions} traffic lights, {len(self.lanes)} incoming lanes, "
+              f"{max_actions} green phases max")
+
+    def start_simulation(self):
+        if self.sumo.isLoaded():
+            self.sumo.load(self._sumo_args())
+        else:
+            self.sumo.start(['sumo-gui' if self.use_gui else 'sumo'] + self._sumo_args())
+
+        for tls_id in self.tls_ids:
+            self.sumo.trafficlight.subscribe(tls_id, self.TLS_VARS)
+        self.observer.subscribe()
+
+        # Start every junction in its first green and hold it until an action changes it
+        for j, tls_id in enumerate(self.tls_ids):
+            self._set_green(tls_id, int(self.green_phases[j, 0]))
+        self.phases = self.green_phases[:, 0].copy()
+        self.time_in_phase = np.zeros(self.num_junctions, dtype=np.float32)
+
+    def _set_green(self, tls_id, phase):
+        self.sumo.trafficlight.setPhase(tls_id, phase)
+        self.sumo.trafficlight.setPhaseDuration(tls_id, self.GREEN_HOLD)
+
+    def _read_phases(self):
+        results = self.sumo.trafficlight.getAllSubscriptionResults()
+        return np.fromiter((results[tls_id][tc.TL_CURRENT_PHASE] for tls_id in self.tls_ids),
+                           dtype=np.int64, count=self.num_junctions)
+
+    def _junction_sums(self, lane_values):
+        """Sum a per-lane array into one value per junction"""
+        return np.bincount(self.lane_owner, weights=lane_values, minlength=self.num_junctions)
+
+    def get_state(self):
+        lanes = self.lane_index.shape[1]
+        state = np.zeros((self.num_junctions, lanes + 2), dtype=np.float32)
+        state[:, :lanes][self.lane_mask] = self.observer.halting
+        state[:, lanes] = self.phase_action[np.arange(self.num_junctions), self.phases]
+        state[:, lanes + 1] = self.time_in_phase
+        return state
+
+    def controller_observation(self):
+        """JunctionObservation (one row per junction) for the controllers module"""
+        actions = self.phase_action[np.arange(self.num_junctions), self.phases]
+        return self.controller_view.observe(self.observer, actions, self.time_in_phase)
+
+    def step(self, actions):
+        """
+        Apply one action per junction and advance decision_interval seconds
+
+        Returns (states, rewards, done, info) with states (num_junctions,
+        state_size) and per-junction rewards: negative vehicle-seconds spent
+        halting on the junction's incoming lanes during the interval.
+        """
+        if not self.sumo.isLoaded():
+            raise Exception("Simulation not started. Call reset() first.")
+
+        rows = np.arange(self.num_junctions)
+        targets = self.green_phases[rows, np.asarray(actions)]
+        # Never cut a yellow short; otherwise the same min-green rule as TrafficEnvironment
+        in_green = self.phase_action[rows, self.phases] >= 0
+        switch = (targets != self.phases) & in_green & (self.time_in_phase >= self.min_green_duration)
+        for j in np.flatnonzero(switch):
+            self._set_green(self.tls_ids[j], int(targets[j]))
+
+        start_time = self.observer.time
+        lane_halting = self.observer.advance(self.decision_interval)
+        elapsed = self.observer.time - start_time
+
+        # Greens are held, so only a yellow left by the program can have moved on by itself
+        phases = self._read_phases()
+        self.time_in_phase += elapsed
+        self.time_in_phase[switch | (phases != self.phases)] = elapsed
+        self.phases = phases
+
+        # Waiting time incurred during the interval, per junction
+        rewards = (-self._junction_sums(lane_halting)).astype(np.float32)
+
+        self.stats.update('waiting_time', float(self.observer.waiting.sum()))
+        if elapsed:
+            self.stats.update('queue_length', float(lane_halting.sum()) / elapsed)
+        for veh_type, travel_time, delay in self.observer.pop_arrivals():
+            self.stats.update('travel_time', travel_time)
+            self.stats.update('delay', delay)
+            self.stats.update(f'vtype/{veh_type}/travel_time', travel_time)
+
+        done = self.observer.min_expected <= 0
+        self.episode_done = done
+        info = {'elapsed': elapsed, 'time': self.observer.time, 'phase_changes': int(switch.sum())}
+        return self.get_state(), rewards, done, info
+
+    def reset(self):
+        if self.episode_done:
+            self.run_stats.merge(self.stats)
+        self.stats = StatsAccumulator()
+        self.episode_done = False
+
+        start = time.perf_counter()
+        self.start_simulation()
+        self.reset_time = time.perf_counter() - start
+        return self.get_state()
+
+    def episode_summary(self):
+        return {
+            'avg_waiting_time': self.stats['waiting_time'].mean,
+            'avg_queue_length': self.stats['queue_length'].mean,
+            'junctions': self.num_junctions,
+            'reset_time': self.reset_time,
+            'stats': self.stats.summary()
+        }
+
+    def close(self):
+        if self.sumo.isLoaded():
+            self.sumo.close()
+        if self.episode_done:
+            self.run_stats.merge(self.stats)
+            self.episode_done = False
+
+def train_grid_agent(net_file, config_file, episodes=100, backend=None, prioritized=False,
+                     model_path='models/grid_dqn.pth'):
+    """Train one DQN shared by all junctions - every junction contributes a transition per step"""
+    from traffic_dqn_main import DQNAgent, print_run_stats
+
+    env = GridTrafficEnvironment(net_file, config_file, backend=backend)
+    agent = DQNAgent(state_size=env.state_size, action_size=env.action_size, prioritized=prioritized)
+
+    for episode in range(episodes):
+        states = env.reset()
+        total_reward = 0
+        steps = 0
+
+        while True:
+            actions = agent.act(states)
+            next_states, rewards, done, info = env.step(actions)
+
+            agent.remember_batch(states, actions, rewards, next_states,
+                                 np.full(env.num_junctions, done, dtype=np.float32))
+            states = next_states
+            total_reward += float(rewards.sum())
+            steps += 1
+
+            agent.replay()
+
+            if done:
+                break
+
+        agent.update_target_model()
+
+        if agent.epsilon > agent.epsilon_min:
+            agent.epsilon *= agent.epsilon_decay
+
+        if episode % 10 == 0:
+            print(f"Ep {episode}/{episodes} | Junctions: {env.num_junctions} | Reward: {total_reward:.1f} | "
+                  f"ε: {agent.epsilon:.3f} | Steps: {steps} | Reset: {env.reset_time * 1000:.0f}ms")
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    agent.save(model_path)
+    env.close()
+    print(f"Training complete. Model saved to {model_path}")
+    print_run_stats(env.run_stats)
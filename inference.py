@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Low-latency DQN inference - TorchScript (optionally int8) export and a greedy policy on top
+"""
+
+import json
+import os
+import sys
+import numpy as np
+import torch
+import torch.nn as nn
+
+from online_stats import VectorRunningStats
+
+def exported_path(model_path, quantize=False):
+    """models/traffic_dqn.pth -> models/traffic_dqn.pt (or models/traffic_dqn_int8.pt)"""
+    return os.path.splitext(model_path)[0] + ('_int8' if quantize else '') + '.pt'
+
+def export_model(model_path='models/traffic_dqn.pth', state_size=None, action_size=None, quantize=False,
+                 output_path=None):
+    """
+    Export a saved DQNNetwork checkpoint as a frozen TorchScript module
+
+    With quantize=True the Linear layers are dynamically quantized to int8
+    first (weights int8, activations quantized on the fly). State and action
+    sizes (default: read from the weights) and the observation statistics
+    saved with the model are stored in the file, so InferencePolicy needs
+    only the path. Returns the output path.
+    """
+    from traffic_dqn_main import DQNNetwork, load_checkpoint
+
+    state_dict, obs_stats = load_checkpoint(model_path)
+    state_size = state_size or state_dict['fc1.weight'].shape[1]
+    action_size = action_size or state_dict['fc4.weight'].shape[0]
+    model = DQNNetwork(state_size, action_size)
+    model.load_state_dict(state_dict)
+    model.eval()
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    with torch.no_grad():
+        module = torch.jit.trace(model, torch.zeros(1, state_size))
+    # Freezing inlines the float weights as constants; quantized packed weights stay as they are
+    if not quantize:
+        module = torch.jit.freeze(module)
+
+    output_path = output_path or exported_path(model_path, quantize)
+    meta = {'state_size': state_size, 'action_size': action_size, 'quantized': quantize, 'source': model_path,
+            'obs_stats': None}
+    if obs_stats is not None:
+        meta['obs_stats'] = {key: np.asarray(value).tolist() for key, value in obs_stats.state_dict().items()}
+    torch.jit.save(module, output_path, _extra_files={'meta.json': json.dumps(meta)})
+    return output_path
+
+class InferencePolicy:
+    """
+    Greedy actions from an exported TorchScript model
+
+    obs_stats holds the observation statistics the model was trained with
+    (VectorRunningStats, None for the legacy 6-value state). States are copied into a preallocated input tensor (its NumPy view), so a
+    call allocates nothing but the output; the forward pass runs under
+    torch.inference_mode. act() takes one state (returns an int) or a
+    (batch, state_size) array (returns an int64 array); batches larger than
+    max_batch grow the buffer once.
+    """
+
+    def __init__(self, path, max_batch=64, num_threads=None, warmup=3):
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        extra_files = {'meta.json': ''}
+        self.model = torch.jit.load(path, map_location='cpu', _extra_files=extra_files)
+        self.model.eval()
+        meta = json.loads(extra_files['meta.json'])
+        self.state_size = meta['state_size']
+        self.action_size = meta['action_size']
+        self.quantized = meta['quantized']
+        self.obs_stats = None
+        if meta.get('obs_stats') is not None:
+            self.obs_stats = VectorRunningStats.from_state_dict(meta['obs_stats'])
+
+        self._allocate(max_batch)
+        # The TorchScript executor specializes the graph during the first calls
+        for _ in range(warmup):
+            self.q_values(np.zeros(self.state_size, dtype=np.float32))
+            self.q_values(np.zeros((max_batch, self.state_size), dtype=np.float32))
+
+    def _allocate(self, max_batch):
+        self.max_batch = max_batch
+        self._input = torch.zeros(max_batch, self.state_size)
+        self._input_np = self._input.numpy()  # Shares memory with _input
+
+    def q_values(self, state):
+        """Q-values as a (batch, action_size) tensor - one row for a single state"""
+        state = np.asarray(state)
+        rows = 1 if state.ndim == 1 else len(state)
+        if rows > self.max_batch:
+            self._allocate(rows)
+
+        self._input_np[:rows] = state
+        with torch.inference_mode():
+            return self.model(self._input[:rows])
+
+    def act(self, state):
+        q_values = self.q_values(state)
+        if np.ndim(state) == 1:
+            return int(q_values[0].argmax())
+        return q_values.argmax(1).numpy()
+
+if __name__ == "__main__":
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'models/traffic_dqn.pth'
+    if not os.path.exists(model_path):
+        sys.exit(f"ERROR: No trained model found at {model_path}. Please train first.")
+
+    for quantize in (False, True):
+        print(f"Exported {export_model(model_path, quantize=quantize)}")
@@ -0,0 +1,90 @@
+import json
+import os
+import sqlite3
+from glob import glob
+
+VEHICLE_TYPES = ('passenger', 'emergency', 'bus', 'truck')
+
+class LogIndex:
+    """
+    Persistent SQLite index of episode summaries in a log directory
+
+    Environments add each episode as it is saved, and sync() indexes any
+    episode JSON files it has not seen yet. Analysis then queries the index
+    instead of re-opening every episode file. WAL mode lets parallel training
+    workers write to the same index.
+    """
+
+    def __init__(self, log_dir='logs', db_name='index.sqlite'):
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.conn = sqlite3.connect(os.path.join(log_dir, db_name), timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS episodes (
+                name TEXT PRIMARY KEY,
+                avg_waiting_time REAL,
+                avg_queue_length REAL,
+                total_phase_changes INTEGER,
+                total_vehicles INTEGER,
+                passenger INTEGER,
+                emergency INTEGER,
+                bus INTEGER,
+                truck INTEGER,
+                summary TEXT
+            )""")
+        self.conn.commit()
+
+    def add_episode(self, name, summary):
+        passed = summary['vehicles_passed']
+        self.conn.execute(
+            'INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (name, summary['avg_waiting_time'], summary['avg_queue_length'],
+             summary['total_phase_changes'], summary['total_vehicles'],
+             *(passed.get(vtype, 0) for vtype in VEHICLE_TYPES),
+             json.dumps(summary)))
+        self.conn.commit()
+
+    def sync(self):
+        """Index episode files not yet in the table - only new files are parsed"""
+        known = {name for (name,) in self.conn.execute('SELECT name FROM episodes')}
+
+        added = 0
+        for log_file in glob(os.path.join(self.log_dir, 'episode_*.json')):
+            name = os.path.basename(log_file)[:-len('.json')]
+            if name in known:
+                continue
+            with open(log_file, 'r') as f:
+                self.add_episode(name, json.load(f)['summary'])
+            added += 1
+        return added
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM episodes').fetchone()[0]
+
+    def summaries(self):
+        """All episode summaries in chronological (file name) order"""
+        rows = self.conn.execute('SELECT summary FROM episodes ORDER BY name')
+        return [json.loads(summary) for (summary,) in rows]
+
+    def column(self, name):
+        """One metric column for every episode, in chronological order"""
+        if name not in ('avg_waiting_time', 'avg_queue_length', 'total_phase_changes',
+                        'total_vehicles') + VEHICLE_TYPES:
+            raise ValueError(f"Unknown column: {name}")
+        return [value for (value,) in self.conn.execute(f'SELECT {name} FROM episodes ORDER BY name')]
+
+    def vehicle_totals(self):
+        row = self.conn.execute(
+            'SELECT ' + ', '.join(f'COALESCE(SUM({vtype}), 0)' for vtype in VEHICLE_TYPES) +
+            ' FROM episodes').fetchone()
+        return dict(zip(VEHICLE_TYPES, row))
+
+    def close(self):
+        self.conn.close()
+
+def open_log_index(log_dir='logs'):
+    """Open the index for log_dir and pick up any episodes written without it"""
+    index = LogIndex(log_dir)
+    index.sync()
+    return index
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Torch-free DQN controllers - NumPy forward pass and a discretized lookup table
+
+export_numpy() (needs torch, run once) turns the DQNNetwork weights into an
+.npz file; NumpyPolicy and LookupTablePolicy then only import NumPy, so a
+controller process starts in milliseconds.
+"""
+
+import os
+import sys
+import numpy as np
+
+from online_stats import VectorRunningStats
+
+# Bins of the legacy 6-value state [queue_N, queue_E, queue_S, queue_W, current_phase, time_in_phase]:
+# upper edges per feature and the representative value each bin is evaluated at
+QUEUE_EDGES = (1, 2, 3, 5, 8, 12, 20)
+QUEUE_CENTERS = (0, 1, 2, 3.5, 6, 9.5, 15.5, 25)
+PHASE_EDGES = (1, 3, 5)
+PHASE_CENTERS = (0, 2, 4, 6)
+TIME_EDGES = (5, 10, 15, 20, 30, 45, 60)
+TIME_CENTERS = (2.5, 7.5, 12.5, 17.5, 25, 37.5, 52.5, 75)
+LEGACY_BINS = [(QUEUE_EDGES, QUEUE_CENTERS)] * 4 + [(PHASE_EDGES, PHASE_CENTERS), (TIME_EDGES, TIME_CENTERS)]
+
+def numpy_path(model_path, table=False):
+    """models/traffic_dqn.pth -> models/traffic_dqn.npz (or models/traffic_dqn_lut.npz)"""
+    return os.path.splitext(model_path)[0] + ('_lut' if table else '') + '.npz'
+
+def _save_obs_stats(arrays, obs_stats):
+    if obs_stats is not None:
+        arrays.update({f'obs_{key}': value for key, value in obs_stats.state_dict().items()})
+
+def _load_obs_stats(data):
+    """Observation statistics stored by _save_obs_stats, or None"""
+    if 'obs_mean' not in data.files:
+        return None
+    return VectorRunningStats.from_state_dict({key: data[f'obs_{key}'] for key in ('count', 'mean', 'm2')})
+
+def export_numpy(model_path='models/traffic_dqn.pth', output_path=None):
+    """
+    Save the Linear layers of a DQNNetwork checkpoint as float32 NumPy arrays
+
+    The observation statistics saved with the model go into the same file.
+    """
+    from traffic_dqn_main import load_checkpoint
+
+    state_dict, obs_stats = load_checkpoint(model_path)
+    layers = sorted({key.split('.')[0] for key in state_dict}, key=lambda name: int(name[2:]))
+    arrays = {}
+    for i, layer in enumerate(layers):
+        # Stored as (in, out) so the forward pass is x @ W + b
+        arrays[f'w{i}'] = state_dict[f'{layer}.weight'].numpy().T.astype(np.float32)
+        arrays[f'b{i}'] = state_dict[f'{layer}.bias'].numpy().astype(np.float32)
+    _save_obs_stats(arrays, obs_stats)
+
+    output_path = output_path or numpy_path(model_path)
+    np.savez(output_path, **arrays)
+    return output_path
+
+class NumpyPolicy:
+    """
+    Greedy DQN in pure NumPy - ReLU MLP from an export_numpy() file
+
+    obs_stats holds the observation statistics the model was trained with
+    (None for the legacy 6-value state).
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            num_layers = len([key for key in data.files if key.startswith('w')])
+            self.weights = [data[f'w{i}'] for i in range(num_layers)]
+            self.biases = [data[f'b{i}'] for i in range(num_layers)]
+            self.obs_stats = _load_obs_stats(data)
+        self.state_size = self.weights[0].shape[0]
+        self.action_size = self.weights[-1].shape[1]
+
+    def q_values(self, states):
+        x = np.atleast_2d(np.asarray(states, dtype=np.float32))
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.maximum(x @ weight + bias, 0)
+        return x @ self.weights[-1] + self.biases[-1]
+
+    def act(self, state):
+        actions = self.q_values(state).argmax(1)
+        return int(actions[0]) if np.ndim(state) == 1 else actions
+
+class LookupTablePolicy:
+    """
+    Precomputed action per cell of a discretized state space
+
+    Every feature is binned by its upper edges; the table holds the action
+    of the source policy at the representative point of each cell, so a
+    decision is one searchsorted per feature and one index. With the legacy
+    bins the table is 8^4 * 4 * 8 = 131072 uint8 entries (128 KB).
+    """
+
+    def __init__(self, edges, table, obs_stats=None):
+        self.edges = [np.asarray(e, dtype=np.float32) for e in edges]
+        self.table = table
+        self.state_size = len(self.edges)
+        self.obs_stats = obs_stats
+
+    @classmethod
+    def compile(cls, policy, bins=LEGACY_BINS, batch_size=65536):
+        """Evaluate policy (anything with q_values) at every cell's representative point"""
+        shape = tuple(len(centers) for _, centers in bins)
+        grid = np.stack(np.meshgrid(*[np.asarray(c, dtype=np.float32) for _, c in bins], indexing='ij'), axis=-1)
+        grid = grid.reshape(-1, len(bins))
+
+        table = np.empty(len(grid), dtype=np.uint8)
+        for start in range(0, len(grid), batch_size):
+            table[start:start + batch_size] = policy.q_values(grid[start:start + batch_size]).argmax(1)
+        return cls([edges for edges, _ in bins], table.reshape(shape), getattr(policy, 'obs_stats', None))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls([data[f'edges{i}'] for i in range(data['table'].ndim)], data['table'],
+                       _load_obs_stats(data))
+
+    def save(self, path):
+        arrays = {f'edges{i}': edges for i, edges in enumerate(self.edges)}
+        _save_obs_stats(arrays, self.obs_stats)
+        np.savez(path, table=self.table, **arrays)
+
+    def cells(self, states):
+        states = np.atleast_2d(np.asarray(states, dtype=np.float32))
+        return tuple(np.searchsorted(edges, states[:, i], side='right') for i, edges in enumerate(self.edges))
+
+    def act(self, state):
+        actions = self.table[self.cells(state)]
+        return int(actions[0]) if np.ndim(state) == 1 else actions.astype(np.int64)
+
+def load_policy(path):
+    """NumpyPolicy or LookupTablePolicy, depending on the file"""
+    with np.load(path) as data:
+        is_table = 'table' in data.files
+    return LookupTablePolicy.load(path) if is_table else NumpyPolicy(path)
+
+def sample_states(num_states, seed=0):
+    """Legacy 6-value states: queues per direction, current green phase, time in phase"""
+    rng = np.random.default_rng(seed)
+    states = np.empty((num_states, 6), dtype=np.float32)
+    states[:, :4] = rng.poisson(rng.uniform(0, 15, (num_states, 1)), (num_states, 4))
+    states[:, 4] = rng.choice(PHASE_CENTERS, num_states)
+    states[:, 5] = rng.uniform(0, 90, num_states)
+    return states
+
+def agreement_report(reference_actions, policies, states):
+    """Print how often each policy picks the reference action, overall and per current phase"""
+    phases = states[:, 4]
+    print(f"{'Policy':<10} {'Overall':>9} " + " ".join(f"{f'Phase {p}':>9}" for p in PHASE_CENTERS))
+    for name, policy in policies.items():
+        match = policy.act(states) == reference_actions
+        per_phase = " ".join(f"{100 * match[phases == p].mean():>8.2f}%" for p in PHASE_CENTERS)
+        print(f"{name:<10} {100 * match.mean():>8.2f}% {per_phase}")
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'models/traffic_dqn.pth'
+    if not os.path.exists(model_path):
+        sys.exit(f"ERROR: No trained model found at {model_path}. Please train first.")
+
+    import torch
+    from traffic_dqn_main import DQNNetwork, load_checkpoint
+
+    network = NumpyPolicy(export_numpy(model_path))
+    table = LookupTablePolicy.compile(network)
+    table.save(numpy_path(model_path, table=True))
+    print(f"Exported {numpy_path(model_path)} and {numpy_path(model_path, table=True)} "
+          f"({table.table.nbytes // 1024} KB table)")
+
+    model = DQNNetwork(network.state_size, network.action_size)
+    model.load_state_dict(load_checkpoint(model_path)[0])
+    model.eval()
+
+    states = sample_states(100000)
+    with torch.no_grad():
+        reference = model(torch.from_numpy(states)).numpy()
+    print(f"Max |dQ| NumPy vs torch: {np.abs(network.q_values(states) - reference).max():.2e}\n")
+    agreement_report(reference.argmax(1), {'numpy': network, 'table': table}, states)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+import traci
+import traci.constants as tc
+
+from online_stats import VectorRunningStats
+
+def write_additional(root, path):
+    """Write an <additional> element tree, renamed into place so parallel workers never load a partial file"""
+    tmp_file = f'{path}.{os.getpid()}.tmp'
+    ET.ElementTree(root).write(tmp_file, encoding='utf-8', xml_declaration=True)
+    os.replace(tmp_file, path)
+
+class VehicleRegistry:
+    """
+    Vehicles in the network, registered on departure: ID -> (type, depart time, route, free-flow time)
+
+    Arrived vehicles are gone from SUMO, so their type and depart time are
+    resolved here in O(1). The free-flow travel time (route edge lengths at
+    min(speed limit, vType max speed)) is computed once per (route, type)
+    from the network index; named routes cost one route.getEdges call each,
+    only vehicle-specific routes (trips) cost one call per vehicle.
+    """
+
+    def __init__(self, sumo, edges=None):
+        self.sumo = sumo
+        self.edges = edges or {}
+        self.vehicles = {}
+        self._free_flow = {}
+        self._max_speed = {}
+
+    def __len__(self):
+        return len(self.vehicles)
+
+    def __contains__(self, veh_id):
+        return veh_id in self.vehicles
+
+    def keys(self):
+        return self.vehicles.keys()
+
+    def type_of(self, veh_id, default=None):
+        entry = self.vehicles.get(veh_id)
+        return entry[0] if entry is not None else default
+
+    def add(self, veh_id, veh_type, depart_time, route_id):
+        self.vehicles[veh_id] = (veh_type, depart_time, route_id, self.free_flow_time(route_id, veh_type))
+
+    def remove(self, veh_id, time):
+        """Unregister an arrived vehicle - returns (type, travel time, delay) or None if unknown"""
+        entry = self.vehicles.pop(veh_id, None)
+        if entry is None:
+            return None
+        veh_type, depart_time, _, free_flow = entry
+        travel_time = time - depart_time
+        return veh_type, travel_time, max(0.0, travel_time - free_flow)
+
+    def free_flow_time(self, route_id, veh_type):
+        key = (route_id, veh_type)
+        free_flow = self._free_flow.get(key)
+        if free_flow is None:
+            max_speed = self._max_speed.get(veh_type)
+            if max_speed is None:
+                max_speed = self._max_speed[veh_type] = self.sumo.vehicletype.getMaxSpeed(veh_type)
+            free_flow = 0.0
+            for edge in self.sumo.route.getEdges(route_id):
+                if edge in self.edges:
+                    length, speed = self.edges[edge]
+                    free_flow += length / min(speed, max_speed)
+            # Vehicle-specific routes ('!veh_1') are never shared, so do not keep them
+            if not route_id.startswith('!'):
+                self._free_flow[key] = free_flow
+        return free_flow
+
+class StepObserver:
+    """Per-step simulation readings collected through TraCI subscriptions
+
+    Lane and simulation variables are subscribed once when the simulation
+    starts and every vehicle is subscribed once on departure. update() then
+    reads all values from the batched subscription results, so state, reward,
+    logging and emergency checks share one fetch per step.
+
+    advance() covers a whole decision interval with one simulationStep call.
+    What happened in between comes from SUMO's own accumulators: the
+    departed/arrived ID lists of every skipped step, and a laneData
+    definition (write_additional(), loaded with the network) whose
+    waitingTime totals the vehicle-seconds spent halting on each lane.
+    The same file places an induction loop GAP_DETECTOR_SETBACK metres
+    before each stop line; gap_time holds the seconds since each last
+    detected a vehicle, the gap timer of actuated control.
+
+    Emergency vehicles are recognised by type once, at departure, and only they
+    are subscribed to their current lane, so emergency_lanes() costs
+    O(emergency vehicles) however long the queues are. Lane area detectors
+    (e.g. ObservationBuilder's approach bins) are subscribed to their vehicle
+    count and read on demand with detector_counts().
+    """
+
+    LANE_VARS = [tc.LAST_STEP_VEHICLE_HALTING_NUMBER, tc.VAR_WAITING_TIME,
+                 tc.LAST_STEP_VEHICLE_ID_LIST]
+    VEHICLE_VARS = [tc.VAR_TYPE, tc.VAR_ROUTE_ID, tc.VAR_DEPARTURE]
+    SIM_VARS = [tc.VAR_TIME, tc.VAR_DEPARTED_VEHICLES_IDS,
+                tc.VAR_ARRIVED_VEHICLES_IDS, tc.VAR_MIN_EXPECTED_VEHICLES]
+    EMERGENCY_TYPE = 'emergency'
+    LANE_DATA_ID = 'step_observer'
+    GAP_DETECTOR_SETBACK = 30.0
+
+    def __init__(self, lanes, sumo=traci, lane_vars=(), detectors=(), edges=None):
+        self.sumo = sumo
+        self.lanes = list(lanes)
+        # Extra variables and lane area detectors requested by an ObservationBuilder
+        self.lane_vars = self.LANE_VARS + [var for var in lane_vars if var not in self.LANE_VARS]
+        self.detectors = list(detectors)
+        self.halting = np.zeros(len(self.lanes), dtype=np.float32)
+        self.waiting = np.zeros(len(self.lanes), dtype=np.float32)
+        self.lane_values = {var: np.zeros(len(self.lanes), dtype=np.float32)
+                            for var in self.lane_vars[len(self.LANE_VARS):]}
+        self.lane_vehicles = [() for _ in self.lanes]
+        # Vehicle-seconds spent halting on each lane since the simulation started (laneData waitingTime)
+        self.halting_time = np.zeros(len(self.lanes))
+        self._lane_data_index = None
+        self._lane_data_subscribed = False
+        # Seconds since a vehicle last passed each lane's gap detector (0 while one is on it)
+        self.gap_time = np.zeros(len(self.lanes))
+        self.gap_detectors = [f'gap_{lane}' for lane in self.lanes]
+        self.edges = edges
+        self.registry = VehicleRegistry(sumo, edges)
+        self.emergency_vehicles = set()
+        self.arrivals = []
+        self.time = 0.0
+        self.previous_time = 0.0
+        self.step_length = 1.0
+        self.min_expected = 0
+
+    def write_additional(self, path):
+        """Write the laneData and gap detector definitions as a SUMO additional file, to load with the network"""
+        edges = dict.fromkeys(lane.rsplit('_', 1)[0] for lane in self.lanes)
+        root = ET.Element('additional')
+        # No period - one interval over the whole simulation, so the totals only grow
+        ET.SubElement(root, 'laneData', id=self.LANE_DATA_ID, edges=' '.join(edges), file='NUL',
+                      excludeEmpty='false')
+        # Negative positions count from the lane end; friendlyPos moves them onto short lanes
+        for detector_id, lane in zip(self.gap_detectors, self.lanes):
+            ET.SubElement(root, 'inductionLoop', id=detector_id, lane=lane, pos=str(-self.GAP_DETECTOR_SETBACK),
+                          friendlyPos='true', period='86400', file='NUL')
+        write_additional(root, path)
+
+    def subscribe(self):
+        """Register subscriptions - call after the simulation starts or a state is loaded"""
+        for lane in self.lanes:
+            self.sumo.lane.subscribe(lane, self.lane_vars)
+        for detector in self.detectors:
+            self.sumo.lanearea.subscribe(detector, [tc.LAST_STEP_VEHICLE_NUMBER])
+        for detector in self.gap_detectors:
+            self.sumo.inductionloop.subscribe(detector, [tc.LAST_STEP_TIME_SINCE_DETECTION])
+        # libsumo cannot subscribe meandata values, but its getters cost no round trip either
+        self._lane_data_subscribed = not self.sumo.isLibsumo()
+        if self._lane_data_subscribed:
+            self.sumo.meandata.subscribe(self.LANE_DATA_ID, [tc.VAR_MEANDATA_VALUES],
+                                         parameters={tc.VAR_MEANDATA_VALUES: ('s', 'waitingTime')})
+        position = {lane: i for i, lane in enumerate(self.sumo.meandata.getIDs(self.LANE_DATA_ID))}
+        self._lane_data_index = np.array([position[lane] for lane in self.lanes], dtype=np.int64)
+        self.sumo.simulation.subscribe(self.SIM_VARS)
+        self.step_length = self.sumo.simulation.getDeltaT()
+
+        self.registry = VehicleRegistry(self.sumo, self.edges)
+        self.emergency_vehicles = set()
+        self.arrivals = []
+        # Reconcile also picks up vehicles already driving after a state restore
+        self.update(reconcile=True)
+
+    def update(self, reconcile=False):
+        """
+        Read the subscription results of the last simulationStep call
+
+        Departures and arrivals come from the departed/arrived ID lists, which
+        SUMO collects over every step the call covered. Departures keep their
+        exact times (VAR_DEPARTURE); arrivals are placed in the middle of the
+        interval they happened in. With reconcile=True the known vehicles are
+        instead diffed against one vehicle ID list query, which also picks up
+        vehicles already driving after a state restore.
+        """
+        sim = self._read_simulation()
+
+        if reconcile:
+            current = set(self.sumo.vehicle.getIDList())
+            departed = current - self.registry.keys()
+            arrived = self.registry.keys() - current
+        else:
+            arrived = set(sim[tc.VAR_ARRIVED_VEHICLES_IDS])
+            # A vehicle that departed and arrived within one interval is gone before it can be typed
+            departed = [veh_id for veh_id in sim[tc.VAR_DEPARTED_VEHICLES_IDS] if veh_id not in arrived]
+
+        # Vehicle type, route and departure never change, so one subscription per departure is enough
+        for veh_id in departed:
+            self.sumo.vehicle.subscribe(veh_id, self.VEHICLE_VARS)
+            values = self.sumo.vehicle.getSubscriptionResults(veh_id)
+            veh_type = values[tc.VAR_TYPE]
+            self.registry.add(veh_id, veh_type, values[tc.VAR_DEPARTURE], values[tc.VAR_ROUTE_ID])
+            if veh_type == self.EMERGENCY_TYPE:
+                self.sumo.vehicle.subscribe(veh_id, self.VEHICLE_VARS + [tc.VAR_LANE_ID])
+                self.emergency_vehicles.add(veh_id)
+
+        # An arrival is reported one step after its arrival time, so the interval's span [previous, time - step]
+        arrival_time = (self.previous_time + self.time - self.step_length) / 2
+        for veh_id in arrived:
+            self.emergency_vehicles.discard(veh_id)
+            arrival = self.registry.remove(veh_id, arrival_time)
+            if arrival is not None:
+                self.arrivals.append(arrival)
+
+        self._read_lanes()
+
+    def advance(self, duration):
+        """
+        Advance the simulation duration seconds with a single simulationStep call
+
+        Returns the vehicle-seconds spent halting on each lane during the
+        interval - the difference of the laneData totals SUMO accumulated
+        over every step it covered.
+        """
+        start = self.halting_time.copy()
+        self.sumo.simulationStep(self.time + duration)
+        self.update()
+        return self.halting_time - start
+
+    def _read_simulation(self):
+        sim = self.sumo.simulation.getSubscriptionResults()
+        self.previous_time, self.time = self.time, sim[tc.VAR_TIME]
+        self.min_expected = sim[tc.VAR_MIN_EXPECTED_VEHICLES]
+        return sim
+
+    def _read_lanes(self):
+        lane_results = self.sumo.lane.getAllSubscriptionResults()
+        for i, lane in enumerate(self.lanes):
+            values = lane_results[lane]
+            self.halting[i] = values[tc.LAST_STEP_VEHICLE_HALTING_NUMBER]
+            self.waiting[i] = values[tc.VAR_WAITING_TIME]
+            self.lane_vehicles[i] = values[tc.LAST_STEP_VEHICLE_ID_LIST]
+            for var, array in self.lane_values.items():
+                array[i] = values[var]
+        if self._lane_data_subscribed:
+            lane_data = self.sumo.meandata.getSubscriptionResults(self.LANE_DATA_ID)[tc.VAR_MEANDATA_VALUES]
+        else:
+            lane_data = self.sumo.meandata.getAttributeValues(self.LANE_DATA_ID, 'waitingTime')
+        self.halting_time[:] = np.asarray(lane_data)[self._lane_data_index]
+        loop_results = self.sumo.inductionloop.getAllSubscriptionResults()
+        for i, detector in enumerate(self.gap_detectors):
+            self.gap_time[i] = loop_results[detector][tc.LAST_STEP_TIME_SINCE_DETECTION]
+
+    def detector_counts(self):
+        """Vehicles on each lane area detector in the last step, in detector order"""
+        results = self.sumo.lanearea.getAllSubscriptionResults()
+        return np.fromiter((results[detector][tc.LAST_STEP_VEHICLE_NUMBER] for detector in self.detectors),
+                           dtype=np.float32, count=len(self.detectors))
+
+    def emergency_lanes(self):
+        """(vehicle ID, current lane) of every emergency vehicle in the network"""
+        return [(veh_id, self.sumo.vehicle.getSubscriptionResults(veh_id)[tc.VAR_LANE_ID])
+                for veh_id in self.emergency_vehicles]
+
+    def pop_arrivals(self):
+        """Return (vehicle type, travel time, delay) of vehicles arrived since the last call"""
+        arrivals, self.arrivals = self.arrivals, []
+        return arrivals
+
+class ObservationBuilder:
+    """
+    Configurable observation vector written into one preallocated float32 buffer
+
+    Features (per lane unless noted):
+    - queue: halting vehicles
+    - occupancy: occupancy of the last step (%)
+    - speed: mean speed of the last step (m/s)
+    - waiting: accumulated waiting time (s)
+    - approach: vehicles per distance-to-stop-line bin (len(distance_bins) + 1 values),
+      from one lane area detector per lane and bin (write_detectors()); a vehicle
+      straddling a bin edge counts in both bins
+    - emergency: 1 if an emergency vehicle is on the lane
+    - phase: one-hot current green (one value per action)
+    - time_in_phase: seconds since the last phase change (one value)
+
+    Continuous features come first and are normalized with running mean/std
+    (VectorRunningStats); the binary ones (emergency, phase) are left as-is.
+    Every feature is filled with NumPy operations on the StepObserver arrays,
+    so the Python cost per step does not grow with the number of features.
+
+    Statistics added since the last pop_stats_update() are kept apart, so
+    parallel workers can merge theirs into one total and set_stats() it
+    back; saved with the model, the total is restored and frozen
+    (update_stats = False) for testing and evaluation.
+    """
+
+    FEATURES = ('queue', 'occupancy', 'speed', 'waiting', 'approach', 'emergency', 'phase', 'time_in_phase')
+    BINARY = ('emergency', 'phase')
+
+    def __init__(self, lanes, lane_lengths, num_actions, features=FEATURES,
+                 distance_bins=(25, 50, 100), normalize=True, clip=10.0):
+        unknown = set(features) - set(self.FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown observation features: {sorted(unknown)}")
+
+        self.lanes = list(lanes)
+        self.lane_position = {lane: i for i, lane in enumerate(self.lanes)}
+        self.features = [name for name in self.FEATURES if name in features]
+        self.num_actions = num_actions
+        self.distance_bins = np.asarray(distance_bins, dtype=np.float32)
+        self.clip = clip
+
+        num_lanes = len(self.lanes)
+        widths = {'approach': num_lanes * (len(distance_bins) + 1), 'phase': num_actions,
+                  'time_in_phase': 1}
+        # Continuous block first, binary block last
+        ordered = ([name for name in self.features if name not in self.BINARY] +
+                   [name for name in self.features if name in self.BINARY])
+        self.slices = {}
+        offset = 0
+        for name in ordered:
+            width = widths.get(name, num_lanes)
+            self.slices[name] = slice(offset, offset + width)
+            offset += width
+        self.size = offset
+        self.num_continuous = sum(self.slices[name].stop - self.slices[name].start
+                                  for name in ordered if name not in self.BINARY)
+
+        # One lane area detector per lane and distance bin: (ID, lane, start, end), and its approach slot
+        self.detectors = []
+        slots = []
+        if 'approach' in self.features:
+            num_bins = len(distance_bins) + 1
+            for i, lane in enumerate(self.lanes):
+                length = float(lane_lengths[lane])
+                bounds = [0.0] + [float(edge) for edge in distance_bins] + [length]
+                for k in range(num_bins):
+                    start, end = max(length - bounds[k + 1], 0.0), length - bounds[k]
+                    # Bins beyond the start of a short lane stay empty
+                    if start < end:
+                        self.detectors.append((f'approach_{lane}_{k}', lane, start, end))
+                        slots.append(i * num_bins + k)
+        self.detector_slots = np.array(slots, dtype=np.int64)
+
+        self.out = np.zeros(self.size, dtype=np.float32)
+        self.stats = VectorRunningStats(self.num_continuous) if normalize else None
+        # Updates since the last pop_stats_update(), not yet merged elsewhere
+        self.stats_update = VectorRunningStats(self.num_continuous) if normalize else None
+        # Set to False to freeze the running statistics (e.g. for evaluation)
+        self.update_stats = True
+
+    @property
+    def lane_vars(self):
+        """Lane subscription variables the StepObserver must add"""
+        return [var for name, var in (('occupancy', tc.LAST_STEP_OCCUPANCY), ('speed', tc.LAST_STEP_MEAN_SPEED))
+                if name in self.features]
+
+    @property
+    def detector_ids(self):
+        """Lane area detectors the StepObserver must subscribe"""
+        return [detector_id for detector_id, _, _, _ in self.detectors]
+
+    def write_detectors(self, path):
+        """Write the approach detectors as a SUMO additional file, to load with the network"""
+        root = ET.Element('additional')
+        for detector_id, lane, start, end in self.detectors:
+            ET.SubElement(root, 'laneAreaDetector', id=detector_id, lane=lane, pos=str(start),
+                          endPos=str(end), period='86400', file='NUL')
+        write_additional(root, path)
+
+    def pop_stats_update(self):
+        """Statistics added since the last call - merge them into a shared total"""
+        update, self.stats_update = self.stats_update, VectorRunningStats(self.num_continuous)
+        return update
+
+    def set_stats(self, stats):
+        """Normalize with a copy of stats (merged from all workers or restored from a checkpoint)"""
+        self.stats = VectorRunningStats(self.num_continuous).merge(stats)
+
+    def build(self, observer, action, time_in_phase):
+        """Fill and return the buffer (reused every call - copy it to keep it)"""
+        out = self.out
+        slices = self.slices
+
+        if 'queue' in slices:
+            out[slices['queue']] = observer.halting
+        if 'occupancy' in slices:
+            out[slices['occupancy']] = observer.lane_values[tc.LAST_STEP_OCCUPANCY]
+        if 'speed' in slices:
+            out[slices['speed']] = observer.lane_values[tc.LAST_STEP_MEAN_SPEED]
+        if 'waiting' in slices:
+            out[slices['waiting']] = observer.waiting
+        if 'time_in_phase' in slices:
+            out[slices['time_in_phase']] = time_in_phase
+
+        if 'emergency' in slices:
+            emergency = out[slices['emergency']]
+            emergency[:] = 0
+            for _, lane in observer.emergency_lanes():
+                if lane in self.lane_position:
+                    emergency[self.lane_position[lane]] = 1
+
+        if 'approach' in slices:
+            # Detector counts, scattered into the (lane, bin) layout
+            approach = out[slices['approach']]
+            approach[:] = 0
+            approach[self.detector_slots] = observer.detector_counts()
+
+        if 'phase' in slices:
+            phase = out[slices['phase']]
+            phase[:] = 0
+            if action is not None:
+                phase[action] = 1
+
+        if self.stats is not None:
+            continuous = out[:self.num_continuous]
+            if self.update_stats:
+                self.stats.update(continuous)
+                self.stats_update.update(continuous)
+            continuous -= self.stats.mean
+            continuous /= self.stats.std + 1e-8
+            np.clip(continuous, -self.clip, self.clip, out=continuous)
+
+        return out
@@ -0,0 +1,252 @@
+import math
+import numpy as np
+
+class RunningStats:
+    """Welford mean/variance with min/max - O(1) memory, mergeable (Chan et al.)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+class VectorRunningStats:
+    """Element-wise running mean/variance of fixed-size vectors, updated in batches"""
+
+    def __init__(self, size):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def update(self, x):
+        """Add one vector (size,) or a batch (n, size)"""
+        x = np.atleast_2d(x)
+        batch_mean = x.mean(axis=0)
+        batch_m2 = ((x - batch_mean) ** 2).sum(axis=0)
+        return self._combine(len(x), batch_mean, batch_m2)
+
+    def merge(self, other):
+        return self._combine(other.count, other.mean, other.m2)
+
+    def state_dict(self):
+        return {'count': self.count, 'mean': self.mean.copy(), 'm2': self.m2.copy()}
+
+    @classmethod
+    def from_state_dict(cls, state):
+        stats = cls(len(state['mean']))
+        return stats._combine(int(state['count']), np.asarray(state['mean'], dtype=np.float64),
+                              np.asarray(state['m2'], dtype=np.float64))
+
+    def _combine(self, count, mean, m2):
+        if count == 0:
+            return self
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta * delta * self.count * count / total
+        self.count = total
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else np.zeros_like(self.m2)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+class TDigest:
+    """
+    Merging t-digest quantile sketch
+
+    Values are buffered and periodically compressed into at most about
+    `compression` weighted centroids (k1 scale function), so memory is
+    bounded however many values are added. Digests merge by compressing
+    one's centroids into the other.
+    """
+
+    def __init__(self, compression=100, buffer_size=500):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self._buf_means = np.empty(buffer_size)
+        self._buf_weights = np.empty(buffer_size)
+        self._n_buffered = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x, weight=1.0):
+        if self._n_buffered == len(self._buf_means):
+            self._compress()
+        self._buf_means[self._n_buffered] = x
+        self._buf_weights[self._n_buffered] = weight
+        self._n_buffered += 1
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        other._compress()
+        for mean, weight in zip(other.means, other.weights):
+            self.update(mean, weight)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _q_limit(self, q):
+        """Largest quantile a centroid starting at q may reach (k1 scale)"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self):
+        if self._n_buffered == 0:
+            return
+
+        means = np.concatenate((self.means, self._buf_means[:self._n_buffered]))
+        weights = np.concatenate((self.weights, self._buf_weights[:self._n_buffered]))
+        self._n_buffered = 0
+
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        new_means, new_weights = [], []
+        cur_mean, cur_weight = means[0], weights[0]
+        weight_so_far = 0.0
+        q_limit = self._q_limit(0.0)
+
+        for mean, weight in zip(means[1:], weights[1:]):
+            if (weight_so_far + cur_weight + weight) / total <= q_limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                new_means.append(cur_mean)
+                new_weights.append(cur_weight)
+                weight_so_far += cur_weight
+                q_limit = self._q_limit(weight_so_far / total)
+                cur_mean, cur_weight = mean, weight
+
+        new_means.append(cur_mean)
+        new_weights.append(cur_weight)
+        self.means = np.array(new_means)
+        self.weights = np.array(new_weights)
+
+    def quantile(self, q):
+        self._compress()
+        if len(self.means) == 0:
+            return math.nan
+
+        # Interpolate between centroid centres, anchored at the exact min/max
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        xp = np.concatenate(([0.0], centres, [total]))
+        fp = np.concatenate(([self.min], self.means, [self.max]))
+        return float(np.interp(q * total, xp, fp))
+
+class MetricStats:
+    """Running moments plus a quantile sketch for one metric"""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self.moments = RunningStats()
+        self.digest = TDigest()
+
+    def update(self, x):
+        x = float(x)
+        self.moments.update(x)
+        self.digest.update(x)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.digest.merge(other.digest)
+        return self
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    @property
+    def mean(self):
+        return self.moments.mean
+
+    def summary(self):
+        result = {
+            'count': self.moments.count,
+            'mean': self.moments.mean,
+            'std': self.moments.std,
+            'min': self.moments.min if self.moments.count else 0.0,
+            'max': self.moments.max if self.moments.count else 0.0,
+        }
+        for q in self.QUANTILES:
+            result[f'p{int(q * 100)}'] = self.digest.quantile(q) if self.moments.count else 0.0
+        return result
+
+class StatsAccumulator:
+    """
+    Named collection of MetricStats
+
+    Keys are free-form, e.g. 'waiting_time', 'lane/N2TL_0/queue_length' or
+    'vtype/bus/travel_time'. Accumulators merge key by key, so episode
+    statistics can be folded into run statistics or combined across
+    parallel environments.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def __getitem__(self, key):
+        metric = self.metrics.get(key)
+        if metric is None:
+            metric = self.metrics[key] = MetricStats()
+        return metric
+
+    def update(self, key, value):
+        self[key].update(value)
+
+    def merge(self, other):
+        for key, metric in other.metrics.items():
+            self[key].merge(metric)
+        return self
+
+    def summary(self):
+        return {key: metric.summary() for key, metric in sorted(self.metrics.items())}
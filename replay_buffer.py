@@ -0,0 +1,163 @@
+import numpy as np
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of transitions stored in preallocated NumPy arrays
+
+    All storage is allocated up front, so memory use is known at construction
+    (see nbytes) and does not grow. Sampling draws a vector of indices and
+    returns contiguous arrays ready for torch.from_numpy.
+    """
+
+    def __init__(self, capacity, state_size):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+
+        self.position = 0  # Next slot to write
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return (self.states.nbytes + self.actions.nbytes + self.rewards.nbytes +
+                self.next_states.nbytes + self.dones.nbytes)
+
+    def add(self, state, action, reward, next_state, done):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Insert a batch of transitions (e.g. one per vector environment)"""
+        n = len(actions)
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    def sample_indices(self, batch_size):
+        return np.random.randint(0, self.size, size=batch_size)
+
+    def get(self, idx):
+        """Gather transitions at idx - each array is a fresh contiguous copy"""
+        return (self.states[idx], self.actions[idx], self.rewards[idx],
+                self.next_states[idx], self.dones[idx])
+
+    def sample(self, batch_size):
+        return self.get(self.sample_indices(batch_size))
+
+class SumTree:
+    """
+    Array-backed binary sum tree over a fixed number of leaf priorities
+
+    Node i has children 2i and 2i+1, the root is node 1 and leaves start at
+    self.leaf_offset. Updates and prefix-sum lookups are O(log n) and are
+    vectorized over batches of indices.
+    """
+
+    def __init__(self, capacity):
+        # Round up to a power of two so every leaf sits at the same depth
+        self.depth = max(1, int(np.ceil(np.log2(capacity))))
+        self.leaf_offset = 1 << self.depth
+        self.tree = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idx):
+        return self.tree[self.leaf_offset + idx]
+
+    def update(self, idx, priorities):
+        nodes = self.leaf_offset + np.asarray(idx)
+        self.tree[nodes] = priorities
+
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Leaf indices whose cumulative priority range contains each value"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+
+        return nodes - self.leaf_offset
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer that samples transitions proportionally to |TD error| ** alpha
+
+    New transitions get the current maximum priority so each is replayed at
+    least once. sample_prioritized() returns importance-sampling weights whose
+    exponent beta is annealed towards 1 over training.
+    """
+
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_increment=1e-4, epsilon=1e-5):
+        super().__init__(capacity, state_size)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+
+    @property
+    def nbytes(self):
+        return super().nbytes + self.tree.tree.nbytes
+
+    def add(self, state, action, reward, next_state, done):
+        i = super().add(state, action, reward, next_state, done)
+        self.tree.update([i], self.max_priority ** self.alpha)
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        idx = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, self.max_priority ** self.alpha)
+        return idx
+
+    def sample_prioritized(self, batch_size):
+        """Stratified proportional sampling - returns (indices, IS weights)"""
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + np.random.rand(batch_size)) * segment
+
+        # Float round-off can land past the last filled slot
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.get(idx) / total
+        weights = (self.size * probs) ** (-self.beta)
+        weights /= weights.max()
+
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return idx, weights.astype(np.float32)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
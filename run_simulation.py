@@ -19,12 +19,11 @@ def setup_environment():
     
     print("✓ SUMO_HOME found")
     
-    # Generate network files if not exist
-    if not os.path.exists('intersection.net.xml'):
-        print("Generating network files...")
-        os.system('python sumo_network_gen.py')
-    else:
-        print("✓ Network files exist")
+    # Install the network files from the scenario cache - rebuilt whenever the generator inputs
+    # or code change, so stale files in the working directory are always replaced
+    from scenario_cache import get_scenario, install_scenario
+    install_scenario(get_scenario())
+    print("✓ Network files installed")
     
     # Create necessary directories
     os.makedirs('models', exist_ok=True)
@@ -32,35 +31,74 @@ def setup_environment():
     os.makedirs('test_logs', exist_ok=True)
     print("✓ Directories created")
 
-def train_model(episodes=100):
+def train_model(episodes=100, backend=None, num_envs=1, prioritized=False, num_actors=0,
+                snapshot_times=None, grid=None, observation_features=None, pretrain_episodes=0):
     """Train DQN model"""
-    print(f"\n=== Training DQN Model ({episodes} episodes) ===")
+    if grid:
+        return train_grid_model(episodes=episodes, rows=grid[0], cols=grid[1], backend=backend,
+                                prioritized=prioritized)
+    
+    pretrained = None
+    if pretrain_episodes:
+        if observation_features:
+            print("ERROR: Surrogate pretraining only produces the legacy 6-value state.")
+            return
+        print(f"\n=== Pretraining on the surrogate simulator ({pretrain_episodes} episodes) ===")
+        from surrogate_env import pretrain_agent
+        pretrained = pretrain_agent(episodes=pretrain_episodes, prioritized=prioritized)
+    
+    print(f"\n=== Training DQN Model ({episodes} episodes, {num_envs} env(s)) ===")
     
     # EDITED: Import and run training
     from traffic_dqn_main import train_agent
-    train_agent(episodes=episodes)
+    train_agent(episodes=episodes, backend=backend, num_envs=num_envs, prioritized=prioritized,
+                num_actors=num_actors, snapshot_times=snapshot_times,
+                observation_features=observation_features, pretrained=pretrained)
 
-def test_model(episodes=5, use_gui=True):
+def train_grid_model(episodes=100, rows=3, cols=3, backend=None, prioritized=False):
+    """Train one shared DQN for every junction of a rows x cols grid"""
+    print(f"\n=== Training Grid DQN Model ({episodes} episodes, {rows}x{cols} junctions) ===")
+    
+    name = f'grid_{rows}x{cols}'
+    from scenario_cache import get_scenario, install_scenario
+    install_scenario(get_scenario(grid=(rows, cols)))
+    
+    from grid_env import train_grid_agent
+    train_grid_agent(f'{name}.net.xml', f'{name}.sumocfg', episodes=episodes, backend=backend,
+                     prioritized=prioritized)
+
+def test_model(episodes=5, use_gui=True, backend=None, observation_features=None):
     """Test trained model"""
     print(f"\n=== Testing Model ({episodes} episodes) ===")
     
-    if not os.path.exists('models/traffic_dqn.pth'):
+    from traffic_dqn_main import model_path_for
+    model_path = model_path_for(observation_features)
+    if not os.path.exists(model_path):
         print("ERROR: No trained model found. Please train first.")
         return
     
     from test_model import test_agent
-    test_agent('models/traffic_dqn.pth', episodes=episodes, use_gui=use_gui)
+    test_agent(model_path, episodes=episodes, use_gui=use_gui, backend=backend,
+               observation_features=observation_features)
 
-def compare_models():
-    """Compare DQN with fixed-time control"""
-    print("\n=== Comparing DQN vs Fixed-Time ===")
-    
-    if not os.path.exists('models/traffic_dqn.pth'):
+def compare_models(backend=None, seeds=3, eval_patterns=None, num_workers=None,
+                   policies=('fixed_time', 'dqn'), observation_features=None):
+    """Compare DQN with fixed-time (and other baseline) control over seeds and scenarios in parallel"""
+    print(f"\n=== Comparing {' vs '.join(policies)} ===")
+    
+    from traffic_dqn_main import model_path_for
+    model_path = model_path_for(observation_features)
+    if 'dqn' in policies and not os.path.exists(model_path):
         print("ERROR: No trained model found. Please train first.")
         return
     
     from test_model import compare_with_fixed_time
-    compare_with_fixed_time(episodes=3)
+    scenarios = (None,)
+    if eval_patterns:
+        from evaluation import generate_scenarios
+        scenarios = generate_scenarios(patterns=eval_patterns, seeds=range(seeds))
+    compare_with_fixed_time(episodes=seeds, backend=backend, scenarios=scenarios, num_workers=num_workers,
+                            policies=policies, observation_features=observation_features)
 
 def analyze_results():
     """Analyze and visualize results"""
@@ -70,19 +108,23 @@ def analyze_results():
         print("No training logs found")
         return
     
-    from data_analyzer import analyze_training_logs, analyze_vehicle_types, export_csv_summary
+    from data_analyzer import (analyze_training_logs, analyze_vehicle_types,
+                               analyze_episode_steps, export_csv_summary)
     analyze_training_logs()
     analyze_vehicle_types()
+    analyze_episode_steps()
     export_csv_summary()
 
 def generate_traffic(pattern='rush_hour'):
     """Generate traffic patterns"""
     print(f"\n=== Generating {pattern} Traffic ===")
     
-    from dynamic_traffic_gen import generate_dynamic_traffic, generate_incident_scenario
+    from dynamic_traffic_gen import generate_dynamic_traffic, generate_incident_scenario, generate_demand_profile
     
     if pattern == 'incident':
         generate_incident_scenario()
+    elif pattern == 'profile':
+        generate_demand_profile(duration=86400)
     else:
         generate_dynamic_traffic(traffic_pattern=pattern)
 
@@ -93,8 +135,36 @@ def main():
     parser.add_argument('--episodes', type=int, default=100, help='Number of episodes (default: 100)')
     parser.add_argument('--no-gui', action='store_true', help='Run without GUI')
     parser.add_argument('--pattern', type=str, default='rush_hour', 
-                       choices=['rush_hour', 'random', 'uniform', 'incident'],
+                       choices=['rush_hour', 'random', 'uniform', 'incident', 'profile'],
                        help='Traffic pattern (default: rush_hour)')
+    parser.add_argument('--backend', type=str, default=None, choices=['traci', 'libsumo'],
+                       help='SUMO backend (default: $SUMO_BACKEND or traci; GUI always uses traci)')
+    parser.add_argument('--num-envs', type=int, default=1,
+                       help='Parallel SUMO instances for training (default: 1)')
+    parser.add_argument('--prioritized', action='store_true',
+                       help='Use prioritized experience replay during training')
+    parser.add_argument('--actors', type=int, default=0,
+                       help='Simulation actor processes for actor/learner training (default: 0 = off)')
+    parser.add_argument('--grid', type=int, nargs=2, default=None, metavar=('ROWS', 'COLS'),
+                       help='Train on a ROWS x COLS grid of traffic lights (1 x N = arterial)')
+    parser.add_argument('--features', type=str, nargs='+', default=None,
+                       choices=['queue', 'occupancy', 'speed', 'waiting', 'approach', 'emergency',
+                                'phase', 'time_in_phase'],
+                       help='Observation features for training (default: legacy 6-value state)')
+    parser.add_argument('--snapshots', type=float, nargs='+', default=None, metavar='TIME',
+                       help='Start training episodes from saved simulation states at these times (s)')
+    parser.add_argument('--pretrain', type=int, default=0, metavar='EPISODES',
+                       help='Pretrain on the NumPy surrogate simulator before SUMO training (default: 0 = off)')
+    parser.add_argument('--seeds', type=int, default=3,
+                       help='Seeds per scenario for compare (default: 3)')
+    parser.add_argument('--eval-patterns', type=str, nargs='+', default=None,
+                       choices=['rush_hour', 'random', 'uniform'],
+                       help='Compare on generated route files of these patterns (default: traffic.rou.xml)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Evaluation worker processes for compare (default: all cores)')
+    parser.add_argument('--policies', type=str, nargs='+', default=['fixed_time', 'dqn'],
+                       choices=['dqn', 'fixed_time', 'webster', 'actuated', 'max_pressure'],
+                       help='Policies for compare (default: fixed_time dqn)')
     
     args = parser.parse_args()
     
@@ -103,13 +173,19 @@ def main():
     
     elif args.command == 'train':
         setup_environment()
-        train_model(episodes=args.episodes)
+        train_model(episodes=args.episodes, backend=args.backend, num_envs=args.num_envs,
+                    prioritized=args.prioritized, num_actors=args.actors,
+                    snapshot_times=args.snapshots, grid=args.grid,
+                    observation_features=args.features, pretrain_episodes=args.pretrain)
     
     elif args.command == 'test':
-        test_model(episodes=min(args.episodes, 10), use_gui=not args.no_gui)
+        test_model(episodes=min(args.episodes, 10), use_gui=not args.no_gui, backend=args.backend,
+                   observation_features=args.features)
     
     elif args.command == 'compare':
-        compare_models()
+        compare_models(backend=args.backend, seeds=args.seeds, eval_patterns=args.eval_patterns,
+                       num_workers=args.workers, policies=args.policies,
+                       observation_features=args.features)
     
     elif args.command == 'analyze':
         analyze_results()
@@ -121,9 +197,15 @@ def main():
         # EDITED: Full pipeline - setup, train, test, analyze
         print("=== Running Full Pipeline ===")
         setup_environment()
-        train_model(episodes=args.episodes)
-        test_model(episodes=5, use_gui=not args.no_gui)
-        compare_models()
+        train_model(episodes=args.episodes, backend=args.backend, num_envs=args.num_envs,
+                    prioritized=args.prioritized, num_actors=args.actors,
+                    snapshot_times=args.snapshots, grid=args.grid,
+                    observation_features=args.features, pretrain_episodes=args.pretrain)
+        test_model(episodes=5, use_gui=not args.no_gui, backend=args.backend,
+                   observation_features=args.features)
+        compare_models(backend=args.backend, seeds=args.seeds, eval_patterns=args.eval_patterns,
+                       num_workers=args.workers, policies=args.policies,
+                       observation_features=args.features)
         analyze_results()
         print("\n✓ Full pipeline complete!")
     
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import dynamic_traffic_gen
+import sumo_network_gen
+
+CACHE_DIR = '.scenario_cache'
+
+# Files a scenario consists of (all written by sumo_network_gen)
+ARTIFACTS = ['intersection.nod.xml', 'intersection.edg.xml', 'intersection.net.xml',
+             'tls_program.add.xml', 'traffic.rou.xml', 'simulation.sumocfg']
+
+# Generator modules whose code is part of the key (grid routes reuse the vehicle types)
+GENERATORS = [sumo_network_gen, dynamic_traffic_gen]
+
+def scenario_key(params):
+    """Content hash of the generator inputs and the generator code itself"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    for module in GENERATORS:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def scenario_artifacts(params):
+    """Files of the scenario for params"""
+    if not params.get('grid'):
+        return ARTIFACTS
+    rows, cols = params['grid']
+    name = f'grid_{rows}x{cols}'
+    return [f'{name}.nod.xml', f'{name}.edg.xml', f'{name}.net.xml', f'{name}.rou.xml', f'{name}.sumocfg']
+
+def build_scenario(params, output_dir):
+    """Run the generators for params into output_dir"""
+    if params.get('grid'):
+        rows, cols = params['grid']
+        sumo_network_gen.generate_grid_scenario(rows, cols, num_vehicles=params['num_vehicles'],
+                                                seed=params['seed'], end=params['end'], output_dir=output_dir)
+        return
+    sumo_network_gen.generate_network(output_dir)
+    sumo_network_gen.generate_traffic_routes(num_vehicles=params['num_vehicles'], seed=params['seed'],
+                                             output_dir=output_dir)
+    sumo_network_gen.generate_sumo_config(end=params['end'], output_dir=output_dir)
+
+def get_scenario(num_vehicles=1000, seed=42, end=3600, grid=None, cache_dir=CACHE_DIR, max_entries=20):
+    """
+    Return the cache directory holding the scenario for these generator inputs
+
+    grid=(rows, cols) selects a grid of junctions instead of the single
+    intersection.
+
+    On a miss the scenario is built in a private temporary directory and
+    renamed into place, so parallel workers never see partial artifacts; if
+    two workers build the same key, the first rename wins and the other copy
+    is discarded. Least recently used entries beyond max_entries are evicted.
+    """
+    params = {'num_vehicles': num_vehicles, 'seed': seed, 'end': end}
+    if grid:
+        params['grid'] = list(grid)
+    key = scenario_key(params)
+    path = os.path.join(cache_dir, key)
+
+    if os.path.isdir(path):
+        os.utime(path)  # Mark as recently used
+        print(f"✓ Scenario cache hit: {path}")
+        return path
+
+    print(f"Building scenario {key} ({', '.join(f'{k}={v}' for k, v in params.items())})")
+    os.makedirs(cache_dir, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=cache_dir)
+
+    try:
+        build_scenario(params, build_dir)
+        with open(os.path.join(build_dir, 'params.json'), 'w') as f:
+            json.dump(params, f, indent=2)
+        os.rename(build_dir, path)
+    except OSError:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+    except Exception:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    evict_stale(cache_dir, max_entries, keep=key)
+    return path
+
+def evict_stale(cache_dir=CACHE_DIR, max_entries=20, keep=None, build_timeout=3600):
+    """Drop least recently used scenarios and abandoned build directories"""
+    now = time.time()
+    entries = []
+
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if not os.path.isdir(entry):
+            continue
+        try:
+            mtime = os.path.getmtime(entry)
+        except OSError:
+            continue  # Removed by another worker
+
+        if name.startswith('.'):
+            # Leftover from a crashed build
+            if now - mtime > build_timeout:
+                shutil.rmtree(entry, ignore_errors=True)
+        elif name != keep:
+            entries.append((mtime, entry))
+
+    entries.sort()
+    for _, entry in entries[:max(0, len(entries) - (max_entries - 1))]:
+        shutil.rmtree(entry, ignore_errors=True)
+
+def install_scenario(path, dest='.'):
+    """
+    Copy a cached scenario's artifacts into dest, replacing older copies
+
+    Modification times are kept, so caches keyed on them (the topology
+    index) stay valid when the same scenario is installed again.
+    """
+    with open(os.path.join(path, 'params.json')) as f:
+        params = json.load(f)
+    for name in scenario_artifacts(params):
+        shutil.copy2(os.path.join(path, name), os.path.join(dest, name))
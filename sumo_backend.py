@@ -0,0 +1,42 @@
+import os
+import xml.etree.ElementTree as ET
+
+BACKENDS = ('traci', 'libsumo')
+
+def get_backend(name=None, use_gui=False):
+    """
+    Return the SUMO control module for the requested backend
+
+    Backends:
+    - traci: separate sumo process controlled over TCP (supports GUI)
+    - libsumo: simulation runs in-process, no socket overhead
+
+    The name defaults to the SUMO_BACKEND environment variable, then 'traci'.
+    libsumo cannot drive sumo-gui, so GUI runs always fall back to TraCI.
+    """
+    name = name or os.environ.get('SUMO_BACKEND', 'traci')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SUMO backend '{name}', expected one of {BACKENDS}")
+
+    if name == 'libsumo' and use_gui:
+        print("libsumo does not support the GUI, falling back to TraCI")
+        name = 'traci'
+
+    if name == 'libsumo':
+        import libsumo
+        return libsumo
+
+    import traci
+    return traci
+
+def additional_files(config_file, extra_files=()):
+    """
+    Additional files of a SUMO config followed by extra_files, as absolute paths
+
+    An -a option replaces the config's additional files, so it must list them too.
+    """
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+    option = ET.parse(config_file).getroot().find('input/additional-files')
+    files = option.get('value', '').split(',') if option is not None else []
+    return ([os.path.join(config_dir, path.strip()) for path in files if path.strip()] +
+            [os.path.abspath(path) for path in extra_files])
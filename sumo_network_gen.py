@@ -1,7 +1,7 @@
 import os
 import xml.etree.ElementTree as ET
 
-def generate_network():
+def generate_network(output_dir='.'):
     """Generate 4-way intersection network"""
     
     # Create nodes file
@@ -17,7 +17,7 @@ def generate_network():
     ET.SubElement(nodes, 'node', id='W', x='-200', y='0')
     
     tree = ET.ElementTree(nodes)
-    tree.write('intersection.nod.xml', encoding='utf-8', xml_declaration=True)
+    tree.write(os.path.join(output_dir, 'intersection.nod.xml'), encoding='utf-8', xml_declaration=True)
     
     # Create edges file
     edges = ET.Element('edges')
@@ -35,19 +35,22 @@ def generate_network():
     ET.SubElement(edges, 'edge', id='TL2W', **{'from': 'TL', 'to': 'W', 'numLanes': '2', 'speed': '13.89'})
     
     tree = ET.ElementTree(edges)
-    tree.write('intersection.edg.xml', encoding='utf-8', xml_declaration=True)
+    tree.write(os.path.join(output_dir, 'intersection.edg.xml'), encoding='utf-8', xml_declaration=True)
     
     # EDITED: Generate network with traffic light NODE but NO logic (we provide it separately)
-    os.system('netconvert --node-files=intersection.nod.xml --edge-files=intersection.edg.xml ' +
-              '--output-file=intersection.net.xml ' +
-              '--junctions.join=false --tls.guess-signals=true --tls.default-type=static')
+    status = os.system(f'netconvert --node-files="{os.path.join(output_dir, "intersection.nod.xml")}" ' +
+                       f'--edge-files="{os.path.join(output_dir, "intersection.edg.xml")}" ' +
+                       f'--output-file="{os.path.join(output_dir, "intersection.net.xml")}" ' +
+                       '--junctions.join=false --tls.guess-signals=true --tls.default-type=static')
+    if status != 0:
+        raise RuntimeError(f"netconvert failed with exit status {status}")
     
     # EDITED: Create custom traffic light program with 4 phases (one per direction)
-    generate_traffic_light_program()
+    generate_traffic_light_program(output_dir)
     
     print("Network files generated successfully")
 
-def generate_traffic_light_program():
+def generate_traffic_light_program(output_dir='.'):
     """Generate custom traffic light program - one direction at a time"""
     
     additional = ET.Element('additional')
@@ -77,11 +80,11 @@ def generate_traffic_light_program():
     ET.SubElement(tl_logic, 'phase', duration='3', state='rrrrrrrrrrrrrrryyyyy')
     
     tree = ET.ElementTree(additional)
-    tree.write('tls_program.add.xml', encoding='utf-8', xml_declaration=True)
+    tree.write(os.path.join(output_dir, 'tls_program.add.xml'), encoding='utf-8', xml_declaration=True)
     
     print("Traffic light program created (8 phases, 20 links)")
 
-def generate_traffic_routes(num_vehicles=1000):
+def generate_traffic_routes(num_vehicles=1000, seed=42, output_dir='.'):
     """Generate pre-defined traffic routes for training"""
     
     routes = ET.Element('routes')
@@ -109,7 +112,7 @@ def generate_traffic_routes(num_vehicles=1000):
     
     # EDITED: Generate vehicles with varied departure times and types
     import random
-    random.seed(42)
+    random.seed(seed)
     
     vehicle_types = [('passenger', 0.80), ('bus', 0.10), ('truck', 0.08), ('emergency', 0.02)]
     
@@ -131,31 +134,138 @@ def generate_traffic_routes(num_vehicles=1000):
                       route=route, depart=str(depart_time))
     
     tree = ET.ElementTree(routes)
-    tree.write('traffic.rou.xml', encoding='utf-8', xml_declaration=True)
+    tree.write(os.path.join(output_dir, 'traffic.rou.xml'), encoding='utf-8', xml_declaration=True)
     
     print(f"Generated {num_vehicles} vehicles in traffic.rou.xml")
 
-def generate_sumo_config():
-    """Generate SUMO configuration file"""
+def generate_sumo_config(route_file='traffic.rou.xml', end=3600, output_dir='.',
+                         net_file='intersection.net.xml', additional_files='tls_program.add.xml',
+                         config_file='simulation.sumocfg'):
+    """Generate SUMO configuration file (end=86400 for a full-day demand profile)"""
     
     config = ET.Element('configuration')
     
     input_elem = ET.SubElement(config, 'input')
-    ET.SubElement(input_elem, 'net-file', value='intersection.net.xml')
-    ET.SubElement(input_elem, 'route-files', value='traffic.rou.xml')
-    # EDITED: Add custom traffic light program
-    ET.SubElement(input_elem, 'additional-files', value='tls_program.add.xml')
+    ET.SubElement(input_elem, 'net-file', value=net_file)
+    ET.SubElement(input_elem, 'route-files', value=route_file)
+    # EDITED: Add custom traffic light program (grid networks use the netconvert programs)
+    if additional_files:
+        ET.SubElement(input_elem, 'additional-files', value=additional_files)
     
     time_elem = ET.SubElement(config, 'time')
     ET.SubElement(time_elem, 'begin', value='0')
-    ET.SubElement(time_elem, 'end', value='3600')
+    ET.SubElement(time_elem, 'end', value=str(end))
     
     tree = ET.ElementTree(config)
-    tree.write('simulation.sumocfg', encoding='utf-8', xml_declaration=True)
+    tree.write(os.path.join(output_dir, config_file), encoding='utf-8', xml_declaration=True)
     
     print("SUMO configuration file generated")
 
+def _grid_fringe(rows, cols):
+    """(fringe node, junction) pairs - every boundary junction gets an outside approach"""
+    fringe = []
+    for c in range(cols):
+        fringe.append((f'S{c}', f'J0_{c}'))
+        fringe.append((f'N{c}', f'J{rows - 1}_{c}'))
+    for r in range(rows):
+        fringe.append((f'W{r}', f'J{r}_0'))
+        fringe.append((f'E{r}', f'J{r}_{cols - 1}'))
+    return fringe
+
+def generate_grid_network(rows=3, cols=3, spacing=200, num_lanes=2, name='grid', output_dir='.'):
+    """
+    Generate a rows x cols grid of signalized junctions (rows=1 gives an arterial)
+    
+    Junction J{r}_{c} sits at (c * spacing, r * spacing) and is its own
+    traffic light; every boundary junction gets an approach from a fringe
+    node, so all junctions are 4-way. Edges are named '{from}2{to}' like the
+    single intersection. Signal programs are netconvert's static defaults.
+    """
+    
+    nodes = ET.Element('nodes')
+    for r in range(rows):
+        for c in range(cols):
+            ET.SubElement(nodes, 'node', id=f'J{r}_{c}', x=str(c * spacing), y=str(r * spacing),
+                          type='traffic_light')
+    for c in range(cols):
+        ET.SubElement(nodes, 'node', id=f'S{c}', x=str(c * spacing), y=str(-spacing))
+        ET.SubElement(nodes, 'node', id=f'N{c}', x=str(c * spacing), y=str(rows * spacing))
+    for r in range(rows):
+        ET.SubElement(nodes, 'node', id=f'W{r}', x=str(-spacing), y=str(r * spacing))
+        ET.SubElement(nodes, 'node', id=f'E{r}', x=str(cols * spacing), y=str(r * spacing))
+    
+    # Both directions between neighbouring junctions and between junctions and the fringe
+    links = _grid_fringe(rows, cols)
+    links += [(f'J{r}_{c}', f'J{r}_{c + 1}') for r in range(rows) for c in range(cols - 1)]
+    links += [(f'J{r}_{c}', f'J{r + 1}_{c}') for r in range(rows - 1) for c in range(cols)]
+    
+    edges = ET.Element('edges')
+    for a, b in links:
+        for src, dst in ((a, b), (b, a)):
+            ET.SubElement(edges, 'edge', id=f'{src}2{dst}',
+                          **{'from': src, 'to': dst, 'numLanes': str(num_lanes), 'speed': '13.89'})
+    
+    nod_file = os.path.join(output_dir, f'{name}.nod.xml')
+    edg_file = os.path.join(output_dir, f'{name}.edg.xml')
+    net_file = os.path.join(output_dir, f'{name}.net.xml')
+    ET.ElementTree(nodes).write(nod_file, encoding='utf-8', xml_declaration=True)
+    ET.ElementTree(edges).write(edg_file, encoding='utf-8', xml_declaration=True)
+    
+    status = os.system(f'netconvert --node-files="{nod_file}" --edge-files="{edg_file}" '
+                       f'--output-file="{net_file}" --tls.default-type=static')
+    if status != 0:
+        raise RuntimeError(f"netconvert failed with exit status {status}")
+    
+    print(f"Grid network generated: {rows}x{cols} junctions in {net_file}")
+
+def generate_grid_routes(rows=3, cols=3, num_vehicles=1000, seed=42, name='grid', output_dir='.'):
+    """Random trips between fringe approaches - SUMO routes each trip on insertion"""
+    import numpy as np
+    from dynamic_traffic_gen import VTYPES, VEHICLE_TYPES
+    
+    fringe = _grid_fringe(rows, cols)
+    sources = np.array([f'{node}2{junction}' for node, junction in fringe])
+    sinks = np.array([f'{junction}2{node}' for node, junction in fringe])
+    
+    rng = np.random.default_rng(seed)
+    origin = rng.integers(len(fringe), size=num_vehicles)
+    # Any other fringe edge as destination (no U-turn back out of the entry)
+    dest = (origin + rng.integers(1, len(fringe), size=num_vehicles)) % len(fringe)
+    departs = np.arange(num_vehicles) * 2 + rng.integers(0, 4, size=num_vehicles)
+    type_probs = np.array([prob for _, prob in VEHICLE_TYPES])
+    types = rng.choice([vtype for vtype, _ in VEHICLE_TYPES], size=num_vehicles, p=type_probs / type_probs.sum())
+    
+    route_file = os.path.join(output_dir, f'{name}.rou.xml')
+    with open(route_file, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n<routes>\n")
+        for vtype in VTYPES:
+            attrs = ' '.join(f'{key}="{value}"' for key, value in vtype.items())
+            f.write(f'    <vType {attrs} />\n')
+        f.writelines(
+            f'    <trip id="veh_{i}" type="{veh_type}" from="{src}" to="{dst}" depart="{depart}" />\n'
+            for i, (depart, src, dst, veh_type) in enumerate(
+                zip(departs.tolist(), sources[origin], sinks[dest], types)))
+        f.write('</routes>\n')
+    
+    print(f"Generated {num_vehicles} trips in {route_file}")
+
+def generate_grid_scenario(rows=3, cols=3, num_vehicles=1000, seed=42, end=3600, output_dir='.'):
+    """Network, trips and config for a grid - returns the config file path"""
+    name = f'grid_{rows}x{cols}'
+    generate_grid_network(rows, cols, name=name, output_dir=output_dir)
+    generate_grid_routes(rows, cols, num_vehicles=num_vehicles, seed=seed, name=name, output_dir=output_dir)
+    generate_sumo_config(route_file=f'{name}.rou.xml', end=end, output_dir=output_dir,
+                         net_file=f'{name}.net.xml', additional_files=None, config_file=f'{name}.sumocfg')
+    return os.path.join(output_dir, f'{name}.sumocfg')
+
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == 'grid':
+        # python sumo_network_gen.py grid ROWS COLS
+        rows, cols = (int(arg) for arg in sys.argv[2:4]) if len(sys.argv) > 3 else (3, 3)
+        print(f"Grid scenario: {generate_grid_scenario(rows, cols)}")
+        sys.exit(0)
+    
     print("Generating SUMO simulation files...")
     generate_network()
     generate_traffic_routes(num_vehicles=1000)
@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("Please declare environment variable 'SUMO_HOME'")
+
+from controllers import ControllerView, route_vehicles
+from topology import load_network_index
+from online_stats import StatsAccumulator
+
+def read_config(config_file):
+    """Net file and route files of a .sumocfg, resolved relative to it"""
+    base = os.path.dirname(config_file)
+    inputs = ET.parse(config_file).getroot().find('input')
+    net_file = inputs.find('net-file').get('value')
+    route_files = inputs.find('route-files').get('value').split(',')
+    return os.path.join(base, net_file), [os.path.join(base, route.strip()) for route in route_files]
+
+class SurrogateTrafficEnvironment:
+    """
+    SUMO-free stand-in for TrafficEnvironment: num_envs intersections as NumPy queues
+
+    Network layout (approach lanes per action, lane lengths, speed limits)
+    comes from the same cached topology index as TrafficEnvironment, demand
+    from the same route files: vehicles are counted per second and approach,
+    shifted by the free-flow time to the stop line, and every episode draws
+    Poisson arrivals around that profile (stochastic=True) or replays it.
+
+    Each approach is a point queue discharged at saturation_flow per lane
+    while green. A phase change starts yellow_duration seconds without
+    discharge and is only allowed after min_green_duration, as in SUMO runs.
+    As in TrafficEnvironment, the reward is the negative vehicle-seconds
+    spent queued during the interval, summed over its simulated seconds,
+    and the logged waiting time is the accumulated waiting time of the
+    vehicles queued at its end (served vehicles take a proportional share).
+
+    With num_envs=1, reset/step/get_state match TrafficEnvironment (one
+    6-value state, scalar action and reward). With more, step() returns
+    stacked states, rewards and dones like VectorTrafficEnv (info is one dict
+    of arrays), and finished intersections are reset inside step() so the
+    returned state is their next episode's first.
+    """
+
+    def __init__(self, num_envs=1, config_file='simulation.sumocfg', route_files=None, seed=None,
+                 decision_interval=5, min_green_duration=10, yellow_duration=3, saturation_flow=0.5,
+                 stochastic=True, max_duration=None):
+        self.num_envs = num_envs
+        self.single = num_envs == 1
+        self.rng = np.random.default_rng(seed)
+        self.decision_interval = decision_interval
+        self.min_green_duration = min_green_duration
+        self.yellow_duration = yellow_duration
+        self.stochastic = stochastic
+
+        net_file, config_routes = read_config(config_file)
+        tls_program = os.path.join(os.path.dirname(net_file), 'tls_program.add.xml')
+        self.topology = load_network_index(net_file, [tls_program] if os.path.exists(tls_program) else [])
+        if not self.topology.tls_ids:
+            raise Exception("No traffic lights found in network")
+        self.tls_id = self.topology.tls_ids[0]
+
+        # Same actions as TrafficEnvironment: green phases 0=North, 2=East, 4=South, 6=West
+        self.phases = np.array([0, 2, 4, 6])
+        self.state_size = 6
+        self.action_size = len(self.phases)
+        tls = self.topology[self.tls_id]
+        self.view = ControllerView(self.topology, [(self.tls_id, 'dqn', self.phases.tolist())], tls.lanes)
+        # Discharge capacity (veh/s) of each action's approach
+        self.capacity = saturation_flow * self.view.lane_counts[0]
+
+        # Free-flow seconds from the start of an approach edge to the stop line
+        self.approach_time = np.zeros(self.action_size, dtype=np.int64)
+        for edge, group in self.view.edge_group.items():
+            length, speed = self.topology.edges.get(edge, (0.0, 1.0))
+            self.approach_time[group] = max(self.approach_time[group], int(round(length / speed)))
+
+        self.route_files = list(route_files) if route_files else config_routes
+        self.demand = self._load_demand(self.route_files)
+        # Last second a vehicle can reach a stop line
+        self.horizon = self.demand.shape[1] + int(self.approach_time.max())
+        self.max_duration = max_duration or 2 * self.horizon
+
+        self.stats = StatsAccumulator()
+        self.run_stats = StatsAccumulator()
+        self.reset_time = 0.0
+        self._allocate()
+
+    def _load_demand(self, route_files):
+        """Vehicles per (route file, departure second, action)"""
+        profiles = []
+        for route_file in route_files:
+            departs, groups = [], []
+            for depart, edges in route_vehicles(route_file):
+                # First approach edge on the route - one stop line per vehicle
+                group = next((self.view.edge_group[edge] for edge in edges if edge in self.view.edge_group), None)
+                if group is not None:
+                    departs.append(int(depart))
+                    groups.append(group)
+            profile = np.zeros((max(departs, default=0) + 1, self.action_size), dtype=np.float32)
+            np.add.at(profile, (np.array(departs, dtype=np.int64), np.array(groups, dtype=np.int64)), 1)
+            profiles.append(profile)
+
+        demand = np.zeros((len(profiles), max(len(p) for p in profiles), self.action_size), dtype=np.float32)
+        for i, profile in enumerate(profiles):
+            demand[i, :len(profile)] = profile
+        return demand
+
+    def _allocate(self):
+        n, a = self.num_envs, self.action_size
+        self.queue = np.zeros((n, a))
+        self.waiting = np.zeros((n, a))  # Accumulated waiting time of the queued vehicles
+        self.action = np.zeros(n, dtype=np.int64)
+        self.time_in_phase = np.zeros(n)
+        self.yellow_left = np.zeros(n)
+        self.time = np.zeros(n, dtype=np.int64)
+        self.profile = np.zeros(n, dtype=np.int64)
+        # Episode totals
+        self.sum_waiting = np.zeros(n)
+        self.sum_queue = np.zeros(n)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.passed = np.zeros(n)
+        self.phase_changes = np.zeros(n, dtype=np.int64)
+
+    def _reset_envs(self, mask):
+        count = int(mask.sum())
+        self.queue[mask] = 0
+        self.waiting[mask] = 0
+        self.action[mask] = 0
+        self.time_in_phase[mask] = 0
+        self.yellow_left[mask] = 0
+        self.time[mask] = 0
+        self.profile[mask] = self.rng.integers(len(self.demand), size=count)
+        self.sum_waiting[mask] = 0
+        self.sum_queue[mask] = 0
+        self.steps[mask] = 0
+        self.passed[mask] = 0
+        self.phase_changes[mask] = 0
+
+    def reset(self):
+        start = time.perf_counter()
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self.stats = StatsAccumulator()
+        self.reset_time = time.perf_counter() - start
+        return self.get_state()
+
+    def get_state(self):
+        # [queue_N, queue_E, queue_S, queue_W, current_phase, time_in_phase] as in TrafficEnvironment
+        state = np.empty((self.num_envs, self.state_size), dtype=np.float32)
+        state[:, :self.action_size] = self.queue
+        state[:, 4] = self.phases[self.action]
+        state[:, 5] = self.time_in_phase
+        return state[0] if self.single else state
+
+    def _tick(self):
+        """Advance every intersection by one second"""
+        rows = np.arange(self.num_envs)
+
+        # Arrivals at the stop line: departures one approach time earlier
+        depart = self.time[:, None] - self.approach_time[None, :]
+        valid = (depart >= 0) & (depart < self.demand.shape[1])
+        rate = self.demand[self.profile[:, None], np.clip(depart, 0, self.demand.shape[1] - 1),
+                           np.arange(self.action_size)[None, :]] * valid
+        self.queue += self.rng.poisson(rate) if self.stochastic else rate
+
+        # Saturation-flow discharge of the green approach (nothing during yellow)
+        green_queue = self.queue[rows, self.action]
+        served = np.minimum(green_queue, self.capacity[self.action] * (self.yellow_left <= 0))
+        share = np.divide(served, green_queue, out=np.zeros(self.num_envs), where=green_queue > 0)
+        self.waiting[rows, self.action] *= 1 - share
+        self.queue[rows, self.action] -= served
+        self.passed += served
+
+        self.waiting += self.queue
+        self.yellow_left = np.maximum(self.yellow_left - 1, 0)
+        self.time += 1
+
+    def step(self, actions):
+        actions = np.broadcast_to(np.asarray(actions, dtype=np.int64), (self.num_envs,))
+
+        # Min green, and no new request while a change is still in its yellow
+        switch = ((actions != self.action) & (self.time_in_phase >= self.min_green_duration)
+                  & (self.yellow_left <= 0))
+        self.action[switch] = actions[switch]
+        self.yellow_left[switch] = self.yellow_duration
+        self.time_in_phase[switch] = 0
+        self.phase_changes += switch
+
+        # Vehicle-seconds queued, one term per simulated second
+        halting_time = np.zeros(self.num_envs)
+        for _ in range(self.decision_interval):
+            self._tick()
+            halting_time += self.queue.sum(axis=1)
+        elapsed = self.decision_interval
+        self.time_in_phase += elapsed
+
+        waiting = self.waiting.sum(axis=1)
+        queue_length = halting_time / elapsed
+        rewards = (-halting_time).astype(np.float32)
+        self.sum_waiting += waiting
+        self.sum_queue += queue_length
+        self.steps += 1
+
+        # Every vehicle has arrived and left (whole vehicles - the queues are fluid)
+        dones = (((self.time >= self.horizon) & (self.queue.sum(axis=1) < 0.5))
+                 | (self.time >= self.max_duration))
+        info = {'elapsed': elapsed, 'time': self.time.copy(), 'phase_changes': switch}
+
+        if dones.any():
+            self._finish_episodes(dones)
+        if self.single:
+            return self.get_state(), float(rewards[0]), bool(dones[0]), {
+                'elapsed': elapsed, 'time': float(info['time'][0]), 'emergency_override': False}
+
+        # Auto-reset, as VectorTrafficEnv workers do
+        if dones.any():
+            self._reset_envs(dones)
+            info['reset_time'] = 0.0
+        return self.get_state(), rewards, dones, info
+
+    def _finish_episodes(self, dones):
+        """Fold the per-episode means of finished intersections into the statistics"""
+        for avg_waiting, avg_queue, passed in zip(self.sum_waiting[dones] / self.steps[dones],
+                                                  self.sum_queue[dones] / self.steps[dones],
+                                                  self.passed[dones]):
+            for stats in (self.stats, self.run_stats):
+                stats.update('waiting_time', avg_waiting)
+                stats.update('queue_length', avg_queue)
+                stats.update('vehicles_passed', passed)
+
+    def episode_summary(self):
+        """Current episode of every intersection (scalars when num_envs=1)"""
+        steps = np.maximum(self.steps, 1)
+        summary = {
+            'avg_waiting_time': self.sum_waiting / steps,
+            'avg_queue_length': self.sum_queue / steps,
+            'total_phase_changes': self.phase_changes.copy(),
+            'total_vehicles': np.floor(self.passed).astype(np.int64),
+            'steps': self.steps.copy(),
+        }
+        if self.single:
+            summary = {key: value[0].item() for key, value in summary.items()}
+        summary['reset_time'] = self.reset_time
+        return summary
+
+    def close(self):
+        pass
+
+def pretrain_agent(episodes=1000, num_envs=256, prioritized=False, route_files=None,
+                   model_path='models/traffic_dqn_surrogate.pth', replays_per_step=4, seed=None):
+    """
+    Train the 6-input DQN on surrogate intersections, for fine-tuning in SUMO
+
+    Counts finished intersection episodes; every step stores num_envs
+    transitions and runs replays_per_step gradient updates.
+    """
+    from traffic_dqn_main import DQNAgent, print_run_stats
+
+    env = SurrogateTrafficEnvironment(num_envs=num_envs, route_files=route_files, seed=seed)
+    agent = DQNAgent(state_size=env.state_size, action_size=env.action_size, prioritized=prioritized)
+
+    states = env.reset()
+    episode_rewards = np.zeros(num_envs)
+    episode = 0
+    start = time.perf_counter()
+
+    while episode < episodes:
+        actions = agent.act(states)
+        next_states, rewards, dones, info = env.step(actions)
+
+        agent.remember_batch(states, actions, rewards, next_states, dones.astype(np.float32))
+        states = next_states
+        episode_rewards += rewards
+
+        for _ in range(replays_per_step):
+            agent.replay()
+
+        finished = int(dones.sum())
+        if finished:
+            agent.update_target_model()
+            if agent.epsilon > agent.epsilon_min:
+                agent.epsilon = max(agent.epsilon_min, agent.epsilon * agent.epsilon_decay ** finished)
+
+            if episode // 100 != (episode + finished) // 100:
+                print(f"Ep {episode + finished}/{episodes} | Reward: {episode_rewards[dones].mean():.1f} | "
+                      f"ε: {agent.epsilon:.3f} | Elapsed: {time.perf_counter() - start:.0f}s")
+            episode_rewards[dones] = 0
+            episode += finished
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    agent.save(model_path)
+    print(f"Pretraining complete. Model saved to {model_path}")
+    print_run_stats(env.run_stats)
+    return model_path
@@ -0,0 +1,25 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The eclipse-sumo wheel ships its own SUMO_HOME
+if 'SUMO_HOME' not in os.environ:
+    try:
+        import sumo
+        os.environ['SUMO_HOME'] = sumo.SUMO_HOME
+    except ImportError:
+        pass
+
+requires_sumo = pytest.mark.skipif('SUMO_HOME' not in os.environ or shutil.which('sumo') is None,
+                                   reason="SUMO is not installed")
+
+@pytest.fixture
+def scenario_dir(monkeypatch):
+    """Run from the repository root, where the intersection scenario lives"""
+    monkeypatch.chdir(ROOT)
+    return ROOT
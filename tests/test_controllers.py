@@ -0,0 +1,73 @@
+from conftest import requires_sumo
+
+@requires_sumo
+def test_observed_action_follows_signal(scenario_dir):
+    from traffic_dqn_main import TrafficEnvironment
+    from controllers import make_controller
+    from evaluation import CONTROLLER_ENV_KWARGS
+
+    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', seed=42, log_dir=None,
+                             **CONTROLLER_ENV_KWARGS)
+    controller = make_controller('actuated', env=env, max_green=60)
+    env.reset()
+    mismatches = []
+    done = False
+    while not done:
+        obs = env.controller_observation()
+        phase = env.sumo.trafficlight.getPhase(env.tls_id)
+        expected = env.phases.index(phase) if phase in env.phases else -1
+        if obs.action[0] != expected:
+            mismatches.append((obs.time[0], obs.action[0], phase))
+        _, _, done, _ = env.step(int(controller.act(obs)[0]))
+    env.close()
+
+    assert not mismatches
+
+def test_actuated_gap_out_and_max_out():
+    import numpy as np
+    from controllers import ActuatedController, JunctionObservation
+
+    controller = ActuatedController(min_green=10, max_green=30, gap_time=3)
+    vehicles = np.array([[2.0, 0.0, 1.0, 0.0]] * 4)
+    # Rows: vehicles still arriving, gap after min green, gap before min green, arriving but at max green
+    obs = JunctionObservation(
+        queues=vehicles, vehicles=vehicles, pressure=np.zeros_like(vehicles),
+        gaps=np.array([[1.0] * 4, [4.0] * 4, [4.0] * 4, [0.0] * 4]),
+        action=np.zeros(4, dtype=np.int64), time_in_phase=np.array([15.0, 15.0, 5.0, 30.0]),
+        time=np.full(4, 100.0))
+
+    # Switching skips the action without demand
+    np.testing.assert_array_equal(controller.act(obs), [0, 2, 0, 2])
+
+def test_route_vehicles_expands_flows(tmp_path):
+    from controllers import route_vehicles
+
+    route_file = tmp_path / 'flows.rou.xml'
+    route_file.write_text("""<routes>
+    <route id="n_s" edges="N2TL TL2S" />
+    <vehicle id="v0" route="n_s" depart="3" />
+    <flow id="hourly" route="n_s" begin="0" end="60" vehsPerHour="360" />
+    <flow id="periodic" begin="100" end="110" period="4"><route edges="E2TL TL2W" /></flow>
+    <flow id="counted" from="S2TL" to="TL2N" begin="0" end="100" number="4" />
+    <flow id="random" route="n_s" begin="200" end="300" probability="0.05" />
+    <flow id="open" route="n_s" begin="0" period="2" number="3" />
+</routes>
+""")
+    departs = {}
+    for depart, edges in route_vehicles(str(route_file)):
+        departs.setdefault(tuple(edges), []).append(depart)
+
+    assert departs[('E2TL', 'TL2W')] == [100.0, 104.0, 108.0]
+    assert departs[('S2TL', 'TL2N')] == [0.0, 25.0, 50.0, 75.0]
+    # v0, six hourly-flow vehicles, five at the expected probability rate and three counted ones
+    assert sorted(departs[('N2TL', 'TL2S')]) == [0.0, 0.0, 2.0, 3.0, 4.0, 10.0, 20.0, 30.0, 40.0, 50.0,
+                                                 200.0, 220.0, 240.0, 260.0, 280.0]
+
+def test_flow_without_rate_is_rejected(tmp_path):
+    import pytest
+    from controllers import route_vehicles
+
+    route_file = tmp_path / 'bad.rou.xml'
+    route_file.write_text('<routes><flow id="f" from="N2TL" to="TL2S" begin="0" end="60" /></routes>')
+    with pytest.raises(ValueError, match="Flow 'f'"):
+        list(route_vehicles(str(route_file)))
@@ -0,0 +1,30 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from dynamic_traffic_gen import generate_dynamic_traffic
+
+def _departures(path):
+    return [float(vehicle.get('depart')) for vehicle in ET.parse(path).getroot().iter('vehicle')]
+
+@pytest.mark.parametrize('pattern', ['rush_hour', 'random'])
+def test_same_seed_reproduces_routes(tmp_path, pattern):
+    paths = [str(tmp_path / f'{name}.rou.xml') for name in ('a', 'b', 'c')]
+    generate_dynamic_traffic(900, paths[0], pattern, seed=7, chunk_seconds=300)
+    generate_dynamic_traffic(900, paths[1], pattern, seed=7, chunk_seconds=300)
+    generate_dynamic_traffic(900, paths[2], pattern, seed=8, chunk_seconds=300)
+
+    with open(paths[0]) as a, open(paths[1]) as b, open(paths[2]) as c:
+        first = a.read()
+        assert first == b.read()
+        assert first != c.read()
+
+    # SUMO needs vehicles sorted by departure time
+    departs = _departures(paths[0])
+    assert departs and departs == sorted(departs)
+    assert departs[-1] < 900
+
+def test_uniform_pattern_spans_chunks(tmp_path):
+    path = str(tmp_path / 'uniform.rou.xml')
+    generate_dynamic_traffic(100, path, 'uniform', seed=0, chunk_seconds=30)
+    assert _departures(path) == [float(t) for t in range(0, 100, 4)]
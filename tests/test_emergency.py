@@ -0,0 +1,24 @@
+import xml.etree.ElementTree as ET
+
+from conftest import requires_sumo
+
+@requires_sumo
+def test_each_emergency_vehicle_preempts_once(scenario_dir, tmp_path):
+    from traffic_dqn_main import TrafficEnvironment
+
+    emergency_vehicles = sum(1 for vehicle in ET.parse('traffic.rou.xml').getroot().iter('vehicle')
+                             if vehicle.get('type') == 'emergency')
+    assert emergency_vehicles > 0
+
+    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', seed=42, log_dir=str(tmp_path))
+    env.reset()
+    steps = 0
+    done = False
+    while not done:
+        _, _, done, _ = env.step((steps // 6) % 4)
+        steps += 1
+    summary = env.episode_summary()
+    env.close()
+
+    assert 0 < summary['preemptions'] <= emergency_vehicles
+    assert summary['stats']['emergency/preemption_latency']['count'] == summary['preemptions']
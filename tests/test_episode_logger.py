@@ -0,0 +1,27 @@
+import numpy as np
+
+from episode_logger import EpisodeLogWriter, iter_episode_steps, load_episode_steps
+
+def test_log_round_trip_across_chunks(tmp_path):
+    path = str(tmp_path / 'episode.steps.npy')
+    writer = EpisodeLogWriter(path, chunk_size=4, max_pending=1)
+    for i in range(10):
+        writer.append(5.0 * (i + 1), 5.0, 2.0 * i, 0.5 * i, i % 8)
+    writer.close()
+
+    # Two full chunks and the partial one written on close
+    assert [len(chunk) for chunk in iter_episode_steps(path)] == [4, 4, 2]
+
+    steps = load_episode_steps(path)
+    np.testing.assert_array_equal(steps['time'], 5.0 * np.arange(1, 11))
+    np.testing.assert_array_equal(steps['waiting_time'], 2.0 * np.arange(10))
+    np.testing.assert_array_equal(steps['queue_length'], 0.5 * np.arange(10))
+    np.testing.assert_array_equal(steps['phase'], np.arange(10) % 8)
+
+def test_empty_log(tmp_path):
+    path = str(tmp_path / 'empty.steps.npy')
+    EpisodeLogWriter(path).close()
+
+    steps = load_episode_steps(path)
+    assert len(steps) == 0
+    assert steps.dtype.names == ('time', 'elapsed', 'waiting_time', 'queue_length', 'phase')
@@ -0,0 +1,67 @@
+import numpy as np
+
+from conftest import requires_sumo
+
+FEATURES = ['queue', 'waiting', 'phase', 'time_in_phase']
+
+@requires_sumo
+def test_exported_models_carry_observation_stats(scenario_dir, tmp_path):
+    from traffic_dqn_main import DQNAgent, TrafficEnvironment
+    from evaluation import DQNPolicy
+    from inference import export_model
+    from numpy_policy import export_numpy, LookupTablePolicy
+
+    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', seed=42, log_dir=None,
+                             observation_features=FEATURES)
+    stats = env.obs_builder.stats
+    stats.update(np.random.default_rng(0).exponential(5.0, size=(50, stats.mean.shape[0])))
+
+    agent = DQNAgent(state_size=env.state_size, action_size=4, memory_size=1)
+    model_path = str(tmp_path / 'traffic_dqn_obs.pth')
+    agent.save(model_path, obs_stats=stats)
+    paths = [model_path, export_model(model_path), export_numpy(model_path)]
+
+    states = np.random.default_rng(1).normal(size=(32, env.state_size)).astype(np.float32)
+    reference = None
+    for path in paths:
+        env.obs_builder.update_stats = True
+        env.obs_builder.stats = type(stats)(stats.mean.shape[0])
+        policy = DQNPolicy(path, env=env)
+
+        # Every format restores the training statistics and stops updating them
+        assert not env.obs_builder.update_stats
+        assert env.obs_builder.stats.count == stats.count
+        np.testing.assert_allclose(env.obs_builder.stats.mean, stats.mean)
+        np.testing.assert_allclose(env.obs_builder.stats.m2, stats.m2)
+
+        actions = [policy.act(state) for state in states]
+        assert reference is None or actions == reference
+        reference = actions
+
+    # The lookup table keeps the statistics of the network it was compiled from
+    table_path = str(tmp_path / 'table.npz')
+    LookupTablePolicy.compile(DQNPolicy(paths[2]).agent, bins=[((0,), (0, 1))] * env.state_size).save(table_path)
+    np.testing.assert_allclose(LookupTablePolicy.load(table_path).obs_stats.mean, stats.mean)
+
+    # Evaluation steps straight from the exported file (an untrained policy may never clear the network)
+    policy = DQNPolicy(paths[2], env=env)
+    state = env.reset()
+    for _ in range(20):
+        state, _, done, _ = env.step(policy.act(state))
+        assert not done
+    env.close()
+    np.testing.assert_allclose(env.obs_builder.stats.mean, stats.mean)
+
+@requires_sumo
+def test_legacy_model_exports_without_stats(tmp_path):
+    from traffic_dqn_main import DQNAgent
+    from inference import InferencePolicy, export_model
+    from numpy_policy import NumpyPolicy, export_numpy
+
+    model_path = str(tmp_path / 'traffic_dqn.pth')
+    DQNAgent(state_size=6, action_size=4, memory_size=1).save(model_path)
+
+    script = InferencePolicy(export_model(model_path), max_batch=4)
+    network = NumpyPolicy(export_numpy(model_path))
+    assert (script.state_size, script.action_size) == (network.state_size, network.action_size) == (6, 4)
+    assert script.obs_stats is None and network.obs_stats is None
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from log_index import LogIndex, open_log_index
+
+def _summary(waiting, passenger=0, bus=0):
+    return {'avg_waiting_time': waiting, 'avg_queue_length': waiting / 2, 'total_phase_changes': 3,
+            'total_vehicles': passenger + bus, 'vehicles_passed': {'passenger': passenger, 'bus': bus}}
+
+def test_index_round_trip(tmp_path):
+    index = LogIndex(str(tmp_path))
+    index.add_episode('episode_2', _summary(20.0, passenger=5))
+    index.add_episode('episode_1', _summary(10.0, passenger=2, bus=1))
+    # Re-adding an episode replaces it
+    index.add_episode('episode_2', _summary(30.0, passenger=6))
+
+    assert len(index) == 2
+    assert index.summaries() == [_summary(10.0, passenger=2, bus=1), _summary(30.0, passenger=6)]
+    assert index.column('avg_waiting_time') == [10.0, 30.0]
+    assert index.vehicle_totals() == {'passenger': 8, 'emergency': 0, 'bus': 1, 'truck': 0}
+    with pytest.raises(ValueError):
+        index.column('summary')
+    index.close()
+
+def test_sync_indexes_only_new_files(tmp_path):
+    for name, waiting in (('episode_a', 1.0), ('episode_b', 2.0)):
+        with open(tmp_path / f'{name}.json', 'w') as f:
+            json.dump({'summary': _summary(waiting)}, f)
+
+    index = open_log_index(str(tmp_path))
+    assert len(index) == 2
+    assert index.sync() == 0
+
+    with open(tmp_path / 'episode_c.json', 'w') as f:
+        json.dump({'summary': _summary(3.0)}, f)
+    assert index.sync() == 1
+    assert index.column('avg_waiting_time') == [1.0, 2.0, 3.0]
+    index.close()
+
+    # The index persists in the log directory
+    reopened = LogIndex(str(tmp_path))
+    assert len(reopened) == 3
+    reopened.close()
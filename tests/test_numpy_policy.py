@@ -0,0 +1,53 @@
+import numpy as np
+
+from numpy_policy import LEGACY_BINS, LookupTablePolicy, NumpyPolicy, load_policy, sample_states
+
+def _network(tmp_path, sizes=(6, 16, 8, 4), seed=0):
+    rng = np.random.default_rng(seed)
+    arrays = {}
+    for i, (fan_in, fan_out) in enumerate(zip(sizes[:-1], sizes[1:])):
+        arrays[f'w{i}'] = rng.normal(size=(fan_in, fan_out)).astype(np.float32)
+        arrays[f'b{i}'] = rng.normal(size=fan_out).astype(np.float32)
+    path = str(tmp_path / 'network.npz')
+    np.savez(path, **arrays)
+    return path, arrays
+
+def test_forward_pass_matches_reference(tmp_path):
+    path, arrays = _network(tmp_path)
+    policy = NumpyPolicy(path)
+    assert (policy.state_size, policy.action_size) == (6, 4)
+    assert policy.obs_stats is None
+
+    states = sample_states(100)
+    x = states.astype(np.float64)
+    for i in range(3):
+        x = x @ arrays[f'w{i}'] + arrays[f'b{i}']
+        if i < 2:
+            x = np.maximum(x, 0)
+    np.testing.assert_allclose(policy.q_values(states), x, rtol=1e-4, atol=1e-4)
+
+    # One state gives an int, a batch an array
+    assert policy.act(states[0]) == int(x[0].argmax())
+    np.testing.assert_array_equal(policy.act(states), x.argmax(1))
+
+def test_lookup_table_picks_cell_actions(tmp_path):
+    network = NumpyPolicy(_network(tmp_path)[0])
+    table = LookupTablePolicy.compile(network)
+    assert table.table.shape == (8, 8, 8, 8, 4, 8) and table.table.dtype == np.uint8
+
+    # At the representative points the table agrees with the network exactly
+    rng = np.random.default_rng(1)
+    centers = np.array([[rng.choice(centers) for _, centers in LEGACY_BINS] for _ in range(200)],
+                       dtype=np.float32)
+    np.testing.assert_array_equal(table.act(centers), network.act(centers))
+
+    # Values on a bin edge fall into the upper bin
+    assert [int(cell[0]) for cell in table.cells([1, 0, 20, 4.9, 1, 60])] == [1, 0, 7, 3, 1, 7]
+
+    path = str(tmp_path / 'table.npz')
+    table.save(path)
+    loaded = load_policy(path)
+    assert isinstance(loaded, LookupTablePolicy)
+    states = sample_states(1000)
+    np.testing.assert_array_equal(loaded.act(states), table.act(states))
+    assert isinstance(load_policy(str(tmp_path / 'network.npz')), NumpyPolicy)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from online_stats import RunningStats, TDigest, StatsAccumulator
+
+def test_running_stats_merge_matches_numpy():
+    values = np.random.default_rng(0).normal(10.0, 3.0, size=1000)
+    parts = [RunningStats() for _ in range(3)]
+    for part, chunk in zip(parts, np.array_split(values, [100, 700])):
+        for x in chunk:
+            part.update(x)
+
+    # An empty partial result merges in either direction
+    merged = RunningStats().merge(parts[0]).merge(parts[1]).merge(parts[2]).merge(RunningStats())
+    assert merged.count == len(values)
+    np.testing.assert_allclose(merged.mean, values.mean())
+    np.testing.assert_allclose(merged.variance, values.var())
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+def test_tdigest_quantiles_close_to_numpy():
+    values = np.random.default_rng(1).exponential(30.0, size=20000)
+    digest = TDigest()
+    for x in values:
+        digest.update(x)
+
+    # Sketch size stays bounded by the compression
+    digest._compress()
+    assert len(digest.means) <= 2 * digest.compression
+    for q in (0.5, 0.9, 0.99):
+        np.testing.assert_allclose(digest.quantile(q), np.quantile(values, q), rtol=0.02)
+    assert digest.quantile(0.0) == values.min()
+    assert digest.quantile(1.0) == values.max()
+
+def test_tdigest_merge_matches_single_digest():
+    values = np.random.default_rng(2).normal(0.0, 1.0, size=8000)
+    parts = [TDigest() for _ in range(4)]
+    for part, chunk in zip(parts, np.array_split(values, 4)):
+        for x in chunk:
+            part.update(x)
+
+    merged = TDigest()
+    for part in parts:
+        merged.merge(part)
+    merged._compress()
+    assert merged.weights.sum() == len(values)
+    for q in (0.1, 0.5, 0.9):
+        np.testing.assert_allclose(merged.quantile(q), np.quantile(values, q), atol=0.03)
+
+def test_accumulators_merge_by_key():
+    first, second = StatsAccumulator(), StatsAccumulator()
+    for x in (1.0, 2.0, 3.0):
+        first.update('waiting_time', x)
+    second.update('waiting_time', 6.0)
+    second.update('vtype/bus/travel_time', 40.0)
+
+    summary = first.merge(second).summary()
+    assert list(summary) == ['vtype/bus/travel_time', 'waiting_time']
+    assert summary['waiting_time']['count'] == 4
+    assert summary['waiting_time']['mean'] == 3.0
+    assert summary['waiting_time']['max'] == 6.0
+    assert summary['vtype/bus/travel_time']['p50'] == 40.0
@@ -0,0 +1,88 @@
+import numpy as np
+
+from replay_buffer import ReplayBuffer, SumTree, PrioritizedReplayBuffer
+
+def _transition(i, state_size=3):
+    return np.full(state_size, i, dtype=np.float32), i % 4, float(i), np.full(state_size, i + 1), i % 2
+
+def test_ring_buffer_wraps_around():
+    buffer = ReplayBuffer(4, 3)
+    for i in range(6):
+        buffer.add(*_transition(i))
+
+    assert len(buffer) == 4
+    assert buffer.position == 2
+    # Transitions 4 and 5 overwrote the two oldest slots
+    np.testing.assert_array_equal(buffer.rewards, [4, 5, 2, 3])
+    np.testing.assert_array_equal(buffer.states[:, 0], [4, 5, 2, 3])
+    np.testing.assert_array_equal(buffer.next_states[:, 0], [5, 6, 3, 4])
+
+def test_add_batch_wraps_like_single_adds():
+    single, batched = ReplayBuffer(5, 3), ReplayBuffer(5, 3)
+    transitions = [_transition(i) for i in range(7)]
+    for transition in transitions:
+        single.add(*transition)
+
+    batched.add_batch(*(np.stack(field) for field in zip(*transitions[:3])))
+    idx = batched.add_batch(*(np.stack(field) for field in zip(*transitions[3:])))
+
+    np.testing.assert_array_equal(idx, [3, 4, 0, 1])
+    assert (len(batched), batched.position) == (len(single), single.position)
+    for ours, theirs in zip(batched.get(np.arange(5)), single.get(np.arange(5))):
+        np.testing.assert_array_equal(ours, theirs)
+
+def test_sample_only_filled_slots():
+    np.random.seed(0)
+    buffer = ReplayBuffer(100, 2)
+    for i in range(10):
+        buffer.add(*_transition(i, 2))
+
+    states, actions, rewards, next_states, dones = buffer.sample(256)
+    assert states.shape == (256, 2) and states.dtype == np.float32
+    assert actions.dtype == np.int64
+    assert set(rewards.tolist()) <= set(range(10))
+
+def test_sum_tree_update_and_find():
+    tree = SumTree(5)
+    tree.update(np.arange(5), [1.0, 2.0, 3.0, 4.0, 0.0])
+    assert tree.total == 10.0
+
+    # Cumulative ranges: [0, 1], (1, 3], (3, 6], (6, 10]
+    np.testing.assert_array_equal(tree.find([0.0, 1.0, 1.5, 3.0, 6.5, 10.0]), [0, 0, 1, 1, 3, 3])
+
+    tree.update([1, 3], [0.0, 1.0])
+    assert tree.total == 5.0
+    np.testing.assert_array_equal(tree.find([0.5, 1.5, 4.5]), [0, 2, 3])
+
+def test_sum_tree_samples_proportionally():
+    rng = np.random.default_rng(0)
+    priorities = np.array([1.0, 2.0, 3.0, 4.0])
+    tree = SumTree(4)
+    tree.update(np.arange(4), priorities)
+
+    counts = np.bincount(tree.find(rng.random(100000) * tree.total), minlength=4)
+    np.testing.assert_allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.01)
+
+def test_prioritized_weights_are_normalized():
+    np.random.seed(0)
+    buffer = PrioritizedReplayBuffer(8, 2, alpha=1.0, beta=0.5, beta_increment=0.1)
+    for i in range(8):
+        buffer.add(*_transition(i, 2))
+    buffer.update_priorities(np.arange(8), np.arange(1, 9, dtype=np.float64) - buffer.epsilon)
+
+    idx, weights = buffer.sample_prioritized(4)
+
+    # w_i = (N P(i)) ** -beta / max w - the rarest sample has weight 1
+    probs = (idx + 1) / 36.0
+    expected = (8 * probs) ** -0.5
+    np.testing.assert_allclose(weights, expected / expected.max(), rtol=1e-6)
+    assert weights.max() == 1.0
+    assert buffer.beta == 0.6
+
+def test_new_transitions_get_max_priority():
+    buffer = PrioritizedReplayBuffer(4, 2, alpha=1.0)
+    buffer.add(*_transition(0, 2))
+    buffer.update_priorities([0], [5.0])
+    buffer.add(*_transition(1, 2))
+
+    assert buffer.tree.get(1) == buffer.max_priority == 5.0 + buffer.epsilon
@@ -0,0 +1,47 @@
+import os
+
+import scenario_cache
+from conftest import requires_sumo
+from scenario_cache import get_scenario, install_scenario, scenario_key
+
+def test_key_changes_with_params():
+    params = {'num_vehicles': 1000, 'seed': 42, 'end': 3600}
+    assert scenario_key(params) == scenario_key(dict(reversed(list(params.items()))))
+    keys = {scenario_key(params), scenario_key({**params, 'seed': 43}),
+            scenario_key({**params, 'num_vehicles': 500}), scenario_key({**params, 'end': 7200}),
+            scenario_key({**params, 'grid': [2, 2]}), scenario_key({**params, 'grid': [1, 3]})}
+    assert len(keys) == 6
+
+def test_get_scenario_builds_once_per_key(tmp_path, monkeypatch):
+    builds = []
+
+    def build_scenario(params, output_dir):
+        builds.append(params)
+        for name in scenario_cache.scenario_artifacts(params):
+            with open(os.path.join(output_dir, name), 'w') as f:
+                f.write(str(params['seed']))
+
+    monkeypatch.setattr(scenario_cache, 'build_scenario', build_scenario)
+    cache_dir = str(tmp_path / 'cache')
+
+    first = get_scenario(seed=1, cache_dir=cache_dir)
+    assert get_scenario(seed=1, cache_dir=cache_dir) == first
+    second = get_scenario(seed=2, cache_dir=cache_dir)
+    assert second != first
+    assert [params['seed'] for params in builds] == [1, 2]
+    # No build directories are left behind
+    assert sorted(os.listdir(cache_dir)) == sorted(map(os.path.basename, (first, second)))
+
+    # Installing a different scenario replaces the older files
+    dest = tmp_path / 'work'
+    dest.mkdir()
+    install_scenario(first, str(dest))
+    install_scenario(second, str(dest))
+    assert (dest / 'traffic.rou.xml').read_text() == '2'
+
+@requires_sumo
+def test_grid_scenario_is_cached(tmp_path):
+    path = get_scenario(num_vehicles=20, end=100, grid=(1, 2), cache_dir=str(tmp_path))
+    install_scenario(path, str(tmp_path))
+    for name in ('grid_1x2.net.xml', 'grid_1x2.rou.xml', 'grid_1x2.sumocfg'):
+        assert (tmp_path / name).exists()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from conftest import requires_sumo
+
+def _route_file(tmp_path):
+    # One vehicle every 2 s from the east, 40 vehicles from the north - all queue behind a red
+    path = tmp_path / 'surrogate.rou.xml'
+    path.write_text("""<routes>
+    <route id="e_w" edges="E2TL TL2W" />
+    <route id="n_s" edges="N2TL TL2S" />
+    <flow id="east" route="e_w" begin="0" end="40" period="2" />
+    <flow id="north" route="n_s" begin="0" end="20" number="40" />
+</routes>
+""")
+    return str(path)
+
+@requires_sumo
+def test_reward_integrates_every_second(scenario_dir, tmp_path):
+    from surrogate_env import SurrogateTrafficEnvironment
+
+    env = SurrogateTrafficEnvironment(route_files=[_route_file(tmp_path)], stochastic=False, decision_interval=5)
+    env.reset()
+    assert env.demand.shape[0] == 1 and env.demand.sum() == 60
+
+    # Hold the south green: nothing is served, so the east queue is its arrivals so far
+    east = env.demand[0, :, 1]
+    arrived = np.cumsum(np.concatenate([np.zeros(env.approach_time[1]), east]))
+    rewards = []
+    for _ in range(8):
+        _, reward, done, info = env.step(2)
+        rewards.append(reward)
+        assert not done and info['elapsed'] == 5
+    north = env.approach_time[0]
+
+    seconds = np.arange(1, 41)
+    halted = arrived[np.minimum(seconds - 1, len(arrived) - 1)]
+    # The north platoon arrives at a rate of 2 per second for 20 seconds
+    halted += np.clip(2 * (seconds - north), 0, 40)
+    np.testing.assert_allclose(rewards, -halted.reshape(8, 5).sum(axis=1), rtol=1e-6)
+
+    summary = env.episode_summary()
+    np.testing.assert_allclose(summary['avg_queue_length'], halted.sum() / 40, rtol=1e-6)
+    # Nobody was served, so the accumulated waiting time at the end is every queued second
+    np.testing.assert_allclose(env.waiting.sum(), halted.sum())
+
+@requires_sumo
+def test_vector_surrogate_resets_finished_intersections(scenario_dir, tmp_path):
+    from surrogate_env import SurrogateTrafficEnvironment
+
+    env = SurrogateTrafficEnvironment(num_envs=3, route_files=[_route_file(tmp_path)], seed=0)
+    states = env.reset()
+    assert states.shape == (3, 6)
+
+    finished = np.zeros(3, dtype=bool)
+    for step in range(200):
+        # Serve the approaches in turn
+        states, rewards, dones, info = env.step(np.full(3, (step // 6) % 4))
+        assert rewards.shape == (3,) and (rewards <= 0).all()
+        finished |= dones
+        if finished.all():
+            break
+    assert finished.all()
+    # Poisson arrivals around the 60 vehicles of the route file, all served by the end
+    passed = env.run_stats.summary()['vehicles_passed']
+    assert passed['count'] >= 3 and 30 < passed['mean'] < 90
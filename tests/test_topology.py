@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import ROOT, requires_sumo
+
+@pytest.fixture
+def network(tmp_path):
+    """The intersection network in a scratch directory, where the index cache can be written"""
+    for name in ('intersection.net.xml', 'tls_program.add.xml'):
+        shutil.copy2(os.path.join(ROOT, name), tmp_path / name)
+    return str(tmp_path / 'intersection.net.xml'), [str(tmp_path / 'tls_program.add.xml')]
+
+@requires_sumo
+def test_intersection_layout(network):
+    from topology import load_network_index
+
+    index = load_network_index(*network)
+    assert index.tls_ids == ['TL']
+    tls = index['TL']
+    assert tls.incoming_edges == ['N2TL', 'E2TL', 'S2TL', 'W2TL']
+    assert tls.lanes == [f'{edge}_{i}' for edge in tls.incoming_edges for i in (0, 1)]
+    assert all(index.lane_tls[lane] == 'TL' for lane in tls.lanes)
+    assert index.edges['N2TL'] == (189.6, 13.89)
+
+    # Link indices cover the whole state string, in lane order
+    assert sorted(i for links in tls.lane_links.values() for i in links) == list(range(20))
+    assert tls.lane_links['N2TL_0'] == [0, 1]
+
+    # The 8-phase program from tls_program.add.xml: one approach green per even phase
+    assert len(tls.program('dqn')) == 8
+    greens = tls.green_lanes['dqn']
+    for action, edge in enumerate(tls.incoming_edges):
+        assert greens[2 * action] == {f'{edge}_0', f'{edge}_1'}
+        assert greens[2 * action + 1] == frozenset()
+
+    # netconvert's own program pairs opposite approaches
+    assert tls.green_lanes['0'][0] == {'N2TL_0', 'N2TL_1', 'S2TL_0', 'S2TL_1'}
+    assert {lane for lane, _ in tls.green_movements('dqn', 0)} == {'N2TL_0', 'N2TL_1'}
+
+@requires_sumo
+def test_index_cache_follows_files(network, monkeypatch):
+    import topology
+
+    net_file, additional_files = network
+    first = topology.load_network_index(net_file, additional_files)
+    assert os.path.exists(net_file + '.topology.pkl')
+
+    parses = []
+    from_files = topology.NetworkIndex.from_files
+    monkeypatch.setattr(topology.NetworkIndex, 'from_files',
+                        lambda *args: parses.append(args) or from_files(*args))
+
+    cached = topology.load_network_index(net_file, additional_files)
+    assert not parses
+    assert cached.tls_ids == first.tls_ids and cached.edges == first.edges
+
+    # A changed input file invalidates the cache
+    stat = os.stat(additional_files[0])
+    os.utime(additional_files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    topology.load_network_index(net_file, additional_files)
+    assert len(parses) == 1
@@ -0,0 +1,137 @@
+import os
+import pickle
+import sumolib
+
+# Bump when the pickled layout changes so stale caches are rebuilt
+CACHE_VERSION = 4
+
+class TLSTopology:
+    """
+    Static layout of one traffic light
+
+    - links[i]: incoming lane controlled by link index i (None for unused indices)
+    - out_links[i]: outgoing lane of link index i
+    - lanes / incoming_edges: incoming lanes and edges in link order, without repeats
+    - lane_links[lane]: link indices of a lane
+    - programs[program_id]: phase state strings
+    - green_lanes[program_id][phase]: frozenset of lanes with a green (G/g) link in that phase
+    - lane_lengths[lane]: length of each incoming lane in metres
+    """
+
+    def __init__(self, tls_id, links, programs, lane_lengths=None, out_links=None):
+        self.tls_id = tls_id
+        self.links = links
+        self.out_links = out_links or [None] * len(links)
+        self.lane_lengths = lane_lengths or {}
+        self.lanes = list(dict.fromkeys(lane for lane in links if lane is not None))
+        self.incoming_edges = list(dict.fromkeys(lane.rsplit('_', 1)[0] for lane in self.lanes))
+
+        self.lane_links = {lane: [] for lane in self.lanes}
+        for index, lane in enumerate(links):
+            if lane is not None:
+                self.lane_links[lane].append(index)
+
+        self.programs = programs
+        self.green_lanes = {
+            program_id: [frozenset(lane for index, lane in enumerate(links)
+                                   if lane is not None and index < len(state) and state[index] in 'Gg')
+                         for state in states]
+            for program_id, states in programs.items()
+        }
+
+    def program(self, program_id=None):
+        """Phase states of program_id, or of the first program when it is missing"""
+        if program_id in self.programs:
+            return self.programs[program_id]
+        return next(iter(self.programs.values()))
+
+    def green_movements(self, program_id, phase):
+        """(incoming lane, outgoing lane) of every link with a green (G/g) in a phase"""
+        state = self.program(program_id)[phase]
+        return [(lane, self.out_links[index]) for index, lane in enumerate(self.links)
+                if lane is not None and index < len(state) and state[index] in 'Gg']
+
+class NetworkIndex:
+    """
+    TLS topology of a whole network with O(1) lookups by TLS ID and by lane
+
+    edges[edge_id] holds (length, speed limit) of every normal edge, for
+    free-flow travel times.
+    """
+
+    def __init__(self, tls, edges=None):
+        self.tls = {topology.tls_id: topology for topology in tls}
+        self.lane_tls = {lane: topology.tls_id for topology in tls for lane in topology.lanes}
+        self.edges = edges or {}
+
+    @property
+    def tls_ids(self):
+        return list(self.tls)
+
+    def __getitem__(self, tls_id):
+        return self.tls[tls_id]
+
+    @classmethod
+    def from_files(cls, net_file, additional_files=()):
+        """Parse the network (and tlLogic programs in additional files) with sumolib"""
+        net = sumolib.net.readNet(net_file, withPrograms=True)
+
+        programs = {}
+        for tls in net.getTrafficLights():
+            programs[tls.getID()] = {program_id: [phase.state for phase in program.getPhases()]
+                                     for program_id, program in tls.getPrograms().items()}
+        for add_file in additional_files:
+            for logic in sumolib.xml.parse(add_file, 'tlLogic'):
+                if logic.id in programs:
+                    programs[logic.id][logic.programID] = [phase.state for phase in logic.phase]
+
+        topologies = []
+        for tls in net.getTrafficLights():
+            connections = tls.getConnections()
+            links = [None] * (max((index for _, _, index in connections), default=-1) + 1)
+            out_links = list(links)
+            lane_lengths = {}
+            for in_lane, out_lane, index in connections:
+                links[index] = in_lane.getID()
+                out_links[index] = out_lane.getID()
+                lane_lengths[in_lane.getID()] = in_lane.getLength()
+            topologies.append(TLSTopology(tls.getID(), links, programs[tls.getID()], lane_lengths, out_links))
+
+        edges = {edge.getID(): (edge.getLength(), edge.getSpeed()) for edge in net.getEdges()}
+        return cls(topologies, edges)
+
+def _cache_key(files):
+    key = [CACHE_VERSION]
+    for path in files:
+        stat = os.stat(path)
+        key.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return key
+
+def load_network_index(net_file, additional_files=(), use_cache=True):
+    """
+    Network index for net_file, cached next to it as <net_file>.topology.pkl
+
+    The cache is reused while the network and additional files are unchanged
+    (same path, size and mtime), so large networks are parsed only once.
+    """
+    files = [net_file] + list(additional_files)
+    cache_file = net_file + '.topology.pkl'
+    key = _cache_key(files)
+
+    if use_cache and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached_key, index = pickle.load(f)
+            if cached_key == key:
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # Unreadable or from an older layout - rebuild
+
+    index = NetworkIndex.from_files(net_file, additional_files)
+    if use_cache:
+        # Write then rename, so parallel workers never read a partial cache
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump((key, index), f)
+        os.replace(tmp_file, cache_file)
+    return index
@@ -4,10 +4,7 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from collections import deque
 import random
-import json
-from datetime import datetime
 
 # SUMO environment check
 if 'SUMO_HOME' in os.environ:
@@ -16,8 +13,10 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("Please declare environment variable 'SUMO_HOME'")
 
-import traci
-import sumolib
+# The environment lives in its own module so torch-free tools can import it
+from traffic_env import TrafficEnvironment
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from online_stats import VectorRunningStats
 
 class DQNNetwork(nn.Module):
     def __init__(self, state_size, action_size):
@@ -33,200 +32,16 @@ class DQNNetwork(nn.Module):
         x = torch.relu(self.fc3(x))
         return self.fc4(x)
 
-class TrafficEnvironment:
-    def __init__(self, net_file, route_file, use_gui=False):
-        self.net_file = net_file
-        self.route_file = route_file
-        self.use_gui = use_gui
-        # EDITED: Get traffic light ID dynamically from network
-        self.tls_id = None
-        
-        # EDITED: Traffic phases with yellow transitions (8 phases total)
-        # Green phases: 0=North, 2=East, 4=South, 6=West
-        # Yellow phases: 1, 3, 5, 7 (auto-handled by SUMO)
-        self.phases = [0, 2, 4, 6]  # DQN chooses from 4 green phases
-        self.min_green_duration = 10
-        
-        self.current_phase = 0
-        self.time_since_last_phase_change = 0
-        
-        # Data logging
-        self.episode_data = {
-            'waiting_times': [],
-            'queue_lengths': [],
-            'phase_changes': [],
-            'vehicles_passed': {'passenger': 0, 'emergency': 0, 'bus': 0, 'truck': 0},
-            'total_vehicles': 0
-        }
-        
-    def start_simulation(self):
-        sumo_cmd = ['sumo-gui' if self.use_gui else 'sumo', '-c', 'simulation.sumocfg',
-                    '--no-warnings', '--no-step-log', '--time-to-teleport', '-1']
-        traci.start(sumo_cmd)
-        
-        # EDITED: Get actual traffic light ID from simulation
-        tls_ids = traci.trafficlight.getIDList()
-        if len(tls_ids) == 0:
-            raise Exception("No traffic lights found in network")
-        self.tls_id = tls_ids[0]  # Use first traffic light
-        
-        # EDITED: Switch to our custom 'dqn' program
-        traci.trafficlight.setProgram(self.tls_id, 'dqn')
-        
-        # Get available phases from traffic light program
-        logic = traci.trafficlight.getAllProgramLogics(self.tls_id)[0]
-        available_phases = len(logic.phases)
-        
-        # Debug: print traffic light info only once
-        if not hasattr(self, '_tls_printed'):
-            print(f"Traffic light ID: {self.tls_id}, Available phases: {available_phases}")
-            self._tls_printed = True
-        
-    def get_state(self):
-        # EDITED: State for 4 directions - [queue_N, queue_E, queue_S, queue_W, current_phase, time_in_phase]
-        lanes = ['N2TL_0', 'E2TL_0', 'S2TL_0', 'W2TL_0']  # North, East, South, West
-        queue_lengths = [traci.lane.getLastStepHaltingNumber(lane) for lane in lanes]
-        
-        state = queue_lengths + [self.current_phase, self.time_since_last_phase_change]
-        return np.array(state, dtype=np.float32)
-    
-    def step(self, action):
-        # EDITED: Ensure traffic light ID is set
-        if self.tls_id is None:
-            raise Exception("Traffic light ID not initialized. Call reset() first.")
-        
-        # Emergency vehicle check - RULE-BASED OVERRIDE
-        emergency_override = self._check_emergency_vehicles()
-        if emergency_override is not None:
-            action = emergency_override
-        
-        reward = 0
-        target_phase = self.phases[action]
-        
-        # Change phase if needed
-        if target_phase != self.current_phase and self.time_since_last_phase_change >= self.min_green_duration:
-            self._change_phase(target_phase)
-            self.time_since_last_phase_change = 0
-        else:
-            traci.simulationStep()
-            self.time_since_last_phase_change += 1
-        
-        # Calculate reward (negative waiting time to minimize)
-        total_waiting_time = 0
-        lanes = ['N2TL_0', 'E2TL_0', 'S2TL_0', 'W2TL_0']  # All four directions
-        for lane in lanes:
-            total_waiting_time += traci.lane.getWaitingTime(lane)
-        
-        reward = -total_waiting_time
-        
-        # Log data
-        self._log_step_data(total_waiting_time, lanes)
-        
-        next_state = self.get_state()
-        done = traci.simulation.getMinExpectedNumber() <= 0
-        
-        return next_state, reward, done
-    
-    def _check_emergency_vehicles(self):
-        """Rule-based emergency vehicle preemption - one direction at a time"""
-        # EDITED: Check each direction individually (N=0, E=1, S=2, W=3)
-        lanes = {0: ['N2TL_0'], 1: ['E2TL_0'], 2: ['S2TL_0'], 3: ['W2TL_0']}
-        
-        for action, lane_list in lanes.items():
-            for lane in lane_list:
-                vehicles = traci.lane.getLastStepVehicleIDs(lane)
-                for veh in vehicles:
-                    if traci.vehicle.getTypeID(veh) == 'emergency':
-                        return action  # Override to emergency vehicle direction
-        return None
-    
-    def _change_phase(self, target_phase):
-        """Change phase - SUMO handles yellow transitions automatically"""
-        # EDITED: Just set target phase, SUMO transitions through yellow automatically
-        traci.trafficlight.setPhase(self.tls_id, target_phase)
-        self.current_phase = target_phase
-        
-        # Wait minimum duration
-        for _ in range(self.min_green_duration):
-            traci.simulationStep()
-        
-        # Log phase change with timestamp
-        self.episode_data['phase_changes'].append({
-            'time': traci.simulation.getTime(),
-            'new_phase': target_phase
-        })
-    
-    def _log_step_data(self, waiting_time, lanes):
-        """Log important metrics during simulation"""
-        self.episode_data['waiting_times'].append(waiting_time)
-        
-        queue_length = sum([traci.lane.getLastStepHaltingNumber(lane) for lane in lanes])
-        self.episode_data['queue_lengths'].append(queue_length)
-        
-        # Count vehicles passed (departed vehicles)
-        for veh_id in traci.simulation.getArrivedIDList():
-            veh_type = traci.vehicle.getTypeID(veh_id) if veh_id in traci.vehicle.getIDList() else 'passenger'
-            if veh_type in self.episode_data['vehicles_passed']:
-                self.episode_data['vehicles_passed'][veh_type] += 1
-            self.episode_data['total_vehicles'] += 1
-    
-    def reset(self):
-        if traci.isLoaded():
-            traci.close()
-        
-        # Save episode data before reset (skip first time)
-        if self.tls_id is not None:
-            self._save_episode_data()
-        
-        # Reset episode data
-        self.episode_data = {
-            'waiting_times': [],
-            'queue_lengths': [],
-            'phase_changes': [],
-            'vehicles_passed': {'passenger': 0, 'emergency': 0, 'bus': 0, 'truck': 0},
-            'total_vehicles': 0
-        }
-        
-        self.current_phase = 0
-        self.time_since_last_phase_change = 0
-        self.start_simulation()
-        
-        # EDITED: Set initial traffic light phase after starting simulation
-        if self.tls_id:
-            traci.trafficlight.setPhase(self.tls_id, 0)
-        
-        return self.get_state()
-    
-    def _save_episode_data(self):
-        """Save episode data to JSON file"""
-        # EDITED: Skip if no data collected yet
-        if not self.episode_data['waiting_times']:
-            return
-            
-        os.makedirs('logs', exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f'logs/episode_{timestamp}.json'
-        
-        summary = {
-            'avg_waiting_time': np.mean(self.episode_data['waiting_times']) if self.episode_data['waiting_times'] else 0,
-            'avg_queue_length': np.mean(self.episode_data['queue_lengths']) if self.episode_data['queue_lengths'] else 0,
-            'total_phase_changes': len(self.episode_data['phase_changes']),
-            'vehicles_passed': self.episode_data['vehicles_passed'],
-            'total_vehicles': self.episode_data['total_vehicles']
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump({'summary': summary, 'details': self.episode_data}, f, indent=2)
-    
-    def close(self):
-        if traci.isLoaded():
-            traci.close()
-
 class DQNAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, memory_size=100000, prioritized=False):
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
+        # Preallocated ring buffer - memory is fixed at memory_size transitions
+        self.prioritized = prioritized
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(memory_size, state_size)
+        else:
+            self.memory = ReplayBuffer(memory_size, state_size)
         self.gamma = 0.95
         self.epsilon = 1.0
         self.epsilon_min = 0.01
@@ -246,34 +61,57 @@ class DQNAgent:
         self.target_model.load_state_dict(self.model.state_dict())
     
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
+    
+    def remember_batch(self, states, actions, rewards, next_states, dones):
+        self.memory.add_batch(states, actions, rewards, next_states, dones)
     
     def act(self, state):
+        # Batch of states (one row per environment) - one forward pass for all
+        if np.ndim(state) == 2:
+            return self._act_batch(state)
+        
         if np.random.rand() <= self.epsilon:
             return random.randrange(self.action_size)
         
-        state = torch.FloatTensor(state).unsqueeze(0).to(self.device)
-        with torch.no_grad():
+        state = torch.from_numpy(np.asarray(state, dtype=np.float32)).unsqueeze(0).to(self.device)
+        with torch.inference_mode():
             q_values = self.model(state)
         return q_values.argmax().item()
     
+    def _act_batch(self, states):
+        """Epsilon-greedy actions for a (num_envs, state_size) batch"""
+        states = torch.from_numpy(np.asarray(states, dtype=np.float32)).to(self.device)
+        with torch.inference_mode():
+            actions = self.model(states).argmax(1).cpu().numpy()
+        
+        explore = np.random.rand(len(actions)) <= self.epsilon
+        actions[explore] = np.random.randint(self.action_size, size=int(explore.sum()))
+        return actions
+    
     def replay(self):
         if len(self.memory) < self.batch_size:
             return 0
         
-        minibatch = random.sample(self.memory, self.batch_size)
-        
-        states = torch.FloatTensor([t[0] for t in minibatch]).to(self.device)
-        actions = torch.LongTensor([t[1] for t in minibatch]).to(self.device)
-        rewards = torch.FloatTensor([t[2] for t in minibatch]).to(self.device)
-        next_states = torch.FloatTensor([t[3] for t in minibatch]).to(self.device)
-        dones = torch.FloatTensor([t[4] for t in minibatch]).to(self.device)
+        # Vectorized index sampling; from_numpy shares the gathered arrays
+        if self.prioritized:
+            idx, weights = self.memory.sample_prioritized(self.batch_size)
+        else:
+            idx = self.memory.sample_indices(self.batch_size)
+        states, actions, rewards, next_states, dones = (
+            torch.from_numpy(a).to(self.device) for a in self.memory.get(idx))
         
-        current_q = self.model(states).gather(1, actions.unsqueeze(1))
+        current_q = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
         next_q = self.target_model(next_states).max(1)[0].detach()
         target_q = rewards + (1 - dones) * self.gamma * next_q
         
-        loss = self.criterion(current_q.squeeze(), target_q)
+        if self.prioritized:
+            # Importance-sampling weighted loss; TD errors become new priorities
+            td_errors = target_q - current_q
+            loss = (torch.from_numpy(weights).to(self.device) * td_errors.pow(2)).mean()
+            self.memory.update_priorities(idx, td_errors.detach().cpu().numpy())
+        else:
+            loss = self.criterion(current_q, target_q)
         
         self.optimizer.zero_grad()
         loss.backward()
@@ -281,17 +119,62 @@ class DQNAgent:
         
         return loss.item()
     
-    def save(self, filename):
-        torch.save(self.model.state_dict(), filename)
+    def save(self, filename, obs_stats=None):
+        """Save the weights - with obs_stats, also the observation normalization statistics"""
+        if obs_stats is None:
+            torch.save(self.model.state_dict(), filename)
+            return
+        state = obs_stats.state_dict()
+        torch.save({'model': self.model.state_dict(),
+                    'obs_stats': {'count': state['count'], 'mean': torch.from_numpy(state['mean']),
+                                  'm2': torch.from_numpy(state['m2'])}}, filename)
     
     def load(self, filename):
-        self.model.load_state_dict(torch.load(filename))
+        """Load the weights - returns the saved observation statistics (VectorRunningStats) or None"""
+        state_dict, obs_stats = load_checkpoint(filename)
+        self.model.load_state_dict(state_dict)
         self.update_target_model()
+        return obs_stats
+
+def load_checkpoint(filename):
+    """
+    (model state dict, observation statistics or None) of a DQNAgent.save() file
+
+    Models saved with obs_stats are a {'model', 'obs_stats'} dict, legacy
+    6-input models a plain state dict.
+    """
+    checkpoint = torch.load(filename, map_location='cpu')
+    if 'model' not in checkpoint:
+        return checkpoint, None
+    return checkpoint['model'], VectorRunningStats.from_state_dict(checkpoint['obs_stats'])
+
+def load_pretrained(agent, path, epsilon=0.1):
+    """Start from weights trained elsewhere (e.g. surrogate_env.pretrain_agent) with little exploration"""
+    agent.load(path)
+    agent.epsilon = epsilon
+
+def model_path_for(observation_features=None):
+    """Saved model path - models with a custom observation must not overwrite the 6-input one"""
+    return 'models/traffic_dqn_obs.pth' if observation_features else 'models/traffic_dqn.pth'
 
-def train_agent(episodes=100):
-    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', use_gui=False)
+def train_agent(episodes=100, backend=None, num_envs=1, prioritized=False, num_actors=0,
+                snapshot_times=None, observation_features=None, pretrained=None):
+    if num_actors > 0:
+        from actor_learner import train_actor_learner
+        return train_actor_learner(episodes=episodes, num_actors=num_actors, backend=backend,
+                                   prioritized=prioritized, snapshot_times=snapshot_times,
+                                   observation_features=observation_features, pretrained=pretrained)
+    if num_envs > 1:
+        return train_agent_vectorized(episodes=episodes, backend=backend, num_envs=num_envs,
+                                      prioritized=prioritized, snapshot_times=snapshot_times,
+                                      observation_features=observation_features, pretrained=pretrained)
+    
+    env = TrafficEnvironment('intersection.net.xml', 'traffic.rou.xml', use_gui=False, backend=backend,
+                             snapshot_times=snapshot_times, observation_features=observation_features)
     # EDITED: 4 actions now (N, E, S, W) instead of 2
-    agent = DQNAgent(state_size=6, action_size=4)
+    agent = DQNAgent(state_size=env.state_size, action_size=4, prioritized=prioritized)
+    if pretrained:
+        load_pretrained(agent, pretrained)
     
     for episode in range(episodes):
         state = env.reset()
@@ -300,7 +183,7 @@ def train_agent(episodes=100):
         
         while True:
             action = agent.act(state)
-            next_state, reward, done = env.step(action)
+            next_state, reward, done, info = env.step(action)
             
             agent.remember(state, action, reward, next_state, done)
             state = next_state
@@ -319,11 +202,96 @@ def train_agent(episodes=100):
         
         # EDITED: Minimal training progress log every 10 episodes
         if episode % 10 == 0:
-            print(f"Ep {episode}/{episodes} | Reward: {total_reward:.1f} | ε: {agent.epsilon:.3f} | Steps: {steps}")
+            print(f"Ep {episode}/{episodes} | Reward: {total_reward:.1f} | ε: {agent.epsilon:.3f} | Steps: {steps} | "
+                  f"Reset: {env.reset_time * 1000:.0f}ms")
+    
+    # Normalization statistics go with the model, so testing sees the same inputs
+    obs_stats = env.obs_builder.stats if env.obs_builder is not None else None
+    agent.save(model_path_for(observation_features), obs_stats=obs_stats)
+    env.close()
+    print("Training complete. Model saved.")
+    print_run_stats(env.run_stats)
+
+def print_run_stats(stats):
+    """Print waiting time and queue statistics merged over all episodes of a run"""
+    print("\n=== Run Statistics ===")
+    for key in ('waiting_time', 'queue_length', 'travel_time', 'delay'):
+        if key not in stats.metrics:
+            continue
+        summary = stats[key].summary()
+        print(f"{key}: mean {summary['mean']:.2f} (±{summary['std']:.2f}) | p50 {summary['p50']:.2f} | "
+              f"p90 {summary['p90']:.2f} | p99 {summary['p99']:.2f} | max {summary['max']:.2f}")
+    
+    if 'emergency/preemption_latency' in stats.metrics:
+        summary = stats['emergency/preemption_latency'].summary()
+        print(f"emergency preemption latency (s): {summary['count']} preemptions | mean {summary['mean']:.1f} | "
+              f"p90 {summary['p90']:.1f} | max {summary['max']:.1f}")
+
+def train_agent_vectorized(episodes=100, backend=None, num_envs=4, prioritized=False, snapshot_times=None,
+                           observation_features=None, pretrained=None, stats_sync_interval=50):
+    """
+    Train with num_envs SUMO instances stepped in lockstep by worker processes
+
+    With observation_features, the workers' normalization statistics are
+    merged every stats_sync_interval steps and every worker continues
+    from the total.
+    """
+    from vector_env import VectorTrafficEnv
+    
+    env = VectorTrafficEnv(num_envs, env_kwargs={'net_file': 'intersection.net.xml',
+                                                 'route_file': 'traffic.rou.xml',
+                                                 'backend': backend,
+                                                 'snapshot_times': snapshot_times,
+                                                 'observation_features': observation_features})
+    states = env.reset()
+    agent = DQNAgent(state_size=states.shape[1], action_size=4, prioritized=prioritized)
+    if pretrained:
+        load_pretrained(agent, pretrained)
+    
+    episode_rewards = np.zeros(num_envs)
+    episode_steps = np.zeros(num_envs, dtype=np.int64)
+    episode = 0
+    step = 0
+    obs_stats = None
+    
+    while episode < episodes:
+        actions = agent.act(states)
+        next_states, rewards, dones, infos = env.step(actions)
+        
+        # Done environments were reset by their worker; next_state is masked by done
+        agent.remember_batch(states, actions, rewards, next_states, dones)
+        states = next_states
+        episode_rewards += rewards
+        episode_steps += 1
+        
+        agent.replay()
+        
+        step += 1
+        if observation_features and step % stats_sync_interval == 0:
+            obs_stats = env.sync_obs_stats(obs_stats)
+        
+        for i in np.flatnonzero(dones):
+            agent.update_target_model()
+            
+            if agent.epsilon > agent.epsilon_min:
+                agent.epsilon *= agent.epsilon_decay
+            
+            if episode % 10 == 0:
+                print(f"Ep {episode}/{episodes} | Env {i} | Reward: {episode_rewards[i]:.1f} | "
+                      f"ε: {agent.epsilon:.3f} | Steps: {episode_steps[i]} | "
+                      f"Reset: {infos[i]['reset_time'] * 1000:.0f}ms")
+            
+            episode_rewards[i] = 0
+            episode_steps[i] = 0
+            episode += 1
     
-    agent.save('models/traffic_dqn.pth')
+    if observation_features:
+        obs_stats = env.sync_obs_stats(obs_stats)
+    agent.save(model_path_for(observation_features), obs_stats=obs_stats)
+    run_stats = env.get_stats()
     env.close()
     print("Training complete. Model saved.")
+    print_run_stats(run_stats)
 
 if __name__ == "__main__":
     os.makedirs('models', exist_ok=True)
@@ -0,0 +1,446 @@
+import os
+import sys
+import numpy as np
+import random
+import json
+import tempfile
+import time
+from datetime import datetime
+
+# SUMO environment check
+if 'SUMO_HOME' in os.environ:
+    tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
+    sys.path.append(tools)
+else:
+    sys.exit("Please declare environment variable 'SUMO_HOME'")
+
+import traci.constants as tc
+
+from observation import StepObserver, ObservationBuilder
+from controllers import ControllerView
+from topology import load_network_index
+from sumo_backend import get_backend, additional_files
+from episode_logger import EpisodeLogWriter
+from log_index import LogIndex
+from online_stats import StatsAccumulator
+
+class TrafficEnvironment:
+    # Remaining time (s) given to a green when it is set - the static program would end it after 31 s
+    GREEN_HOLD = 86400
+    
+    def __init__(self, net_file, route_file, use_gui=False, backend=None, env_id=None, seed=None,
+                 decision_interval=5, config_file='simulation.sumocfg', snapshot_times=None,
+                 snapshot_dir='snapshots', reuse_process=True, observation_features=None, log_dir='logs',
+                 min_green_duration=10, emergency_override=True):
+        self.net_file = net_file
+        self.route_file = route_file
+        # e.g. a scenario directory from scenario_cache.get_scenario()
+        self.config_file = config_file
+        self.use_gui = use_gui
+        # Set when several environments run side by side (distinct logs and SUMO seeds)
+        self.env_id = env_id
+        self.seed = seed
+        # traci (TCP) or libsumo (in-process); GUI runs always use traci
+        self.sumo = get_backend(backend, use_gui)
+        # Keep one SUMO process and reload the scenario with sumo.load() on reset
+        self.reuse_process = reuse_process
+        # Route file override for the current episode (None = routes from the config)
+        self.episode_route_file = None
+        # Wall-clock seconds the last reset spent (re)starting the simulation
+        self.reset_time = 0.0
+        # EDITED: Traffic light layout parsed once from the network (cached on disk)
+        tls_program = os.path.join(os.path.dirname(net_file), 'tls_program.add.xml')
+        self.topology = load_network_index(net_file, [tls_program] if os.path.exists(tls_program) else [])
+        if not self.topology.tls_ids:
+            raise Exception("No traffic lights found in network")
+        self.tls_id = self.topology.tls_ids[0]  # Use first traffic light
+        self.num_tls_phases = None
+        
+        # EDITED: Traffic phases with yellow transitions (8 phases total)
+        # Green phases: 0=North, 2=East, 4=South, 6=West
+        # Yellow phases: 1, 3, 5, 7 (auto-handled by SUMO)
+        self.phases = [0, 2, 4, 6]  # DQN chooses from 4 green phases
+        # Both are DQN safeguards - baseline controllers run with 0 / False and own their timing
+        self.min_green_duration = min_green_duration
+        self.emergency_override = emergency_override
+        # Simulated seconds per step(), advanced in one SUMO call
+        self.decision_interval = decision_interval
+        
+        # Snapshot mode: simulation times (s) saved once per route file, one state restored per reset
+        self.snapshot_times = sorted(snapshot_times) if snapshot_times else None
+        self.snapshot_dir = snapshot_dir
+        # Route file (None = from the config) -> saved state paths
+        self.snapshots = {}
+        self._snapshot_rng = random.Random(seed)
+        # Route file of the scenario loaded for snapshot restores
+        self._snapshot_routes = None
+        # Private directory under snapshot_dir, created with the first snapshot
+        self._snapshot_path = None
+        
+        # All incoming lanes, grouped by the action whose green phase serves them (N, E, S, W)
+        green_lanes = self.topology[self.tls_id].green_lanes.get('dqn')
+        if green_lanes is None:
+            raise Exception(f"No 'dqn' program for traffic light {self.tls_id}")
+        lanes = self.topology[self.tls_id].lanes
+        self.lanes = [lane for phase in self.phases for lane in lanes if lane in green_lanes[phase]]
+        self.lane_action = np.array([action for action, phase in enumerate(self.phases)
+                                     for lane in lanes if lane in green_lanes[phase]])
+        self._action_of_lane = dict(zip(self.lanes, self.lane_action.tolist()))
+        # Emergency vehicles waiting for their green: vehicle ID -> (action, first seen time)
+        self._emergency_pending = {}
+        # Emergency vehicles already given their green (still on the approach for a while)
+        self._emergency_served = set()
+        
+        # Observation: legacy 6 values by default (matches saved models), or an ObservationBuilder
+        self.obs_builder = None
+        self.state_size = 6
+        # Loaded next to the config's own: the observer's laneData, and approach detectors if any
+        extra_files = [f'{net_file}.observer.add.xml']
+        if observation_features:
+            self.obs_builder = ObservationBuilder(self.lanes, self.topology[self.tls_id].lane_lengths,
+                                                  len(self.phases), observation_features)
+            self.state_size = self.obs_builder.size
+            if self.obs_builder.detectors:
+                # Approach bins are counted by lane area detectors
+                extra_files.append(f'{net_file}.approach.add.xml')
+                self.obs_builder.write_detectors(extra_files[-1])
+            self.observer = StepObserver(self.lanes, self.sumo, lane_vars=self.obs_builder.lane_vars,
+                                         detectors=self.obs_builder.detector_ids,
+                                         edges=self.topology.edges)
+        else:
+            self.observer = StepObserver(self.lanes, self.sumo, edges=self.topology.edges)
+        self.observer.write_additional(extra_files[0])
+        self.additional_files = additional_files(config_file, extra_files)
+        # Batched per-action readings for baseline controllers
+        self.controller_view = ControllerView(self.topology, [(self.tls_id, 'dqn', self.phases)], self.lanes)
+        self._lane_keys = [(f'lane/{lane}/queue_length', f'lane/{lane}/waiting_time') for lane in self.lanes]
+        
+        self.current_phase = 0
+        self.time_since_last_phase_change = 0
+        
+        # Data logging - running totals in memory, per-step records streamed to disk
+        self.episode_data = self._empty_episode_data()
+        # Online statistics: this episode, and everything this environment has run
+        self.stats = StatsAccumulator()
+        self.run_stats = StatsAccumulator()
+        # Episode JSON, step logs and index go here (None = keep statistics in memory only)
+        self.log_dir = log_dir
+        self.episode_name = None
+        self.episode_done = False
+        # Set once the episode is merged into run_stats (reset() and close() both save)
+        self.episode_saved = False
+        self.step_log = None
+    
+    @staticmethod
+    def _empty_episode_data():
+        return {
+            'steps': 0,
+            'phase_changes': 0,
+            'vehicles_passed': {'passenger': 0, 'emergency': 0, 'bus': 0, 'truck': 0},
+            'total_vehicles': 0,
+            'preemptions': 0
+        }
+        
+    def _sumo_args(self):
+        """SUMO options for one episode (without the binary)"""
+        args = ['-c', self.config_file, '--no-warnings', '--no-step-log', '--time-to-teleport', '-1']
+        if self.seed is not None:
+            args += ['--seed', str(self.seed)]
+        if self.episode_route_file is not None:
+            args += ['-r', self.episode_route_file]
+        args += ['-a', ','.join(self.additional_files)]
+        return args
+    
+    def freeze_observation_stats(self, stats):
+        """Normalize with fixed statistics (e.g. saved with the model) - for testing and evaluation"""
+        if self.obs_builder is None or stats is None:
+            return
+        self.obs_builder.set_stats(stats)
+        self.obs_builder.update_stats = False
+    
+    def start_simulation(self):
+        if self.sumo.isLoaded():
+            # Reuse or snapshot mode: restart the scenario inside the running process - no fork, no new socket
+            self.sumo.load(self._sumo_args())
+        else:
+            self.sumo.start(['sumo-gui' if self.use_gui else 'sumo'] + self._sumo_args())
+        
+        # EDITED: Switch to our custom 'dqn' program (reloading restores the default one)
+        self.sumo.trafficlight.setProgram(self.tls_id, 'dqn')
+        
+        # Get available phases from traffic light program
+        if self.num_tls_phases is None:
+            self.num_tls_phases = len(self.topology[self.tls_id].program('dqn'))
+            print(f"Traffic light ID: {self.tls_id}, Available phases: {self.num_tls_phases}")
+        
+        # Subscribe once per episode; every step then reads one batched result
+        self.observer.subscribe()
+        self.sumo.trafficlight.subscribe(self.tls_id, [tc.TL_CURRENT_PHASE])
+        
+    def current_action(self):
+        """Action whose green is showing, -1 during yellow"""
+        return self.phases.index(self.current_phase) if self.current_phase in self.phases else -1
+    
+    def get_state(self):
+        if self.obs_builder is not None:
+            action = self.current_action()
+            state = self.obs_builder.build(self.observer, action if action >= 0 else None,
+                                           self.time_since_last_phase_change)
+            return state.copy()  # The builder reuses its buffer every step
+        
+        # EDITED: State for 4 directions - [queue_N, queue_E, queue_S, queue_W, current_phase, time_in_phase]
+        state = np.empty(6, dtype=np.float32)
+        # Halting vehicles summed over every lane of each approach
+        state[:4] = np.bincount(self.lane_action, weights=self.observer.halting, minlength=4)
+        state[4] = self.current_phase
+        state[5] = self.time_since_last_phase_change
+        return state
+    
+    def controller_observation(self):
+        """JunctionObservation (one row) for the controllers module"""
+        return self.controller_view.observe(self.observer, self.current_action(),
+                                            self.time_since_last_phase_change)
+    
+    def step(self, action):
+        # EDITED: Ensure the simulation is running
+        if not self.sumo.isLoaded():
+            raise Exception("Simulation not started. Call reset() first.")
+        
+        # Emergency vehicle check - RULE-BASED OVERRIDE
+        emergency_override = self._check_emergency_vehicles() if self.emergency_override else None
+        if emergency_override is not None:
+            action = emergency_override
+        
+        target_phase = self.phases[action]
+        
+        # Change phase if needed (min green is enforced by time since last change)
+        if target_phase != self.current_phase and self.time_since_last_phase_change >= self.min_green_duration:
+            self._change_phase(target_phase)
+            self.time_since_last_phase_change = 0
+        
+        if emergency_override is not None and self.current_phase == target_phase:
+            self._record_preemption(emergency_override)
+        
+        # EDITED: Advance the decision interval in one SUMO call
+        start_time = self.observer.time
+        lane_halting = self.observer.advance(self.decision_interval)
+        
+        elapsed = self.observer.time - start_time
+        self.time_since_last_phase_change += elapsed
+        
+        # Live phase from the subscription, in case the program moved on by itself
+        phase = self.sumo.trafficlight.getSubscriptionResults(self.tls_id)[tc.TL_CURRENT_PHASE]
+        if phase != self.current_phase:
+            self.current_phase = phase
+            self.time_since_last_phase_change = elapsed
+        
+        # Vehicle-seconds spent halting on the approach during the interval, and their mean queue
+        halting_time = float(lane_halting.sum())
+        queue_length = halting_time / elapsed if elapsed else 0.0
+        # Accumulated waiting time of the vehicles queued now, as in the state
+        waiting_time = float(self.observer.waiting.sum())
+        
+        # Calculate reward (negative waiting time incurred over the interval)
+        reward = -halting_time
+        
+        # Log data
+        self._log_step_data(waiting_time, queue_length, elapsed)
+        
+        next_state = self.get_state()
+        done = self.observer.min_expected <= 0
+        self.episode_done = done
+        info = {'elapsed': elapsed, 'time': self.observer.time,
+                'emergency_override': emergency_override is not None}
+        
+        return next_state, reward, done, info
+    
+    def _check_emergency_vehicles(self):
+        """Rule-based emergency vehicle preemption - one direction at a time"""
+        # EDITED: Only the tracked emergency vehicles are checked, on any incoming lane
+        pending = {}
+        for veh, lane in self.observer.emergency_lanes():
+            action = self._action_of_lane.get(lane)
+            if action is not None and veh not in self._emergency_served:
+                first_seen = self._emergency_pending.get(veh, (action, self.observer.time))[1]
+                pending[veh] = (action, first_seen)
+        self._emergency_pending = pending
+        
+        if not pending:
+            return None
+        # Lowest direction first (N=0, E=1, S=2, W=3), as before
+        return min(action for action, _ in pending.values())
+    
+    def _record_preemption(self, action):
+        """Log how long emergency vehicles on the now-green approach waited for it"""
+        for veh, (veh_action, first_seen) in list(self._emergency_pending.items()):
+            if veh_action == action:
+                self.stats.update('emergency/preemption_latency', self.observer.time - first_seen)
+                self.episode_data['preemptions'] += 1
+                del self._emergency_pending[veh]
+                self._emergency_served.add(veh)
+    
+    def _change_phase(self, target_phase):
+        """Change phase - SUMO handles yellow transitions automatically"""
+        # EDITED: Just set target phase, SUMO transitions through yellow automatically
+        self.sumo.trafficlight.setPhase(self.tls_id, target_phase)
+        # Hold the green until the next action changes it
+        self.sumo.trafficlight.setPhaseDuration(self.tls_id, self.GREEN_HOLD)
+        self.current_phase = target_phase
+        
+        # Count phase change (timing is recoverable from the per-step phase column)
+        self.episode_data['phase_changes'] += 1
+    
+    def _log_step_data(self, waiting_time, queue_length, elapsed):
+        """Log important metrics during simulation"""
+        self.episode_data['steps'] += 1
+        self.stats.update('waiting_time', waiting_time)
+        self.stats.update('queue_length', queue_length)
+        for (queue_key, waiting_key), halting, lane_waiting in zip(
+                self._lane_keys, self.observer.halting, self.observer.waiting):
+            self.stats.update(queue_key, halting)
+            self.stats.update(waiting_key, lane_waiting)
+        
+        if self.step_log is not None:
+            self.step_log.append(self.observer.time, elapsed, waiting_time, queue_length, self.current_phase)
+        
+        # Count vehicles passed (arrived since last step, typed at departure by the registry)
+        for veh_type, travel_time, delay in self.observer.pop_arrivals():
+            if veh_type in self.episode_data['vehicles_passed']:
+                self.episode_data['vehicles_passed'][veh_type] += 1
+            self.episode_data['total_vehicles'] += 1
+            self.stats.update('travel_time', travel_time)
+            self.stats.update('delay', delay)
+            self.stats.update(f'vtype/{veh_type}/travel_time', travel_time)
+            self.stats.update(f'vtype/{veh_type}/delay', delay)
+    
+    def reset(self, route_file=None):
+        """Start a new episode, optionally with a different route file"""
+        # Snapshot and reuse modes keep the SUMO process running between episodes
+        if self.sumo.isLoaded() and not (self.snapshot_times or self.reuse_process):
+            self.sumo.close()
+        
+        # Save episode data before reset (no-op the first time)
+        self._save_episode_data()
+        
+        # Reset episode data
+        self.episode_data = self._empty_episode_data()
+        self.stats = StatsAccumulator()
+        self.episode_done = False
+        self.episode_saved = False
+        self._open_step_log()
+        
+        self.current_phase = 0
+        self.time_since_last_phase_change = 0
+        self._emergency_pending = {}
+        self._emergency_served = set()
+        self.episode_route_file = route_file
+        
+        start = time.perf_counter()
+        if self.snapshot_times:
+            self._restore_snapshot()
+        else:
+            self.start_simulation()
+        self.reset_time = time.perf_counter() - start
+        
+        # EDITED: Set initial traffic light phase after starting simulation
+        if self.tls_id:
+            self.sumo.trafficlight.setPhase(self.tls_id, 0)
+            self.sumo.trafficlight.setPhaseDuration(self.tls_id, self.GREEN_HOLD)
+        
+        return self.get_state()
+    
+    def _save_snapshots(self):
+        """Run the freshly started simulation and save its state at every snapshot time"""
+        if self._snapshot_path is None:
+            # Unique per environment, so parallel workers never overwrite each other's states
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            prefix = f'env{self.env_id}_' if self.env_id is not None else 'env_'
+            self._snapshot_path = tempfile.mkdtemp(prefix=prefix, dir=self.snapshot_dir)
+        routes = len(self.snapshots)
+        snapshots = []
+        
+        for snapshot_time in self.snapshot_times:
+            if snapshot_time > self.sumo.simulation.getTime():
+                self.sumo.simulationStep(snapshot_time)
+            path = os.path.join(self._snapshot_path, f'state_{int(snapshot_time)}s_routes{routes}.xml.gz')
+            self.sumo.simulation.saveState(path)
+            snapshots.append(path)
+        
+        print(f"Saved {len(snapshots)} simulation snapshot(s) at t={self.snapshot_times}")
+        return snapshots
+    
+    def _restore_snapshot(self):
+        """Load a random snapshot into the running simulation instead of restarting SUMO"""
+        # States only load into a scenario with the same routes
+        if not self.sumo.isLoaded() or self._snapshot_routes != self.episode_route_file:
+            self.start_simulation()
+            self._snapshot_routes = self.episode_route_file
+        
+        snapshots = self.snapshots.get(self.episode_route_file)
+        if snapshots is None:
+            snapshots = self.snapshots[self.episode_route_file] = self._save_snapshots()
+        
+        self.sumo.simulation.loadState(self._snapshot_rng.choice(snapshots))
+        self.sumo.trafficlight.setProgram(self.tls_id, 'dqn')
+        # Vehicle subscriptions do not survive a state load
+        self.observer.subscribe()
+        self.sumo.trafficlight.subscribe(self.tls_id, [tc.TL_CURRENT_PHASE])
+    
+    def _open_step_log(self):
+        """Start the streaming per-step log for a new episode"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        suffix = f'_env{self.env_id}' if self.env_id is not None else ''
+        self.episode_name = f'episode_{timestamp}{suffix}'
+        if self.log_dir is None:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.step_log = EpisodeLogWriter(os.path.join(self.log_dir, f'{self.episode_name}.steps.npy'))
+    
+    def episode_summary(self):
+        """Summary metrics of the current episode"""
+        return {
+            'avg_waiting_time': self.stats['waiting_time'].mean,
+            'avg_queue_length': self.stats['queue_length'].mean,
+            'total_phase_changes': self.episode_data['phase_changes'],
+            'vehicles_passed': dict(self.episode_data['vehicles_passed']),
+            'total_vehicles': self.episode_data['total_vehicles'],
+            'preemptions': self.episode_data['preemptions'],
+            'steps': self.episode_data['steps'],
+            'steps_file': f'{self.episode_name}.steps.npy',
+            'reset_time': self.reset_time,
+            'stats': self.stats.summary()
+        }
+    
+    def _save_episode_data(self, discard=False):
+        """Merge the episode into the run statistics, finish the step log and save the summary to JSON"""
+        # EDITED: Skip if no data collected yet or already saved
+        keep = not (discard or self.episode_saved or not self.episode_data['steps'])
+        self.episode_saved = True
+        # Also without a log directory (evaluation runs)
+        if keep:
+            self.run_stats.merge(self.stats)
+        
+        if self.step_log is None:
+            return
+        self.step_log.close()
+        self.step_log = None
+        
+        if not keep:
+            os.remove(os.path.join(self.log_dir, f'{self.episode_name}.steps.npy'))
+            return
+        
+        summary = self.episode_summary()
+        with open(os.path.join(self.log_dir, f'{self.episode_name}.json'), 'w') as f:
+            json.dump({'summary': summary}, f, indent=2)
+        
+        # Keep the summary index current so analysis never re-parses old episodes
+        index = LogIndex(self.log_dir)
+        index.add_episode(self.episode_name, summary)
+        index.close()
+    
+    def close(self):
+        if self.sumo.isLoaded():
+            self.sumo.close()
+        
+        # Keep the last episode only if it ran to completion
+        self._save_episode_data(discard=not self.episode_done)
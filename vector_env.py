@@ -0,0 +1,148 @@
+import multiprocessing as mp
+import numpy as np
+
+def _worker(remote, parent_remote, env_kwargs):
+    """Run one TrafficEnvironment (and its own SUMO instance) in a child process"""
+    parent_remote.close()
+
+    # Imported here so each worker sets up SUMO_HOME and its own TraCI connection
+    from traffic_env import TrafficEnvironment
+    env = TrafficEnvironment(**env_kwargs)
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+
+            if cmd == 'step':
+                state, reward, done, info = env.step(data)
+                if done:
+                    # Auto-reset so all environments keep stepping in lockstep
+                    state = env.reset()
+                    info['reset_time'] = env.reset_time
+                remote.send((state, reward, done, info))
+
+            elif cmd == 'reset':
+                remote.send(env.reset())
+
+            elif cmd == 'controller_obs':
+                remote.send(env.controller_observation())
+
+            elif cmd == 'stats':
+                remote.send(env.run_stats)
+
+            elif cmd == 'pop_obs_stats':
+                builder = env.obs_builder
+                remote.send(builder.pop_stats_update() if builder is not None and builder.stats is not None else None)
+
+            elif cmd == 'set_obs_stats':
+                env.obs_builder.set_stats(data)
+                remote.send(None)
+
+            elif cmd == 'close':
+                env.close()
+                remote.send(None)
+                break
+
+            else:
+                raise ValueError(f"Unknown worker command: {cmd}")
+    except KeyboardInterrupt:
+        env.close()
+    finally:
+        remote.close()
+
+class VectorTrafficEnv:
+    """
+    N TrafficEnvironments stepped in lockstep, one worker process per SUMO instance
+
+    step() takes one action per environment and returns stacked NumPy arrays:
+    states (N, state_size), rewards (N,) and dones (N,), plus the list of
+    per-environment info dicts. An environment that finishes its episode is
+    reset by its worker, so the returned state for a done environment is
+    already the first state of its next episode.
+    """
+
+    def __init__(self, num_envs, env_kwargs, base_seed=42, start_method=None):
+        self.num_envs = num_envs
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.processes = [], []
+        for i in range(num_envs):
+            remote, work_remote = ctx.Pipe()
+            # Distinct SUMO seeds and log names per worker
+            kwargs = dict(env_kwargs, use_gui=False, env_id=i, seed=base_seed + i)
+            process = ctx.Process(target=_worker, args=(work_remote, remote, kwargs), daemon=True)
+            process.start()
+            work_remote.close()
+
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        self.closed = False
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(('reset', None))
+        return np.stack([remote.recv() for remote in self.remotes])
+
+    def step(self, actions):
+        for remote, action in zip(self.remotes, actions):
+            remote.send(('step', int(action)))
+
+        results = [remote.recv() for remote in self.remotes]
+        states, rewards, dones, infos = zip(*results)
+        return (np.stack(states),
+                np.array(rewards, dtype=np.float32),
+                np.array(dones, dtype=bool),
+                list(infos))
+
+    def controller_observation(self):
+        """JunctionObservation with one row per environment"""
+        from controllers import stack_observations
+
+        for remote in self.remotes:
+            remote.send(('controller_obs', None))
+        return stack_observations([remote.recv() for remote in self.remotes])
+
+    def get_stats(self):
+        """Run statistics of all workers merged into one StatsAccumulator"""
+        from online_stats import StatsAccumulator
+
+        for remote in self.remotes:
+            remote.send(('stats', None))
+        merged = StatsAccumulator()
+        for remote in self.remotes:
+            merged.merge(remote.recv())
+        return merged
+
+    def sync_obs_stats(self, stats=None):
+        """
+        Merge the observation statistics the workers gathered since the last
+        sync into stats, and have every worker normalize with the total
+
+        Returns the total (None without observation normalization).
+        """
+        for remote in self.remotes:
+            remote.send(('pop_obs_stats', None))
+        updates = [remote.recv() for remote in self.remotes]
+        if updates[0] is None:
+            return stats
+
+        for update in updates:
+            stats = update if stats is None else stats.merge(update)
+        for remote in self.remotes:
+            remote.send(('set_obs_stats', stats))
+        for remote in self.remotes:
+            remote.recv()
+        return stats
+
+    def close(self):
+        if self.closed:
+            return
+
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for remote in self.remotes:
+            remote.recv()
+        for process in self.processes:
+            process.join()
+        self.closed = True